@@ -1,12 +1,60 @@
+import os
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.api.v0 import create_router
+from src.registry import ModelRegistry
+from src.cache import ResultCache
+from src.pipeline import Pipeline
+from src.jobs import JobManager, JOBS_DB_PATH, MAX_JOB_BYTES
+from src.metrics import REGISTRY, MODEL_MEMORY
+from src.models.models import InferenceBackend, PartSplitter
+from src.utils import language_option
+from typing import Mapping, Optional
+
+def create_app(lazy_models: bool = False, warm_up: Optional[bool] = None,
+               summarizer_backends: Optional[Mapping[str, InferenceBackend]] = None,
+               summarizer_splitters: Optional[Mapping[str, PartSplitter]] = None,
+               cache_entries: int = 1024, cache_path: Optional[str] = None,
+               max_concurrent_files: int = 4, process_workers: Optional[int] = None,
+               inference_queue_size: int = 64, jobs_path: str = JOBS_DB_PATH,
+               job_workers: int = 2, max_pending_documents: int = 1000,
+               registry: Optional[ModelRegistry] = None, recover_jobs: bool = True,
+               jobs_directory_root: Optional[str] = None, max_job_bytes: int = MAX_JOB_BYTES, prefork: bool = False,
+               admin_token: Optional[str] = None) -> FastAPI:
+    if warm_up is None:
+        warm_up = not lazy_models
+    if admin_token is None:
+        admin_token = os.environ.get("ADMIN_TOKEN") or None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if registry is None:
+            app.state.registry = ModelRegistry(lazy=lazy_models, backends=summarizer_backends, splitters=summarizer_splitters)
+            if warm_up:
+                app.state.registry.warm_up()
+        else:
+            app.state.registry = registry
+        app.state.prefork = prefork
+        app.state.admin_token = admin_token
+        MODEL_MEMORY.set_function(lambda: {(name,): size for name, size in app.state.registry.model_memory().items()})
+        app.state.cache = ResultCache(cache_entries, cache_path)
+        app.state.pipeline = Pipeline(app.state.registry, app.state.cache, max_concurrent_files, process_workers, inference_queue_size)
+        app.state.pipeline.start()
+        app.state.jobs = JobManager(app.state.pipeline, jobs_path, job_workers, max_pending_documents, recover_jobs,
+                                    jobs_directory_root, max_job_bytes)
+        app.state.jobs.start()
+        yield
+        await app.state.jobs.close()
+        await app.state.pipeline.close()
+        app.state.cache.close()
 
-def create_app() -> FastAPI:
     app = FastAPI(
         title="Retrieval system",
         version="0.1.0",
+        lifespan=lifespan,
         docs_url="/documentation",
         swagger_ui_parameters={
             "defaultModelsExpandDepth": -1,
@@ -24,6 +72,14 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics():
+        """
+        Exposes the metrics in the Prometheus text format. They are kept in memory by each process,
+        so with pre-forked workers a scrape reports only the worker that served it.
+        """
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
     api_router = create_router()
     app.include_router(api_router, prefix="/api/v0", tags=["api", "v0"])
 
@@ -31,4 +87,30 @@ def create_app() -> FastAPI:
 
 
 if __name__ == "__main__":
-    uvicorn.run(create_app(), host="127.0.0.1", port=8000, log_level="info")
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs the retrieval system.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of pre-forked worker processes that share the models loaded once from memory-mapped weights.")
+    parser.add_argument("--backend", type=language_option(InferenceBackend), action="append", default=[], metavar="LANGUAGE=BACKEND",
+                        help=f"Inference backend of the neural summarization of a language, one of: {', '.join(b.value for b in InferenceBackend)}. "
+                             "Can be repeated.")
+    parser.add_argument("--splitter", type=language_option(PartSplitter), action="append", default=[], metavar="LANGUAGE=SPLITTER",
+                        help=f"Part splitter of the neural summarization of a language, one of: {', '.join(s.value for s in PartSplitter)}. "
+                             "Can be repeated.")
+    args = parser.parse_args()
+    backends, splitters = dict(args.backend), dict(args.splitter)
+
+    if args.workers > 1:
+        import logging
+        from src.prefork import serve, worker_cpus
+
+        logging.basicConfig(level=logging.INFO)
+        shared_registry = ModelRegistry(backends=backends, splitters=splitters, mmap_weights=True)
+        shared_registry.warm_up()
+        serve(lambda registry: create_app(registry=registry, recover_jobs=False, prefork=True, process_workers=worker_cpus(args.workers)),
+              args.host, args.port, args.workers, registry=shared_registry)
+    else:
+        uvicorn.run(create_app(summarizer_backends=backends, summarizer_splitters=splitters), host=args.host, port=args.port, log_level="info")
\ No newline at end of file
@@ -0,0 +1,140 @@
+import json
+import time
+import resource
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+from src.abstracting.neural_abstract import BilingualSummarizer
+from src.abstracting.resources import tokenize_sentences
+from src.models.models import InferenceBackend
+from src.utils import load_documents_and_languages, PATH
+
+
+def rouge_f1(candidate: str, reference: str, longest_common: bool = False) -> float:
+    """
+    Calculates the ROUGE-1 or ROUGE-L F1 score of a candidate summary against a reference summary.
+
+    Args:
+        candidate (str): Summary produced by the evaluated backend.
+        reference (str): Summary produced by the reference backend.
+        longest_common (bool): If True, ROUGE-L (longest common subsequence) is calculated, otherwise ROUGE-1.
+
+    Returns:
+        float: F1 score from 0 to 1.
+    """
+    candidate_tokens = candidate.lower().split()
+    reference_tokens = reference.lower().split()
+    if not candidate_tokens or not reference_tokens:
+        return float(candidate_tokens == reference_tokens)
+
+    if longest_common:
+        previous = [0] * (len(reference_tokens) + 1)
+        for candidate_token in candidate_tokens:
+            current = [0]
+            for j, reference_token in enumerate(reference_tokens):
+                current.append(previous[j] + 1 if candidate_token == reference_token else max(previous[j + 1], current[j]))
+            previous = current
+        overlap = previous[-1]
+    else:
+        remaining = {}
+        for token in reference_tokens:
+            remaining[token] = remaining.get(token, 0) + 1
+        overlap = 0
+        for token in candidate_tokens:
+            if remaining.get(token, 0) > 0:
+                remaining[token] -= 1
+                overlap += 1
+
+    if overlap == 0:
+        return 0.0
+    precision = overlap / len(candidate_tokens)
+    recall = overlap / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def run_backend(backend: InferenceBackend, language: str, texts: List[str]) -> Dict:
+    """
+    Loads the model of one language with the given backend and summarizes the texts part by part.
+    Runs in a separate process, so that the peak resident memory belongs to this backend only.
+
+    Args:
+        backend (InferenceBackend): Inference backend to measure.
+        language (str): Language of the texts.
+        texts (List[str]): Texts to summarize.
+
+    Returns:
+        Dict: Load time, per-part latencies, peak resident memory and the produced summaries.
+    """
+    start_time = time.perf_counter()
+    summarizer = BilingualSummarizer(lazy=True, backends={language: backend}, max_batch_size=1)
+    summarizer.load_language(language)
+    load_time = time.perf_counter() - start_time
+
+    summaries = []
+    part_latencies = []
+    tokenizer = summarizer.models[language]["tokenizer"]
+    for text in texts:
+        parts = summarizer.split_text_into_parts(tokenize_sentences(text), tokenizer, language)
+        start_time = time.perf_counter()
+        summaries.append(summarizer.summarize_text(text, language))
+        part_latencies.append((time.perf_counter() - start_time) / max(len(parts), 1))
+
+    return {
+        "load_time": load_time,
+        "mean_part_latency": sum(part_latencies) / len(part_latencies),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "summaries": summaries,
+    }
+
+
+def benchmark(corpus_path: str = PATH, documents_per_language: int = 3) -> Dict:
+    """
+    Compares every inference backend against the full-precision PyTorch backend on corpus documents of each language.
+    Quality is reported as the mean ROUGE-1 and ROUGE-L F1 of each backend's summaries against the PyTorch summaries.
+
+    Args:
+        corpus_path (str): Path to JSON file containing information about documents. The PATH path is used by default.
+        documents_per_language (int): Number of corpus documents summarized for each language.
+
+    Returns:
+        Dict: Results keyed by language and backend.
+    """
+    documents, languages = load_documents_and_languages(corpus_path)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+
+    for language in sorted(set(languages)):
+        texts = [doc for doc, doc_language in zip(documents, languages) if doc_language == language][:documents_per_language]
+        runs = {}
+        for backend in InferenceBackend:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs[backend] = executor.submit(run_backend, backend, language, texts).result()
+
+        reference = runs[InferenceBackend.TORCH]["summaries"]
+        results[language] = {}
+        for backend, run in runs.items():
+            pairs = list(zip(run["summaries"], reference))
+            results[language][backend.value] = {
+                "load_time": run["load_time"],
+                "mean_part_latency": run["mean_part_latency"],
+                "peak_rss_mb": run["peak_rss_mb"],
+                "rouge1_f1": sum(rouge_f1(c, r) for c, r in pairs) / len(pairs),
+                "rougeL_f1": sum(rouge_f1(c, r, longest_common=True) for c, r in pairs) / len(pairs),
+            }
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the neural summarization inference backends with the PyTorch backend.")
+    parser.add_argument("--corpus", default=PATH, help="Path to the corpus manifest (texts_info.json).")
+    parser.add_argument("--documents", type=int, default=3, help="Number of documents summarized for each language.")
+    parser.add_argument("--output", help="File to save the results to as JSON.")
+    args = parser.parse_args()
+
+    results = benchmark(args.corpus, args.documents)
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
@@ -1,9 +1,23 @@
 import numpy as np
 from collections import Counter
-from typing import List
+from typing import AbstractSet, List, Mapping, Optional
 from math import log
-from nltk.corpus import stopwords
-from nltk.tokenize import sent_tokenize, word_tokenize
+from .resources import get_stop_words, tokenize_words
+from .document import ParsedDocument, parse_document
+from .document_frequency import DocumentFrequencyStore, text_hash
+from ..utils import PATH
+
+class _SubstringCounts(dict):
+    """
+    Lazily counts substring occurrences of terms in a document and remembers them, so each term is scanned only once.
+    """
+    def __init__(self, document: str):
+        super().__init__()
+        self.document = document
+
+    def __missing__(self, term: str) -> int:
+        count = self[term] = self.document.count(term)
+        return count
 
 class TextSummarizer:
     """
@@ -13,106 +27,155 @@ class TextSummarizer:
     Attributes:
         documents (List[str]): A list of documents used to calculate frequency statistics for summarization.
         languages (List[str]): A list of languages corresponding to each document, used for proper tokenization and stopword removal.
+        store (DocumentFrequencyStore): Document frequency of terms over the corpus, which can be updated incrementally.
         doc_count (int): The total number of documents in the corpus, used for calculating IDF (Inverse Document Frequency).
         df (Counter): A frequency dictionary of terms across all documents, used for calculating TF-IDF.
 
     Methods:
-        __init__(documents: List[str], languages: List[str]) -> None: Initializes the class with a set of documents and their languages.
-        _calculate_document_frequency() -> Counter: Calculates the document frequency for terms across the loaded documents.
-        _preprocess_text(text: str, language: str) -> List[str]: Preprocesses text by tokenizing and removing stopwords.
-        _calculate_tf_idf(sentence: str, document: str, language: str) -> float: Calculates the TF-IDF score for a given sentence.
-        _calculate_position_scores(sentences: List[str], document: str) -> List[float]: Calculates position-based scores for each sentence.
-        summarize(document: str, language: str, num_sentences=10) -> str: Summarizes the given document using the previously loaded data for TF-IDF and position scoring.
+        __init__(documents: List[str] = None, languages: List[str] = None, store: DocumentFrequencyStore = None) -> None: Initializes the class with a set of documents and their languages, or with a ready store.
+        from_corpus(manifest_path: str = PATH, store_path: Optional[str] = None) -> TextSummarizer: Creates a summarizer from the persisted store of the corpus.
+        add_document(text: str, language: str) -> str: Folds a new document into the corpus statistics.
+        _tokenize(text: str, language: str) -> List[str]: Tokenizes text and leaves only alphabetic words.
+        _preprocess_text(text: str, language: str, stop_words: Optional[AbstractSet[str]] = None) -> List[str]: Preprocesses text by tokenizing and removing stopwords.
+        _calculate_tf_idf(words: List[str], term_counts: Mapping[str, int]) -> float: Calculates the TF-IDF score for a preprocessed sentence.
+        _calculate_position_scores(sentence_spans: np.ndarray, total_chars: int) -> np.ndarray: Calculates position-based scores for each sentence.
+        summarize(document: str, language: str, num_sentences=10, substring_counts=False) -> str: Summarizes the given document using the previously loaded data for TF-IDF and position scoring.
+        summarize_document(document: ParsedDocument, num_sentences=10, substring_counts=False) -> str: Summarizes an already parsed document.
     """
-    def __init__(self, documents: List[str], languages: List[str]):
+    def __init__(self, documents: Optional[List[str]] = None, languages: Optional[List[str]] = None,
+                 store: Optional[DocumentFrequencyStore] = None):
         """
         Initializes the class with a set of documents and their languages.
+        If a store is given, its document frequencies are used and the documents are not processed again.
         """
-        self.documents = documents
-        self.languages = languages
-        self.doc_count = len(documents)
-        self.df = self._calculate_document_frequency()
+        self.documents = documents or []
+        self.languages = languages or []
+
+        if store is None:
+            store = DocumentFrequencyStore(self._preprocess_text)
+            for index, (doc, language) in enumerate(zip(self.documents, self.languages)):
+                store.add_document(f"document:{index}", doc, language)
+        self.store = store
 
-    def _calculate_document_frequency(self) -> Counter:
+    @classmethod
+    def from_corpus(cls, manifest_path: str = PATH, store_path: Optional[str] = None) -> "TextSummarizer":
         """
-        Counts the number of documents that contain a word from each document
+        Creates a summarizer whose document frequencies are loaded from the store saved next to the corpus manifest.
+        The store is rebuilt incrementally if the manifest has changed since it was saved.
+
+        Args:
+            manifest_path (str): Path to JSON file containing information about documents. The PATH path is used by default.
+            store_path (Optional[str]): File of the store. By default it is saved next to the manifest.
 
         Returns:
-            Counter: A dictionary with frequencies of words occurring in documents.
+            TextSummarizer: Summarizer over the corpus.
         """
-        df = Counter()
-        for doc in self.documents:
-            language = self.languages[self.documents.index(doc)]
-            words = set(self._preprocess_text(doc, language))
-            df.update(words)
-        return df
+        return cls(store=DocumentFrequencyStore.load_or_build(cls._preprocess_text, manifest_path, store_path))
+
+    @property
+    def doc_count(self) -> int:
+        return self.store.doc_count
 
-    def _preprocess_text(self, text: str, language: str) -> List[str]:
+    @property
+    def df(self) -> Counter:
+        return self.store.df
+
+    def add_document(self, text: str, language: str) -> str:
+        """
+        Folds a new document into the corpus statistics without rebuilding them.
+        If the store has a file, the change is appended to its journal rather than rewriting the whole store.
+
+        Args:
+            text (str): Document text.
+            language (str): Document language.
+
+        Returns:
+            str: Key of the document in the store.
+        """
+        key = DocumentFrequencyStore.UPLOAD_PREFIX + text_hash(text)
+        self.store.add_document(key, text, language)
+        if self.store.path:
+            self.store.save_changes()
+        return key
+
+    @staticmethod
+    def _tokenize(text: str, language: str) -> List[str]:
+        """
+        Tokenizes text and leaves only alphabetic words, keeping their original case.
+
+        Args:
+            text (str): Text to tokenize.
+            language (str): Text language (used for proper tokenization).
+
+        Returns:
+            List[str]: A list of alphabetic words from the text.
+        """
+        return [word for word in tokenize_words(text, language) if word.isalpha()]
+
+    @staticmethod
+    def _preprocess_text(text: str, language: str, stop_words: Optional[AbstractSet[str]] = None) -> List[str]:
         """
         Pre-processes text: tokenizes, removes stop words and leaves only alphabetic words.
 
         Args:
             text (str): Pre-processing text.
             language (str): Text language (used for proper tokenization and stop words).
+            stop_words (Optional[AbstractSet[str]]): Stop words of the language. The shared stop words of the language are used if not given.
 
         Returns:
             List[str]: A list of words from the text after preprocessing.
         """
-        words = word_tokenize(text, language=language)
-        stop_words = set(stopwords.words(language))
-        words = [word.lower() for word in words if word.isalpha() and word not in stop_words]
+        words = TextSummarizer._tokenize(text, language)
+        if stop_words is None:
+            stop_words = get_stop_words(language)
+        words = [word.lower() for word in words if word not in stop_words]
         return words
 
-    def _calculate_tf_idf(self, sentence: str, document: str, language: str) -> float:
+    def _calculate_tf_idf(self, words: List[str], term_counts: Mapping[str, int]) -> float:
         """
         Calculates the TF-IDF value for a sentence in the document.
 
         Args:
-            sentence (str): The proposal for which the TF-IDF is calculated.
-            document (str): The document to which the proposal belongs.
-            language (str): Text language (required for correct preprocessing).
+            words (List[str]): Preprocessed words of the sentence for which the TF-IDF is calculated.
+            term_counts (Mapping[str, int]): Number of occurrences of each term in the document to which the sentence belongs.
 
         Returns:
-            float: TF-IDF value for the proposal.
+            float: TF-IDF value for the sentence.
         """
-        words = self._preprocess_text(sentence, language)
+        if not words:
+            return 0.0
+
         tf = Counter(words)
         tfmax = max(tf.values())
         score = 0
 
         for term, freq in tf.items():
             tf_t_si = freq / len(words)
-            tf_t_d = document.count(term)
+            tf_t_d = term_counts[term]
             w_t_d = 0.5 * (1 + tf_t_d / tfmax) * log(self.doc_count / (1 + self.df[term]))
             score += tf_t_si * w_t_d
         return score
 
-    def _calculate_position_scores(self, sentences: str, document: str) ->  List[float]:
+    def _calculate_position_scores(self, sentence_spans: np.ndarray, total_chars: int) -> np.ndarray:
         """
         Calculates positional scores for sentences in a document based on their positioning.
+        The number of characters before each sentence is taken from a prefix sum, so all scores are computed in linear time.
 
         Args:
-            sentences (str): A list of the sentences that make up the document.
-            document (str): Document text.
+            sentence_spans (np.ndarray): Start and end offsets of the sentences that make up the document.
+            total_chars (int): Length of the document text.
 
         Returns:
-            List[float]: A list of positional points for each sentence.
+            np.ndarray: Positional points for each sentence.
         """
-        position_scores = []
-        total_chars = len(document)
-        
-        for i, sentence in enumerate(sentences):
-            chars_before_sent = sum(len(sentences[j]) for j in range(i))
-            chars_in_paragraph = len(sentence)
-            
-            posd_si = 1 - (chars_before_sent / total_chars)
+        chars_in_paragraph = (sentence_spans[:, 1] - sentence_spans[:, 0]).astype(np.int64)
+        chars_before_sent = np.concatenate(([0], np.cumsum(chars_in_paragraph)[:-1]))
 
-            posp_si = 1 - (chars_before_sent / chars_in_paragraph) if chars_in_paragraph > 0 else 0
-            position_scores.append(posd_si * posp_si)
-        
-        return position_scores
+        posd_si = 1 - (chars_before_sent / total_chars)
+        posp_si = np.where(chars_in_paragraph > 0, 1 - (chars_before_sent / np.maximum(chars_in_paragraph, 1)), 0)
+        return posd_si * posp_si
 
-    def summarize(self, document: str, language: str, num_sentences=10) -> str:
+    def summarize(self, document: str, language: str, num_sentences=10, substring_counts=False) -> str:
         """
         Selects the most relevant proposals based on TF-IDF and position scores.
 
@@ -120,20 +183,41 @@ class TextSummarizer:
             document (str): Document text for summarization.
             language (str): Document Language.
             num_sentences (int): Number of proposals to be included in the summarization.
+            substring_counts (bool): If True, a term is counted as a substring of the raw document text, as in earlier versions,
+                                     which also counts it inside longer words. By default whole lowercased words are counted.
+
+        Returns:
+            str: Key sentences.
+        """
+        return self.summarize_document(parse_document(document, language), num_sentences, substring_counts)
+
+    def summarize_document(self, document: ParsedDocument, num_sentences=10, substring_counts=False) -> str:
+        """
+        Selects the most relevant proposals of a parsed document based on TF-IDF and position scores.
+        All sentences are scored from the shared token arrays and sentence offsets of the document,
+        and only the selected sentences are cut out of the text.
+
+        Args:
+            document (ParsedDocument): Parsed document for summarization.
+            num_sentences (int): Number of proposals to be included in the summarization.
+            substring_counts (bool): If True, a term is counted as a substring of the raw document text, as in earlier versions,
+                                     which also counts it inside longer words. By default whole lowercased words are counted.
 
         Returns:
             str: Key sentences.
-        """        
-        sentences = sent_tokenize(document, language=language)
-        sentence_scores = []
-        
-        for i, sentence in enumerate(sentences):
-            tf_idf_score = self._calculate_tf_idf(sentence, document, language)
-            position_score = self._calculate_position_scores(sentences, document)[i]
-            sentence_scores.append(tf_idf_score * position_score)
-        
+        """
+        if not len(document.sentence_spans):
+            return ""
+
+        sentence_words = document.sentence_words()
+        term_counts = _SubstringCounts(document.text) if substring_counts else document.term_counts()
+
+        position_scores = self._calculate_position_scores(document.sentence_spans, len(document.text))
+        tf_idf_scores = np.array([self._calculate_tf_idf(words, term_counts) for words in sentence_words])
+        sentence_scores = tf_idf_scores * position_scores
+
         top_sentences = np.argsort(sentence_scores)[-num_sentences:]
         top_sentences = sorted(top_sentences)
-        
-        summary = " ".join([sentences[i] for i in top_sentences])
+
+        summary = " ".join([document.text[start:end] for start, end in document.sentence_spans[top_sentences].tolist()])
         return summary
@@ -0,0 +1,96 @@
+import unicodedata
+import numpy as np
+from collections import Counter
+from typing import List, NamedTuple
+from .resources import get_sentence_tokenizer, get_stop_words, get_word_tokenizer
+
+# Changes whenever parsing changes the words or sentences the stages see, so that their cached outputs are not reused.
+DOCUMENT_VERSION = "punkt-spans-1"
+
+
+class ParsedDocument(NamedTuple):
+    """
+    A document tokenized once for all summarization stages.
+    Sentences are kept as offsets into the text, and the words of all sentences are kept in flat arrays with masks,
+    so every stage selects the words it needs without tokenizing or copying the text again.
+
+    Attributes:
+        text (str): Text in the NFC form. The sentence offsets point into it.
+        language (str): Language of the text.
+        sentence_spans (np.ndarray): Array of shape (sentences, 2) with the start and end offset of every sentence.
+        tokens (np.ndarray): Lowercased word tokens of all sentences, in order.
+        token_sentences (np.ndarray): Index of the sentence of every token.
+        alphabetic (np.ndarray): Mask of the tokens that consist only of letters.
+        stopwords (np.ndarray): Mask of the tokens that are stop words of the language when lowercased.
+        cased_stopwords (np.ndarray): Mask of the tokens that are stop words of the language as written in the text.
+
+    Methods:
+        sentences() -> List[str]: Returns the text of every sentence.
+        sentence_words() -> List[List[str]]: Returns the words of every sentence used by the classic summarizer.
+        content_words() -> List[str]: Returns the words of the document used for keyword extraction.
+        term_counts() -> Counter: Counts the alphabetic words of the document.
+    """
+    text: str
+    language: str
+    sentence_spans: np.ndarray
+    tokens: np.ndarray
+    token_sentences: np.ndarray
+    alphabetic: np.ndarray
+    stopwords: np.ndarray
+    cased_stopwords: np.ndarray
+
+    def sentences(self) -> List[str]:
+        return [self.text[start:end] for start, end in self.sentence_spans.tolist()]
+
+    def sentence_words(self) -> List[List[str]]:
+        """
+        Returns the lowercased alphabetic words of every sentence, without the stop words as written in the text.
+        """
+        mask = self.alphabetic & ~self.cased_stopwords
+        boundaries = np.searchsorted(self.token_sentences[mask], np.arange(1, len(self.sentence_spans)))
+        return [words.tolist() for words in np.split(self.tokens[mask], boundaries)]
+
+    def content_words(self) -> List[str]:
+        """
+        Returns the lowercased alphabetic words of the document that are not stop words.
+        """
+        return self.tokens[self.alphabetic & ~self.stopwords].tolist()
+
+    def term_counts(self) -> Counter:
+        return Counter(self.tokens[self.alphabetic].tolist())
+
+
+def parse_document(text: str, language: str) -> ParsedDocument:
+    """
+    Tokenizes a document once: splits it into sentences with the Punkt tokenizer of its language,
+    splits every sentence into words and marks the alphabetic words and the stop words.
+
+    Args:
+        text (str): Document text.
+        language (str): Document language, as used by NLTK (e.g. 'russian', 'italian').
+
+    Returns:
+        ParsedDocument: Parsed document.
+    """
+    text = unicodedata.normalize('NFC', text)
+    sentence_spans = np.array(list(get_sentence_tokenizer(language).span_tokenize(text)), dtype=np.int64).reshape(-1, 2)
+
+    word_tokenizer = get_word_tokenizer()
+    tokens, token_sentences = [], []
+    for index, (start, end) in enumerate(sentence_spans.tolist()):
+        sentence_tokens = word_tokenizer.tokenize(text[start:end])
+        tokens.extend(sentence_tokens)
+        token_sentences.extend([index] * len(sentence_tokens))
+
+    stop_words = get_stop_words(language)
+    lowered = [token.lower() for token in tokens]
+    return ParsedDocument(
+        text=text,
+        language=language,
+        sentence_spans=sentence_spans,
+        tokens=np.array(lowered, dtype=object),
+        token_sentences=np.array(token_sentences, dtype=np.int64),
+        alphabetic=np.fromiter((token.isalpha() for token in tokens), dtype=bool, count=len(tokens)),
+        stopwords=np.fromiter((token in stop_words for token in lowered), dtype=bool, count=len(tokens)),
+        cased_stopwords=np.fromiter((token in stop_words for token in tokens), dtype=bool, count=len(tokens)),
+    )
@@ -0,0 +1,270 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+STORE_VERSION = 1
+STORE_FILENAME = 'document_frequency.json'
+JOURNAL_SUFFIX = '.journal'
+
+
+def text_hash(text: str) -> str:
+    """
+    Calculates the content hash of a text.
+
+    Args:
+        text (str): Text to hash.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class DocumentFrequencyStore:
+    """
+    The DocumentFrequencyStore class keeps the document frequency of terms over a corpus and can be updated one document at a time.
+    The terms of every document are remembered, so a document can be removed or replaced without recounting the whole corpus.
+    The store is saved to disk together with the hash of the corpus manifest and is loaded as is while the manifest is unchanged.
+    Changes made after the last save are appended to a journal next to the file with save_changes, so that a single document
+    does not rewrite the whole store. The journal is replayed on load and folded into the file once it grows long.
+
+    Attributes:
+        preprocess (Callable[[str, str], List[str]]): Function that turns a text and its language into a list of terms.
+        path (Optional[str]): File the store is saved to.
+        compact_after (int): Number of journal entries after which save_changes saves the whole store instead.
+        manifest_hash (Optional[str]): Hash of the corpus manifest the store was last synchronized with.
+        documents (Dict[str, dict]): Hash, language and distinct terms of every document, keyed by document key.
+        df (Counter): Number of documents that contain each term.
+
+    Methods:
+        add_document(key: str, text: str, language: str) -> None: Adds a document or replaces the document with the same key.
+        remove_document(key: str) -> None: Removes a document.
+        sync(manifest_path: str) -> bool: Brings the manifest documents in line with the corpus manifest.
+        save(path: Optional[str] = None) -> None: Saves the whole store to disk and clears the journal.
+        save_changes() -> None: Appends the changes made since the last save to the journal.
+        load(preprocess, path: str) -> DocumentFrequencyStore: Loads a saved store and replays its journal.
+        load_or_build(preprocess, manifest_path: str, path: Optional[str] = None) -> DocumentFrequencyStore: Loads the store and synchronizes it with the manifest.
+    """
+    MANIFEST_PREFIX = 'manifest:'
+    UPLOAD_PREFIX = 'upload:'
+
+    def __init__(self, preprocess: Callable[[str, str], List[str]], path: Optional[str] = None, compact_after: int = 1000):
+        self.preprocess = preprocess
+        self.path = path
+        self.compact_after = compact_after
+        self.manifest_hash = None
+        self.documents: Dict[str, dict] = {}
+        self.df = Counter()
+        self._lock = threading.Lock()
+        self._changes: List[dict] = []
+        self._journal_entries = 0
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.documents)
+
+    def add_document(self, key: str, text: str, language: str) -> None:
+        """
+        Adds a document to the store. A document with the same key is replaced.
+
+        Args:
+            key (str): Unique key of the document.
+            text (str): Document text.
+            language (str): Document language.
+        """
+        terms = sorted(set(self.preprocess(text, language)))
+        entry = {'hash': text_hash(text), 'language': language, 'terms': terms}
+        with self._lock:
+            self._add(key, entry)
+            self._record({'add': key, **entry})
+
+    def remove_document(self, key: str) -> None:
+        """
+        Removes a document from the store, if it is present.
+
+        Args:
+            key (str): Key of the document.
+        """
+        with self._lock:
+            if key in self.documents:
+                self._remove(key)
+                self._record({'remove': key})
+
+    def _record(self, change: dict) -> None:
+        if self.path:
+            self._changes.append(change)
+
+    def _add(self, key: str, entry: dict) -> None:
+        self._remove(key)
+        self.documents[key] = entry
+        self.df.update(entry['terms'])
+
+    def _remove(self, key: str) -> None:
+        entry = self.documents.pop(key, None)
+        if entry is None:
+            return
+        for term in entry['terms']:
+            self.df[term] -= 1
+            if self.df[term] <= 0:
+                del self.df[term]
+
+    def _replay(self, change: dict) -> None:
+        if 'remove' in change:
+            self._remove(change['remove'])
+        else:
+            self._add(change['add'], {'hash': change['hash'], 'language': change['language'], 'terms': change['terms']})
+
+    def sync(self, manifest_path: str) -> bool:
+        """
+        Synchronizes the documents listed in the corpus manifest. Nothing is read if the manifest hash is unchanged.
+        Otherwise only documents that were added, removed or whose content changed are processed.
+        A file listed several times counts as several documents, as it does when the corpus is counted from scratch.
+        Documents added through the API are kept.
+
+        Args:
+            manifest_path (str): Path to the JSON corpus manifest (texts_info.json).
+
+        Returns:
+            bool: True if the store was changed.
+        """
+        with open(manifest_path, 'rb') as file:
+            manifest = file.read()
+
+        manifest_hash = hashlib.sha256(manifest).hexdigest()
+        if manifest_hash == self.manifest_hash:
+            return False
+
+        listed_keys = set()
+        occurrences = Counter()
+        texts = {}
+        for entry in json.loads(manifest.decode('utf-8')):
+            text_file = entry['text_file']
+            key = self.MANIFEST_PREFIX + text_file
+            if occurrences[text_file]:
+                key += f"#{occurrences[text_file]}"
+            occurrences[text_file] += 1
+            listed_keys.add(key)
+
+            if text_file not in texts:
+                with open(text_file, 'r', encoding='utf-8') as file:
+                    texts[text_file] = file.read()
+            text = texts[text_file]
+
+            stored = self.documents.get(key)
+            if stored is None or stored['hash'] != text_hash(text) or stored['language'] != entry['language']:
+                self.add_document(key, text, entry['language'])
+
+        for key in list(self.documents):
+            if key.startswith(self.MANIFEST_PREFIX) and key not in listed_keys:
+                self.remove_document(key)
+
+        self.manifest_hash = manifest_hash
+        return True
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Saves the whole store to disk. The file is written to a unique temporary file first and then replaced atomically,
+        so processes saving at the same time do not overwrite each other's temporary files. The journal is cleared afterwards.
+
+        Args:
+            path (Optional[str]): File to save the store to. The path of the store is used by default.
+        """
+        path = path or self.path
+        with self._lock:
+            data = {'version': STORE_VERSION, 'manifest_hash': self.manifest_hash, 'documents': self.documents}
+            descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path), suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                    json.dump(data, file, ensure_ascii=False)
+                os.replace(temporary_path, path)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
+            if path == self.path:
+                try:
+                    os.remove(path + JOURNAL_SUFFIX)
+                except FileNotFoundError:
+                    pass
+                self._changes.clear()
+                self._journal_entries = 0
+
+    def save_changes(self) -> None:
+        """
+        Appends the documents added or removed since the last save to the journal of the store, one line per change.
+        Once the journal has compact_after entries, the whole store is saved instead.
+        """
+        with self._lock:
+            changes, self._changes = self._changes, []
+            if not changes:
+                return
+            lines = ''.join(json.dumps(change, ensure_ascii=False) + '\n' for change in changes)
+            with open(self.path + JOURNAL_SUFFIX, 'a', encoding='utf-8') as file:
+                file.write(lines)
+            self._journal_entries += len(changes)
+            compact = self._journal_entries >= self.compact_after
+        if compact:
+            self.save()
+
+    @classmethod
+    def load(cls, preprocess: Callable[[str, str], List[str]], path: str) -> "DocumentFrequencyStore":
+        """
+        Loads a store saved by save and replays the changes appended to its journal since.
+
+        Args:
+            preprocess (Callable[[str, str], List[str]]): Function that turns a text and its language into a list of terms.
+            path (str): File the store was saved to.
+
+        Returns:
+            DocumentFrequencyStore: The loaded store.
+        """
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if data.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported document frequency store version in '{path}': {data.get('version')}")
+
+        store = cls(preprocess, path)
+        store.manifest_hash = data['manifest_hash']
+        store.documents = data['documents']
+        for entry in store.documents.values():
+            store.df.update(entry['terms'])
+
+        try:
+            with open(path + JOURNAL_SUFFIX, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        continue
+                    store._replay(change)
+                    store._journal_entries += 1
+        except FileNotFoundError:
+            pass
+        return store
+
+    @classmethod
+    def load_or_build(cls, preprocess: Callable[[str, str], List[str]], manifest_path: str, path: Optional[str] = None) -> "DocumentFrequencyStore":
+        """
+        Loads the store saved next to the corpus manifest, or creates a new one, synchronizes it with the manifest
+        and saves it back if anything changed.
+
+        Args:
+            preprocess (Callable[[str, str], List[str]]): Function that turns a text and its language into a list of terms.
+            manifest_path (str): Path to the JSON corpus manifest (texts_info.json).
+            path (Optional[str]): File of the store. By default it is saved next to the manifest.
+
+        Returns:
+            DocumentFrequencyStore: Store synchronized with the manifest.
+        """
+        path = path or os.path.join(os.path.dirname(manifest_path), STORE_FILENAME)
+        try:
+            store = cls.load(preprocess, path)
+        except (FileNotFoundError, ValueError):
+            store = cls(preprocess, path)
+
+        if store.sync(manifest_path):
+            store.save()
+        return store
@@ -0,0 +1,167 @@
+import os
+import glob
+import shutil
+from src.models.models import InferenceBackend
+
+MODEL_CACHE_DIR = 'src/abstracting/model_cache'
+ONNX_FILES = ("encoder_model", "decoder_model", "decoder_with_past_model")
+
+
+def load_model(model_class, model_name: str, backend: InferenceBackend = InferenceBackend.TORCH, cache_dir: str = MODEL_CACHE_DIR):
+    """
+    Loads a sequence-to-sequence model for the selected inference backend.
+    All backends return an object with the same generate interface, so the summarizer does not depend on the backend.
+
+    Args:
+        model_class: Transformers model class used by the PyTorch backends (e.g. T5ForConditionalGeneration).
+        model_name (str): Name of the pretrained model.
+        backend (InferenceBackend): Inference backend (default is full-precision PyTorch).
+        cache_dir (str): Directory where exported models are cached.
+
+    Returns:
+        A model with a generate method.
+    """
+    if backend == InferenceBackend.TORCH_INT8:
+        return load_torch_int8_model(model_class, model_name)
+    if backend == InferenceBackend.ONNX_INT8:
+        return load_onnx_int8_model(model_name, cache_dir)
+    if backend == InferenceBackend.TORCH_MMAP:
+        return load_torch_mmap_model(model_class, model_name, cache_dir)
+    return model_class.from_pretrained(model_name)
+
+
+def load_torch_int8_model(model_class, model_name: str):
+    """
+    Loads a PyTorch model and applies dynamic int8 quantization to its linear layers.
+
+    Args:
+        model_class: Transformers model class.
+        model_name (str): Name of the pretrained model.
+
+    Returns:
+        The quantized PyTorch model.
+    """
+    import torch
+
+    model = model_class.from_pretrained(model_name)
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_mmap_weights(model_class, model_name: str, cache_dir: str = MODEL_CACHE_DIR) -> str:
+    """
+    Saves the weights of a model as a PyTorch state dict that can be memory-mapped.
+    The result is cached, and an existing export is reused.
+
+    Args:
+        model_class: Transformers model class.
+        model_name (str): Name of the pretrained model.
+        cache_dir (str): Directory where exported models are cached.
+
+    Returns:
+        str: Path to the weights file.
+    """
+    import torch
+
+    model_dir = os.path.join(cache_dir, model_name.replace("/", "--"))
+    weights_path = os.path.join(model_dir, "weights.pt")
+    if not os.path.exists(weights_path):
+        os.makedirs(model_dir, exist_ok=True)
+        torch.save(model_class.from_pretrained(model_name).state_dict(), weights_path + ".tmp")
+        os.replace(weights_path + ".tmp", weights_path)
+    return weights_path
+
+
+def load_torch_mmap_model(model_class, model_name: str, cache_dir: str = MODEL_CACHE_DIR):
+    """
+    Loads a PyTorch model whose parameters are memory-mapped from the exported weights file instead of copied into private memory.
+    The pages are backed by the file, so every process that loads the same file, or is forked after loading it, shares them.
+    The model is created on the meta device and the mapped tensors are assigned to it, so the weights are never allocated twice.
+
+    Args:
+        model_class: Transformers model class.
+        model_name (str): Name of the pretrained model.
+        cache_dir (str): Directory where exported models are cached.
+
+    Returns:
+        The PyTorch model in evaluation mode.
+    """
+    import torch
+    from transformers import GenerationConfig
+
+    weights_path = export_mmap_weights(model_class, model_name, cache_dir)
+    with torch.device("meta"):
+        model = model_class(model_class.config_class.from_pretrained(model_name))
+    model.load_state_dict(torch.load(weights_path, mmap=True, weights_only=True), assign=True)
+    model.tie_weights()
+
+    unloaded = [name for name, tensor in [*model.named_parameters(), *model.named_buffers()] if tensor.is_meta]
+    if unloaded:
+        raise ValueError(f"Weights file '{weights_path}' does not contain: {', '.join(unloaded)}")
+
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(model_name)
+    except OSError:
+        pass
+    model.eval()
+    return model
+
+
+def export_onnx_int8_model(model_name: str, cache_dir: str = MODEL_CACHE_DIR) -> str:
+    """
+    Exports a model to ONNX and quantizes its weights to int8 with dynamic quantization.
+    The result is cached, and an existing export is reused.
+
+    Args:
+        model_name (str): Name of the pretrained model.
+        cache_dir (str): Directory where exported models are cached.
+
+    Returns:
+        str: Directory of the quantized ONNX model.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    model_dir = os.path.join(cache_dir, model_name.replace("/", "--"))
+    export_dir = os.path.join(model_dir, "onnx")
+    quantized_dir = os.path.join(model_dir, "onnx-int8")
+    if os.path.isdir(quantized_dir):
+        return quantized_dir
+
+    if not os.path.isdir(export_dir):
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_merged=False)
+        model.save_pretrained(export_dir)
+
+    quantization_config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    for file_name in ONNX_FILES:
+        if os.path.exists(os.path.join(export_dir, f"{file_name}.onnx")):
+            quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=f"{file_name}.onnx")
+            quantizer.quantize(save_dir=quantized_dir + ".tmp", quantization_config=quantization_config)
+
+    for config_file in glob.glob(os.path.join(export_dir, "*.json")):
+        shutil.copy(config_file, quantized_dir + ".tmp")
+    os.replace(quantized_dir + ".tmp", quantized_dir)
+    return quantized_dir
+
+
+def load_onnx_int8_model(model_name: str, cache_dir: str = MODEL_CACHE_DIR):
+    """
+    Loads the int8-quantized ONNX export of a model into ONNX Runtime, exporting it first if it is not cached.
+
+    Args:
+        model_name (str): Name of the pretrained model.
+        cache_dir (str): Directory where exported models are cached.
+
+    Returns:
+        ORTModelForSeq2SeqLM: Model running on the ONNX Runtime CPU provider.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    quantized_dir = export_onnx_int8_model(model_name, cache_dir)
+    return ORTModelForSeq2SeqLM.from_pretrained(
+        quantized_dir,
+        encoder_file_name="encoder_model_quantized.onnx",
+        decoder_file_name="decoder_model_quantized.onnx",
+        decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+        provider="CPUExecutionProvider",
+    )
@@ -1,37 +1,94 @@
-import yake
-from nltk.corpus import stopwords
-from nltk import word_tokenize
+from typing import List, Optional, Tuple
+from .resources import get_keyword_extractor
+from .document import ParsedDocument, parse_document
+from .vectorized_keywords import score_keywords
+from .classic_abstract import TextSummarizer
+from src.models.models import KeywordBackend
 
 
-
-def extract_keywords(text: str, language: str) -> str:
+def extract_keywords(text: str, language: str, backend: KeywordBackend = KeywordBackend.YAKE,
+                     summarizer: Optional[TextSummarizer] = None) -> str:
     """
-    Extracts keywords from text using the YAKE library.
+    Extracts keywords from text using the YAKE library or the vectorized TF-IDF backend.
 
     Args:
         text (str): The text from which you need to extract keywords.
         language (str): The language of the text (e.g. 'ru' for Russian, 'en' for English).
                         The language must be specified in a format supported by the YAKE library.
+        backend (KeywordBackend): Keyword extraction backend (default is YAKE).
+        summarizer (Optional[TextSummarizer]): Classic summarizer whose corpus document frequencies are used by KeywordBackend.TFIDF.
 
     Returns:
         str: A string containing keywords separated by commas.
     """
-    preprocessed_text = preprocess_text(text, language)
+    return extract_document_keywords(parse_document(text, language), backend, summarizer)
+
+
+def extract_document_keywords(document: ParsedDocument, backend: KeywordBackend = KeywordBackend.YAKE,
+                              summarizer: Optional[TextSummarizer] = None) -> str:
+    """
+    Extracts keywords from a parsed document. YAKE is given the content words of the document joined by spaces.
 
-    custom_kw_extractor = yake.KeywordExtractor(lan=language, 
-                                                        n=2, 
-                                                        dedupLim=0.3, 
-                                                        dedupFunc='seqm', 
-                                                        windowsSize=1, 
-                                                        top=10, 
-                                                        features=None)
-    
-    keywords = custom_kw_extractor.extract_keywords(preprocessed_text)
+    Args:
+        document (ParsedDocument): Parsed document.
+        backend (KeywordBackend): Keyword extraction backend (default is YAKE).
+        summarizer (Optional[TextSummarizer]): Classic summarizer whose corpus document frequencies are used by KeywordBackend.TFIDF.
+
+    Returns:
+        str: A string containing keywords separated by commas.
+    """
+    if backend == KeywordBackend.TFIDF:
+        return extract_documents_keywords([document], backend, summarizer)[0]
+
+    keywords = get_keyword_extractor(document.language).extract_keywords(' '.join(document.content_words()))
 
     top_keywords = [kw[0] for kw in keywords]
     return ', '.join(top_keywords)
 
 
+def extract_keywords_many(texts: List[Tuple[str, str]], backend: KeywordBackend = KeywordBackend.YAKE,
+                          summarizer: Optional[TextSummarizer] = None) -> List[str]:
+    """
+    Extracts keywords from many texts with the shared stop words, tokenizers and extractors of their languages.
+    With KeywordBackend.TFIDF all texts are scored together in one batch.
+
+    Args:
+        texts (List[Tuple[str, str]]): Pairs of a text and its language.
+        backend (KeywordBackend): Keyword extraction backend (default is YAKE).
+        summarizer (Optional[TextSummarizer]): Classic summarizer whose corpus document frequencies are used by KeywordBackend.TFIDF.
+                                               Without it all words get the same IDF.
+
+    Returns:
+        List[str]: Keywords of each text separated by commas, in the order of texts.
+    """
+    return extract_documents_keywords([parse_document(text, language) for text, language in texts], backend, summarizer)
+
+
+def extract_documents_keywords(documents: List[ParsedDocument], backend: KeywordBackend = KeywordBackend.YAKE,
+                               summarizer: Optional[TextSummarizer] = None) -> List[str]:
+    """
+    Extracts keywords from many parsed documents. With KeywordBackend.TFIDF all documents are scored together in one batch.
+
+    Args:
+        documents (List[ParsedDocument]): Parsed documents.
+        backend (KeywordBackend): Keyword extraction backend (default is YAKE).
+        summarizer (Optional[TextSummarizer]): Classic summarizer whose corpus document frequencies are used by KeywordBackend.TFIDF.
+                                               Without it all words get the same IDF.
+
+    Returns:
+        List[str]: Keywords of each document separated by commas, in the order of documents.
+    """
+    if backend == KeywordBackend.TFIDF:
+        token_lists = [document.content_words() for document in documents]
+        if summarizer is None:
+            keywords = score_keywords(token_lists, {}, 0)
+        else:
+            keywords = score_keywords(token_lists, summarizer.df, summarizer.doc_count)
+        return [', '.join(document_keywords) for document_keywords in keywords]
+
+    return [extract_document_keywords(document) for document in documents]
+
+
 def preprocess_text(text: str, language: str) -> str:
     """
     Pre-processes text for further analysis by removing stop words and characters other than letters.
@@ -43,11 +100,4 @@ def preprocess_text(text: str, language: str) -> str:
     Returns:
         str: Pre-processed text consisting of words separated by spaces.
     """
-    words = word_tokenize(text.lower())
-
-    stop_words = set(stopwords.words(language))
-    words = [word for word in words if word.isalpha() and word not in stop_words]
-
-    return ' '.join(words)
-
- 
\ No newline at end of file
+    return ' '.join(parse_document(text, language).content_words())
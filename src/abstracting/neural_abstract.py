@@ -1,6 +1,19 @@
-import nltk
-from transformers import PegasusForConditionalGeneration, PegasusTokenizer, T5Tokenizer, T5ForConditionalGeneration
+import threading
+from collections import defaultdict
+from typing import List, Mapping, Optional, Tuple
+from transformers import PegasusForConditionalGeneration, PegasusTokenizerFast, T5TokenizerFast, T5ForConditionalGeneration
 from tqdm import tqdm
+from .inference_backends import load_model
+from .document import ParsedDocument, parse_document
+from src.metrics import span
+from src.models.models import InferenceBackend, PartSplitter
+
+MODEL_CLASSES = {
+    "russian": (T5TokenizerFast, T5ForConditionalGeneration, "UrukHan/t5-russian-summarization"),
+    "italian": (PegasusTokenizerFast, PegasusForConditionalGeneration, "google/pegasus-xsum"),
+}
+MAX_INPUT_TOKENS = 512
+LONG_SENTENCE_CHARS = 200
 
 class BilingualSummarizer:
     """
@@ -14,32 +27,72 @@ class BilingualSummarizer:
     and then summarize these parts, creating a final summary.
 
     Attributes:
+        models (dict): Loaded tokenizers and models, keyed by language.
         max_length (int): The maximum length of the final summarized text (default is 150).
         min_length (int): Minimum length of the final summarized text (default is 10).
+        token_budget (int): Maximum number of input tokens, padding included, in one generation batch (default is 4096).
+        max_batch_size (int): Maximum number of parts in one generation batch (default is 16).
+        backends (Mapping[str, InferenceBackend]): Inference backend of each language. Languages that are not listed use PyTorch.
+        splitters (Mapping[str, PartSplitter]): Part splitter of each language. Languages that are not listed use the token budget splitter.
 
     Methods:
-        __init__(max_length: int = 150, min_length: int = 10) -> None: Initializes the class with the specified maximum and minimum length of the summarize text.
+        __init__(max_length: int = 150, min_length: int = 10, lazy: bool = False, token_budget: int = 4096, max_batch_size: int = 16,
+                 backends: Optional[Mapping[str, InferenceBackend]] = None, splitters: Optional[Mapping[str, PartSplitter]] = None) -> None:
+            Initializes the class with the specified maximum and minimum length of the summarize text.
+            With lazy=True the models are loaded on the first request for their language.
+        load_language(language: str) -> dict: Loads the tokenizer and model for a language once and returns them.
         summarize_text(text: str, language: str) -> str: Performs summarization of the text for the specified language, splitting it into parts and summarizing each part.
-        split_text_into_parts(sentences: List[str], tokenizer, language: str, max_length: int = 300) -> List[str]: Splits text into parts depending on sentence length and model constraints.
+        summarize_texts(texts: List[Tuple[str, str]]) -> List[str]: Summarizes many texts, merging the parts of all texts of the same language into shared batches.
+        summarize_documents(documents: List[ParsedDocument]) -> List[str]: Summarizes many parsed documents in shared batches.
+        make_batches(input_ids: List[List[int]]) -> List[List[int]]: Groups tokenized parts into batches that fit the token budget.
+        summarize_batch(input_ids: List[List[int]], model, tokenizer) -> List[str]: Summarizes a batch of tokenized parts with one generate call.
+        split_text_into_parts(sentences: List[str], tokenizer, language: str, max_length: int = 300) -> List[List[int]]: Splits text into tokenized parts depending on sentence length and model constraints.
         summarize_part(part: str, model, tokenizer) -> str: Summarizes one part of text using the specified model and tokenizer.
     """
-    def __init__(self, max_length: int = 150, min_length: int = 10):
-        self.models = {
-            "russian": {
-                "tokenizer": T5Tokenizer.from_pretrained("UrukHan/t5-russian-summarization"),
-                "model": T5ForConditionalGeneration.from_pretrained("UrukHan/t5-russian-summarization")
-            },
-            "italian": {
-                "tokenizer": PegasusTokenizer.from_pretrained("google/pegasus-xsum"),
-                "model": PegasusForConditionalGeneration.from_pretrained("google/pegasus-xsum")
-            }
-        }
+    def __init__(self, max_length: int = 150, min_length: int = 10, lazy: bool = False,
+                 token_budget: int = 4096, max_batch_size: int = 16,
+                 backends: Optional[Mapping[str, InferenceBackend]] = None, splitters: Optional[Mapping[str, PartSplitter]] = None):
+        self.models = {}
+        self._locks = defaultdict(threading.Lock)
+        self.backends = dict(backends or {})
+        self.splitters = dict(splitters or {})
         self.max_length = max_length
         self.min_length = min_length
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+
+        if not lazy:
+            for language in MODEL_CLASSES:
+                self.load_language(language)
+
+    def load_language(self, language: str) -> dict:
+        """
+        Loads the tokenizer and model for the specified language if they are not loaded yet.
+        The model is loaded with the inference backend configured for the language.
+        Concurrent calls for the same language wait for one load instead of loading the model twice.
+
+        Args:
+            language (str): The language whose model should be loaded ("russian" or "italian").
+
+        Returns:
+            dict: A dictionary with the "tokenizer" and "model" for the language.
+        """
+        if language not in MODEL_CLASSES:
+            raise ValueError(f"Language '{language}' is not supported. Supported languages are: {', '.join(MODEL_CLASSES.keys())}")
+
+        if language not in self.models:
+            with self._locks[language]:
+                if language not in self.models:
+                    tokenizer_class, model_class, model_name = MODEL_CLASSES[language]
+                    self.models[language] = {
+                        "tokenizer": tokenizer_class.from_pretrained(model_name),
+                        "model": load_model(model_class, model_name, self.backends.get(language, InferenceBackend.TORCH))
+                    }
+        return self.models[language]
 
     def summarize_text(self, text: str, language: str) -> str:
         """
-        Summarizes the text based on the selected language. The text is broken into parts and each part is summarized separately.
+        Summarizes the text based on the selected language. The text is broken into parts and the parts are summarized in batches.
         The summarized parts are then combined into a final result.
 
         Args:
@@ -49,62 +102,143 @@ class BilingualSummarizer:
         Returns:
             str: Final summary of the text.
         """
-        if language not in self.models:
-            raise ValueError(f"Language '{language}' is not supported. Supported languages are: {', '.join(self.models.keys())}")
+        return self.summarize_texts([(text, language)])[0]
 
-        tokenizer = self.models[language]["tokenizer"]
-        model = self.models[language]["model"]
+    def summarize_texts(self, texts: List[Tuple[str, str]]) -> List[str]:
+        """
+        Summarizes many texts at once. The parts of all texts of the same language are sorted by length to reduce padding
+        and summarized in batches that fit the token budget, with one generate call per batch.
 
-        sentences = nltk.sent_tokenize(text)
-        parts = self.split_text_into_parts(sentences, tokenizer, language)
+        Args:
+            texts (List[Tuple[str, str]]): Pairs of a text and its language (“russian” or “italian”).
 
-        summaries = [
-            self.summarize_part(part, model, tokenizer)
-            for part in tqdm(parts, desc=f"Summarizing text in {language}")
-        ]
-        
-        final_summary = " ".join(summaries)
-        return final_summary
+        Returns:
+            List[str]: Final summary of each text, in the order of texts.
+        """
+        return self.summarize_documents([parse_document(text, language) for text, language in texts])
 
-    def split_text_into_parts(self, sentences: list, tokenizer, language: str, max_length: int = 300) -> list:
+    def summarize_documents(self, documents: List[ParsedDocument]) -> List[str]:
         """
-        Breaks the text into parts. For Russian - into pairs of sentences.
-        For other languages, into parts, each not exceeding max_length of tokens.
+        Summarizes many parsed documents at once, splitting them into tokenized parts along their sentence offsets.
+        The parts of all documents of the same language are summarized in shared batches.
+
+        Args:
+            documents (List[ParsedDocument]): Parsed documents in “russian” or “italian”.
+
+        Returns:
+            List[str]: Final summary of each document, in the order of documents.
+        """
+        parts_by_language = defaultdict(list)
+        for text_index, document in enumerate(documents):
+            tokenizer = self.load_language(document.language)["tokenizer"]
+            for part in self.split_text_into_parts(document.sentences(), tokenizer, document.language):
+                parts_by_language[document.language].append((text_index, part))
+
+        summaries = [[] for _ in documents]
+        for language, indexed_parts in parts_by_language.items():
+            resources = self.load_language(language)
+            tokenizer = resources["tokenizer"]
+            model = resources["model"]
+
+            input_ids = [part for _, part in indexed_parts]
+            part_summaries = [None] * len(indexed_parts)
+
+            for batch in tqdm(self.make_batches(input_ids), desc=f"Summarizing text in {language}"):
+                for part_index, summary in zip(batch, self.summarize_batch([input_ids[i] for i in batch], model, tokenizer)):
+                    part_summaries[part_index] = summary
+
+            for (text_index, _), summary in zip(indexed_parts, part_summaries):
+                summaries[text_index].append(summary)
+
+        return [" ".join(text_summaries) for text_summaries in summaries]
+
+    def make_batches(self, input_ids: List[List[int]]) -> List[List[int]]:
+        """
+        Groups tokenized parts into batches. Parts are sorted by length, and a batch grows while its padded size
+        (number of parts times the longest part) fits the token budget and the maximum batch size.
+
+        Args:
+            input_ids (List[List[int]]): Token IDs of every part.
+
+        Returns:
+            List[List[int]]: Batches of part indices.
+        """
+        order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]), reverse=True)
+        batches = []
+        for index in order:
+            if batches:
+                batch = batches[-1]
+                longest = len(input_ids[batch[0]])
+                if len(batch) < self.max_batch_size and (len(batch) + 1) * longest <= self.token_budget:
+                    batch.append(index)
+                    continue
+            batches.append([index])
+        return batches
+
+    def summarize_batch(self, input_ids: List[List[int]], model, tokenizer) -> List[str]:
+        """
+        Summarizes a batch of tokenized parts with a single generate call.
+
+        Args:
+            input_ids (List[List[int]]): Token IDs of the parts in the batch.
+            model: A model for text summarization.
+            tokenizer: Tokenizer used to pad the batch and decode the summaries.
+
+        Returns:
+            List[str]: Summarized sentence for each part.
+        """
+        inputs = tokenizer.pad({"input_ids": input_ids}, padding="longest", return_tensors="pt")
+
+        with span("generate", parts=len(input_ids), tokens=inputs["input_ids"].numel()):
+            summary_ids = model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_length=self.max_length,
+                min_length=self.min_length,
+                length_penalty=1.0,
+                num_beams=2,
+                early_stopping=True,
+                no_repeat_ngram_size=2
+            )
+
+        return tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+
+    def split_text_into_parts(self, sentences: list, tokenizer, language: str, max_length: int = 300) -> List[List[int]]:
+        """
+        Breaks the text into parts and returns the token IDs of every part, ready for generation.
+        All sentences are tokenized in one batched call, and the parts are packed from their token IDs,
+        so every sentence is tokenized exactly once.
+        The token budget splitter packs consecutive sentences into parts of at most max_length tokens;
+        the long sentences splitter makes a part of every sentence of at least LONG_SENTENCE_CHARS characters and drops the rest.
 
         Args:
             sentences (list): A list of sentences to be broken down into parts.
             tokenizer: Tokenizer used to convert text into tokens.
-            language (str): The language of the text that defines the logic of the partitioning.
-            max_length (int): Maximum length of one part (default is 300).
+            language (str): The language of the text that defines the splitter.
+            max_length (int): Maximum length of one part in tokens for the token budget splitter (default is 300).
 
         Returns:
-            list: A list of text parts, each of which does not exceed max_length tokens.
+            List[List[int]]: Token IDs of each part, with special tokens, truncated to MAX_INPUT_TOKENS.
         """
-        if language == "russian":
-            parts = [sentence for sentence in sentences if len(sentence) >= 200]
-            return parts
-        
+        if not sentences:
+            return []
+
+        sentence_ids = tokenizer(list(sentences), add_special_tokens=False)["input_ids"]
+        if self.splitters.get(language, PartSplitter.TOKEN_BUDGET) == PartSplitter.LONG_SENTENCES:
+            parts = [ids for sentence, ids in zip(sentences, sentence_ids) if len(sentence) >= LONG_SENTENCE_CHARS]
         else:
-            current_part = []
-            current_length = 0
             parts = []
-            
-            for sentence in sentences:
-                sentence_tokens = tokenizer.encode(sentence, add_special_tokens=False)
-                sentence_length = len(sentence_tokens)
-                
-                if current_length + sentence_length <= max_length:
-                    current_part.append(sentence)
-                    current_length += sentence_length
-                else:
-                    parts.append(" ".join(current_part))
-                    current_part = [sentence]
-                    current_length = sentence_length
-            
+            current_part = []
+            for ids in sentence_ids:
+                if current_part and len(current_part) + len(ids) > max_length:
+                    parts.append(current_part)
+                    current_part = []
+                current_part.extend(ids)
             if current_part:
-                parts.append(" ".join(current_part))
-            
-            return parts
+                parts.append(current_part)
+
+        max_tokens = MAX_INPUT_TOKENS - tokenizer.num_special_tokens_to_add()
+        return [tokenizer.build_inputs_with_special_tokens(ids[:max_tokens]) for ids in parts]
 
     def summarize_part(self, part: str, model, tokenizer) -> str:
         """
@@ -118,16 +252,5 @@ class BilingualSummarizer:
         Returns:
             str: Summarized sentence.
         """
-        inputs = tokenizer(part, return_tensors="pt", truncation=True, padding="longest", max_length=512)
-
-        summary_ids = model.generate(
-            inputs["input_ids"],
-            max_length=self.max_length,
-            min_length=self.min_length,
-            length_penalty=1.0,
-            num_beams=2,
-            early_stopping=True,
-            no_repeat_ngram_size=2
-        )
-
-        return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+        input_ids = tokenizer(part, truncation=True, max_length=MAX_INPUT_TOKENS)["input_ids"]
+        return self.summarize_batch([input_ids], model, tokenizer)[0]
@@ -0,0 +1,110 @@
+import yake
+from functools import lru_cache
+from typing import FrozenSet, List
+from nltk.corpus import stopwords
+from nltk.tokenize import NLTKWordTokenizer
+from nltk.tokenize.punkt import PunktTokenizer
+
+_word_tokenizer = NLTKWordTokenizer()
+
+
+@lru_cache(maxsize=None)
+def get_stop_words(language: str) -> FrozenSet[str]:
+    """
+    Returns the NLTK stop words of a language. They are read from the corpus files once per process.
+
+    Args:
+        language (str): Language name as used by NLTK (e.g. 'russian', 'italian').
+
+    Returns:
+        FrozenSet[str]: Stop words of the language.
+    """
+    return frozenset(stopwords.words(language))
+
+
+@lru_cache(maxsize=None)
+def get_sentence_tokenizer(language: str = "english") -> PunktTokenizer:
+    """
+    Returns the Punkt sentence tokenizer of a language. The model is loaded once per process.
+
+    Args:
+        language (str): Model name in the Punkt corpus.
+
+    Returns:
+        PunktTokenizer: Sentence tokenizer.
+    """
+    return PunktTokenizer(language)
+
+
+@lru_cache(maxsize=None)
+def supports_language(language: str) -> bool:
+    """
+    Checks whether the NLTK resources of a language, its Punkt model and its stop words, are available.
+
+    Args:
+        language (str): Language name as used by NLTK.
+
+    Returns:
+        bool: True if documents of the language can be parsed.
+    """
+    try:
+        get_sentence_tokenizer(language)
+        get_stop_words(language)
+    except (LookupError, OSError):
+        return False
+    return True
+
+
+def get_word_tokenizer() -> NLTKWordTokenizer:
+    """
+    Returns the shared word tokenizer, the one used by nltk.word_tokenize. It does not depend on the language.
+    """
+    return _word_tokenizer
+
+
+@lru_cache(maxsize=None)
+def get_keyword_extractor(language: str) -> yake.KeywordExtractor:
+    """
+    Returns the configured YAKE keyword extractor of a language. It is created once per process and reused for every text.
+
+    Args:
+        language (str): The language of the texts.
+
+    Returns:
+        yake.KeywordExtractor: Keyword extractor.
+    """
+    return yake.KeywordExtractor(lan=language,
+                                 n=2,
+                                 dedupLim=0.3,
+                                 dedupFunc='seqm',
+                                 windowsSize=1,
+                                 top=10,
+                                 features=None)
+
+
+def tokenize_sentences(text: str, language: str = "english") -> List[str]:
+    """
+    Splits text into sentences, the same way as nltk.sent_tokenize, with the shared tokenizer of the language.
+
+    Args:
+        text (str): Text to split.
+        language (str): Model name in the Punkt corpus.
+
+    Returns:
+        List[str]: Sentences of the text.
+    """
+    return get_sentence_tokenizer(language).tokenize(text)
+
+
+def tokenize_words(text: str, language: str = "english") -> List[str]:
+    """
+    Splits text into words, the same way as nltk.word_tokenize, with the shared tokenizers of the language.
+
+    Args:
+        text (str): Text to split.
+        language (str): Model name in the Punkt corpus.
+
+    Returns:
+        List[str]: Tokens of the text.
+    """
+    return [token for sentence in tokenize_sentences(text, language) for token in _word_tokenizer.tokenize(sentence)]
@@ -0,0 +1,77 @@
+import numpy as np
+from typing import List, Mapping
+
+POSITION_WEIGHT = 0.5
+
+
+def score_keywords(token_lists: List[List[str]], df: Mapping[str, int], doc_count: int, top: int = 10) -> List[List[str]]:
+    """
+    Selects the keywords of many documents at once. Candidates are the words and the pairs of adjacent words of each document.
+    A candidate is scored by its term frequency in the document, its smoothed IDF over the corpus and the position of its first occurrence,
+    so that terms that are frequent in the document, rare in the corpus and appear early rank first.
+    The document frequency of a pair is estimated as the smaller document frequency of its two words.
+    All documents are encoded as integer arrays and scored together with a few NumPy operations.
+
+    Args:
+        token_lists (List[List[str]]): Preprocessed words of every document (lowercase, without stop words).
+        df (Mapping[str, int]): Number of corpus documents that contain each word.
+        doc_count (int): Number of corpus documents.
+        top (int): Number of keywords selected for each document.
+
+    Returns:
+        List[List[str]]: Keywords of each document, best first. A word is skipped if a better-ranked pair already contains it.
+    """
+    lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    if not lengths.sum():
+        return [[] for _ in token_lists]
+
+    vocabulary = {}
+    word_ids = np.array([vocabulary.setdefault(token, len(vocabulary)) for tokens in token_lists for token in tokens], dtype=np.int64)
+    words = list(vocabulary)
+    word_count = len(words)
+
+    documents = np.repeat(np.arange(len(token_lists)), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    positions = (np.arange(len(word_ids)) - starts[documents]) / lengths[documents]
+    same_document = documents[1:] == documents[:-1]
+    pair_ids = word_count + word_ids[:-1][same_document] * word_count + word_ids[1:][same_document]
+
+    candidate_keys = np.concatenate((word_ids, pair_ids))
+    candidate_documents = np.concatenate((documents, documents[:-1][same_document]))
+    candidate_positions = np.concatenate((positions, positions[:-1][same_document]))
+    candidates, candidate_ids = np.unique(candidate_keys, return_inverse=True)
+
+    # Occurrences of a candidate are stored in the order of their positions, so after a stable sort the first entry of each group is the first occurrence.
+    flat = candidate_documents * len(candidates) + candidate_ids
+    order = np.argsort(flat, kind="stable")
+    sorted_flat = flat[order]
+    first = np.concatenate(([0], np.flatnonzero(np.diff(sorted_flat)) + 1))
+    counts = np.diff(np.append(first, len(sorted_flat)))
+    rows, columns = np.divmod(sorted_flat[first], len(candidates))
+    first_positions = candidate_positions[order[first]]
+
+    word_df = np.array([df.get(word, 0) for word in words], dtype=np.float64)
+    is_pair = candidates >= word_count
+    first_words, second_words = np.divmod(np.where(is_pair, candidates - word_count, 0), word_count)
+    candidate_df = np.where(is_pair, np.minimum(word_df[first_words], word_df[second_words]), word_df[np.where(is_pair, 0, candidates)])
+    idf = np.log((doc_count + 1) / (candidate_df + 1)) + 1
+
+    scores = counts / lengths[rows] * idf[columns] * (1 - POSITION_WEIGHT * first_positions)
+
+    order = np.lexsort((-scores, rows))
+    rows, columns = rows[order], columns[order]
+    row_starts = np.searchsorted(rows, rows, side="left")
+    shortlisted = np.arange(len(rows)) - row_starts < 3 * top
+
+    keywords = [[] for _ in token_lists]
+    covered = [set() for _ in token_lists]
+    for row, column in zip(rows[shortlisted].tolist(), columns[shortlisted].tolist()):
+        if len(keywords[row]) == top:
+            continue
+        if is_pair[column]:
+            pair = (words[first_words[column]], words[second_words[column]])
+            keywords[row].append(" ".join(pair))
+            covered[row].update(pair)
+        elif words[candidates[column]] not in covered[row]:
+            keywords[row].append(words[candidates[column]])
+    return keywords
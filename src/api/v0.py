@@ -1,19 +1,53 @@
+import json
 import time
-from fastapi import APIRouter, UploadFile, HTTPException, Form, Depends, File
-from typing import List
-from ..abstracting.keywords_abstracting import extract_keywords
+import secrets
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi import APIRouter, UploadFile, HTTPException, Form, Depends, File, Request
+from typing import List, Optional
 from ..abstracting.classic_abstract import TextSummarizer
-from ..recognition.controller import resolve, RecognitionMethod
+from ..recognition.controller import extract_text, recognize_batch, RecognitionMethod
+from ..models.models import HtmlParser, StreamFormat, KeywordBackend
 from ..abstracting.neural_abstract import BilingualSummarizer
-from ..utils import load_documents_and_languages
+from ..registry import ModelRegistry
+from ..pipeline import Pipeline
+from ..jobs import JobManager, JobQueueFull, read_archive, read_directory
 
 
-def get_summarizer() -> TextSummarizer:
-    documents, languages = load_documents_and_languages()
-    return TextSummarizer(documents, languages)
+def get_registry(request: Request) -> ModelRegistry:
+    return request.app.state.registry
 
-def get_mbart_summarizer() -> BilingualSummarizer:
-    return BilingualSummarizer()
+def get_pipeline(request: Request) -> Pipeline:
+    return request.app.state.pipeline
+
+def get_jobs(request: Request) -> JobManager:
+    return request.app.state.jobs
+
+def single_process(request: Request) -> None:
+    """
+    Rejects requests that change the state of one process only, when the application runs in several pre-forked workers.
+    """
+    if getattr(request.app.state, "prefork", False):
+        raise HTTPException(status_code=409, detail="Недоступно при работе в нескольких процессах. "
+                                                    "Для перезагрузки отправьте SIGHUP родительскому процессу.")
+
+def require_admin(request: Request) -> None:
+    """
+    Admits requests that carry the admin token of the application in the "Authorization: Bearer <token>" header.
+    Without a configured token (the ADMIN_TOKEN environment variable) the admin endpoints are disabled.
+    """
+    admin_token = getattr(request.app.state, "admin_token", None)
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Администрирование отключено: токен не задан.")
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode("utf-8"), admin_token.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Неверный токен администратора.", headers={"WWW-Authenticate": "Bearer"})
+
+def get_summarizer(registry: ModelRegistry = Depends(get_registry)) -> TextSummarizer:
+    return registry.summarizer
+
+def get_mbart_summarizer(registry: ModelRegistry = Depends(get_registry)) -> BilingualSummarizer:
+    return registry.bilingual_summarizer
 
 def create_router() -> APIRouter:
     query_router = APIRouter()
@@ -21,44 +55,123 @@ def create_router() -> APIRouter:
     @query_router.post("/upload-html/")
     async def query(files: List[UploadFile] = File(...), 
                     method: RecognitionMethod = Form(...),
-                    summarizer: TextSummarizer = Depends(get_summarizer),
-                    bilingual_summarizer: BilingualSummarizer = Depends(get_mbart_summarizer)):
-        results = []
-
+                    parser: HtmlParser = Form(HtmlParser.HTML_PARSER),
+                    detection_chars: Optional[int] = Form(None, gt=0),
+                    confidence_threshold: Optional[float] = Form(None, ge=0, le=1),
+                    keyword_backend: KeywordBackend = Form(KeywordBackend.YAKE),
+                    pipeline: Pipeline = Depends(get_pipeline)):
         for file in files:
             if file.content_type != "text/html":
                 raise HTTPException(status_code=400, detail=f"Неверный формат файла: {file.filename}. Ожидается HTML.")
-            
-            start_time = time.perf_counter()
-            language, extracted_text = await resolve(file, method)
-            extraction_time = time.perf_counter() - start_time
-
-            start_time = time.perf_counter()
-            keywords_summary = extract_keywords(extracted_text, language)
-            keywords_time = time.perf_counter() - start_time
-
-            start_time = time.perf_counter()
-            classic_summary = summarizer.summarize(extracted_text, language)
-            classic_time = time.perf_counter() - start_time
-
-            start_time = time.perf_counter()
-            neural_summary = bilingual_summarizer.summarize_text(extracted_text, language)
-            neural_time = time.perf_counter() - start_time
-
-            results.append({
-                "filename": file.filename,
-                "language": language,
-                "classic_summary": classic_summary,
-                "keywords_summary": keywords_summary,
-                "neural_summary": neural_summary,
-                "times": {
-                    "extraction_time": extraction_time,
-                    "keywords_time": keywords_time,
-                    "classic_time": classic_time,
-                    "neural_time": neural_time
-                }
-            })
+
+        try:
+            results = await pipeline.process(files, method, parser, detection_chars, confidence_threshold, keyword_backend)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         return {"results": results}
 
+    @query_router.post("/upload-html/stream")
+    async def query_stream(files: List[UploadFile] = File(...),
+                           method: RecognitionMethod = Form(...),
+                           parser: HtmlParser = Form(HtmlParser.HTML_PARSER),
+                           detection_chars: Optional[int] = Form(None, gt=0),
+                           confidence_threshold: Optional[float] = Form(None, ge=0, le=1),
+                           keyword_backend: KeywordBackend = Form(KeywordBackend.YAKE),
+                           stream_format: StreamFormat = Form(StreamFormat.NDJSON),
+                           pipeline: Pipeline = Depends(get_pipeline)):
+        for file in files:
+            if file.content_type != "text/html":
+                raise HTTPException(status_code=400, detail=f"Неверный формат файла: {file.filename}. Ожидается HTML.")
+
+        async def encode_events():
+            async for event in pipeline.iter_events(files, method, parser, detection_chars, confidence_threshold, keyword_backend):
+                data = json.dumps(event, ensure_ascii=False)
+                if stream_format == StreamFormat.SSE:
+                    yield f"event: {event['stage']}\ndata: {data}\n\n"
+                else:
+                    yield data + "\n"
+
+        media_type = "text/event-stream" if stream_format == StreamFormat.SSE else "application/x-ndjson"
+        return StreamingResponse(encode_events(), media_type=media_type)
+
+    @query_router.post("/jobs", status_code=202)
+    async def submit_job(files: Optional[List[UploadFile]] = File(None),
+                         archive: Optional[UploadFile] = File(None),
+                         directory: Optional[str] = Form(None),
+                         method: RecognitionMethod = Form(...),
+                         parser: HtmlParser = Form(HtmlParser.HTML_PARSER),
+                         detection_chars: Optional[int] = Form(None, gt=0),
+                         confidence_threshold: Optional[float] = Form(None, ge=0, le=1),
+                         keyword_backend: KeywordBackend = Form(KeywordBackend.YAKE),
+                         jobs: JobManager = Depends(get_jobs)):
+        documents = []
+        for file in files or []:
+            if file.content_type != "text/html":
+                raise HTTPException(status_code=400, detail=f"Неверный формат файла: {file.filename}. Ожидается HTML.")
+            documents.append((file.filename, (await file.read()).decode("utf-8", errors="replace")))
+
+        try:
+            if archive is not None:
+                documents.extend(await run_in_threadpool(read_archive, await archive.read(), jobs.max_bytes))
+            if directory:
+                documents.extend(await run_in_threadpool(read_directory, directory, jobs.directory_root, jobs.max_bytes))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if not documents:
+            raise HTTPException(status_code=400, detail="Не найдено ни одного HTML-документа.")
+
+        try:
+            job_id = await jobs.submit(documents, method, parser, detection_chars, confidence_threshold, keyword_backend)
+        except JobQueueFull as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "60"})
+
+        return {"job_id": job_id, "documents": len(documents)}
+
+    @query_router.get("/jobs/{job_id}")
+    async def job_status(job_id: str, jobs: JobManager = Depends(get_jobs)):
+        job = await run_in_threadpool(jobs.store.get_job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Задача не найдена: {job_id}.")
+        return job
+
+    @query_router.get("/jobs/{job_id}/results")
+    async def job_results(job_id: str, offset: int = 0, limit: Optional[int] = None,
+                          jobs: JobManager = Depends(get_jobs)):
+        job = await run_in_threadpool(jobs.store.get_job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Задача не найдена: {job_id}.")
+        results = await run_in_threadpool(jobs.store.get_results, job_id, offset, limit)
+        return {"job_id": job_id, "status": job["status"], "results": results}
+
+    @query_router.post("/corpus/documents", dependencies=[Depends(require_admin), Depends(single_process)])
+    async def add_corpus_documents(files: List[UploadFile] = File(...),
+                                   method: RecognitionMethod = Form(RecognitionMethod.NGRAM),
+                                   parser: HtmlParser = Form(HtmlParser.HTML_PARSER),
+                                   registry: ModelRegistry = Depends(get_registry),
+                                   summarizer: TextSummarizer = Depends(get_summarizer)):
+        for file in files:
+            if file.content_type != "text/html":
+                raise HTTPException(status_code=400, detail=f"Неверный формат файла: {file.filename}. Ожидается HTML.")
+
+        extracted_texts = [await extract_text(file, parser) for file in files]
+        try:
+            recognition = await run_in_threadpool(recognize_batch, extracted_texts, method, registry.classifier)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        documents = []
+        for file, extracted_text, language in zip(files, extracted_texts, recognition.labels):
+            key = await run_in_threadpool(summarizer.add_document, extracted_text, language)
+            documents.append({"filename": file.filename, "language": language, "key": key})
+
+        return {"documents": documents, "doc_count": summarizer.doc_count}
+
+    @query_router.post("/admin/reload", dependencies=[Depends(require_admin), Depends(single_process)])
+    async def reload(registry: ModelRegistry = Depends(get_registry)):
+        start_time = time.perf_counter()
+        await run_in_threadpool(registry.reload)
+        return {"status": "reloaded", "reload_time": time.perf_counter() - start_time}
+
     return query_router
@@ -0,0 +1,379 @@
+import os
+import json
+import time
+import argparse
+import logging
+import tempfile
+import multiprocessing
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+from .registry import ModelRegistry
+from .abstracting.neural_abstract import BilingualSummarizer, MODEL_CLASSES
+from .abstracting.keywords_abstracting import extract_document_keywords, extract_documents_keywords
+from .abstracting.document import ParsedDocument, parse_document
+from .abstracting.resources import supports_language
+from .recognition.controller import recognize_batch, language_scores
+from .recognition.extraction import extract_html_text
+from .jobs import HTML_EXTENSIONS
+from .models.models import RecognitionMethod, HtmlParser, InferenceBackend, KeywordBackend, PartSplitter
+from .utils import PATH, language_option
+
+logger = logging.getLogger(__name__)
+
+_registry: Optional[ModelRegistry] = None
+_options: Dict = {}
+
+
+def iter_directory(path: str) -> Iterator[Dict]:
+    """
+    Lists the HTML files of a directory tree without reading them.
+
+    Args:
+        path (str): Root directory.
+
+    Yields:
+        Dict: Item with the path relative to the root as "id" and the absolute path as "path", in sorted order.
+    """
+    for root, directories, filenames in os.walk(path):
+        directories.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(HTML_EXTENSIONS):
+                file_path = os.path.join(root, filename)
+                yield {"id": os.path.relpath(file_path, path), "path": os.path.abspath(file_path)}
+
+
+def iter_jsonl(path: str, id_field: str = "id", text_field: str = "text") -> Iterator[Dict]:
+    """
+    Reads documents from a JSONL file line by line.
+    A record is taken as HTML if it has an "html" field, as a path to an HTML file if it has a "path" field,
+    and as plain text from text_field otherwise.
+
+    Args:
+        path (str): JSONL file.
+        id_field (str): Field with the identifier of the record. The line number is used if it is missing.
+        text_field (str): Field with the plain text of the record.
+
+    Yields:
+        Dict: Item with "id" and one of "html", "path" or "text".
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            item = {"id": str(record.get(id_field, line_number))}
+            if "html" in record:
+                item["html"] = record["html"]
+            elif "path" in record:
+                item["path"] = record["path"]
+            else:
+                item["text"] = record.get(text_field, "")
+            yield item
+
+
+def load_completed(output_path: str, retry_failed: bool = False) -> Set[str]:
+    """
+    Collects the identifiers already written to an output file, so that an interrupted run can be resumed.
+    A partially written last line left by the interruption is cut off. With retry_failed, the records of failed documents
+    are removed from the file, so that their new results replace them instead of being added next to them.
+
+    Args:
+        output_path (str): JSONL output file.
+        retry_failed (bool): If True, documents that ended with an error are not counted as completed.
+
+    Returns:
+        Set[str]: Identifiers of the completed documents.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    kept_lines, failed = [], 0
+    with open(output_path, 'rb+') as file:
+        valid_size = 0
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            valid_size += len(line)
+            record = json.loads(line)
+            if retry_failed and "error" in record:
+                failed += 1
+                continue
+            completed.add(record["id"])
+            kept_lines.append(line)
+        file.truncate(valid_size)
+
+    if failed:
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            file.writelines(kept_lines)
+        os.replace(temporary_path, output_path)
+    return completed
+
+
+def init_batch_worker(corpus_path: str, method: RecognitionMethod, parser: HtmlParser, skip_neural: bool,
+                      keyword_backend: KeywordBackend = KeywordBackend.YAKE) -> None:
+    """
+    Initializes a worker process: builds the corpus statistics and the language classifier once per process.
+    The neural models are never loaded in workers: the parsed documents are sent back to the main process instead.
+
+    Args:
+        corpus_path (str): Path to the corpus manifest.
+        method (RecognitionMethod): The method for recognizing the language of the texts.
+        parser (HtmlParser): HTML parser backend.
+        skip_neural (bool): If True, neural summaries are not produced and no documents are sent back.
+        keyword_backend (KeywordBackend): Keyword extraction backend.
+    """
+    global _registry, _options
+    _registry = ModelRegistry(corpus_path, lazy=True)
+    _options = {"method": method, "parser": parser, "skip_neural": skip_neural, "keyword_backend": keyword_backend}
+
+
+def _read_text(item: Dict, parser: HtmlParser) -> str:
+    if "text" in item:
+        return item["text"]
+    html = item.get("html")
+    if html is None:
+        with open(item["path"], 'r', encoding='utf-8', errors='replace') as file:
+            html = file.read()
+    return extract_html_text(html, parser)
+
+
+def process_chunk(items: List[Dict]) -> Tuple[List[Dict], List[Tuple[int, ParsedDocument]]]:
+    """
+    Processes a chunk of documents in a worker process: extraction, language detection of the whole chunk in one batch,
+    parsing of every document once, keywords and classic summaries. The parsed documents are returned for summarize_chunk,
+    which produces the neural summaries in the main process.
+    recognition_time and, with the TF-IDF keyword backend, keywords_time are the times of the batch the document was part of.
+    A document that fails gets an "error" field instead of its results; the rest of the chunk is not affected.
+    The summaries of a language the stages do not support (no NLTK resources, or no neural model) are None.
+
+    Args:
+        items (List[Dict]): Items produced by iter_directory or iter_jsonl.
+
+    Returns:
+        Tuple[List[Dict], List[Tuple[int, ParsedDocument]]]: Result of each document, in the order of items,
+                                                             and the documents left to summarize with their indices.
+    """
+    results = [{"id": item["id"]} for item in items]
+    texts = {}
+    for index, item in enumerate(items):
+        start_time = time.perf_counter()
+        try:
+            texts[index] = _read_text(item, _options["parser"])
+        except Exception as e:
+            results[index]["error"] = f"extraction: {e}"
+            continue
+        results[index]["times"] = {"extraction_time": time.perf_counter() - start_time}
+
+    indices = list(texts)
+    if not indices:
+        return results, []
+
+    start_time = time.perf_counter()
+    try:
+        recognition = recognize_batch([texts[i] for i in indices], _options["method"], _registry.classifier)
+    except Exception as e:
+        for index in indices:
+            results[index] = {"id": items[index]["id"], "error": f"recognition: {e}"}
+        return results, []
+    recognition_time = time.perf_counter() - start_time
+
+    documents = {}
+    for index, language, scores in zip(indices, recognition.labels, recognition.scores):
+        result = results[index]
+        result["language"] = language
+        result["language_scores"] = language_scores(recognition.languages, scores)
+        result["times"]["recognition_time"] = recognition_time
+        if not supports_language(language):
+            result.update(keywords_summary=None, classic_summary=None, neural_summary=None)
+            continue
+        try:
+            documents[index] = parse_document(texts[index], language)
+        except Exception as e:
+            result["error"] = f"parsing: {e}"
+    indices = list(documents)
+
+    keyword_backend = _options["keyword_backend"]
+    batch_keywords = None
+    if keyword_backend == KeywordBackend.TFIDF:
+        start_time = time.perf_counter()
+        try:
+            batch_keywords = extract_documents_keywords([documents[i] for i in indices], keyword_backend, _registry.summarizer)
+        except Exception:
+            batch_keywords = None
+        keywords_time = time.perf_counter() - start_time
+
+    for position, index in enumerate(indices):
+        result = results[index]
+        try:
+            if batch_keywords is not None:
+                result["keywords_summary"] = batch_keywords[position]
+                result["times"]["keywords_time"] = keywords_time
+            else:
+                start_time = time.perf_counter()
+                result["keywords_summary"] = extract_document_keywords(documents[index], keyword_backend, _registry.summarizer)
+                result["times"]["keywords_time"] = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            result["classic_summary"] = _registry.summarizer.summarize_document(documents[index])
+            result["times"]["classic_time"] = time.perf_counter() - start_time
+        except Exception as e:
+            result["error"] = str(e)
+
+    if _options["skip_neural"]:
+        return results, []
+    for index in indices:
+        if documents[index].language not in MODEL_CLASSES:
+            results[index]["neural_summary"] = None
+    return results, [(index, documents[index]) for index in indices
+                     if "error" not in results[index] and documents[index].language in MODEL_CLASSES]
+
+
+def summarize_chunk(summarizer: BilingualSummarizer, results: List[Dict], documents: List[Tuple[int, ParsedDocument]]) -> List[Dict]:
+    """
+    Adds the neural summaries of a chunk processed by process_chunk, in token-budgeted batches over the whole chunk.
+    If the batch fails, the documents are summarized one by one, so that only the failing documents get an error.
+    neural_time is the time of the batch the document was part of.
+
+    Args:
+        summarizer (BilingualSummarizer): Neural summarizer of the main process.
+        results (List[Dict]): Results of the chunk.
+        documents (List[Tuple[int, ParsedDocument]]): Documents to summarize with their indices in results.
+
+    Returns:
+        List[Dict]: The results.
+    """
+    start_time = time.perf_counter()
+    try:
+        summaries = summarizer.summarize_documents([document for _, document in documents])
+    except Exception:
+        summaries = None
+    neural_time = time.perf_counter() - start_time
+
+    for position, (index, document) in enumerate(documents):
+        result = results[index]
+        if summaries is not None:
+            result["neural_summary"] = summaries[position]
+            result["times"]["neural_time"] = neural_time
+            continue
+        start_time = time.perf_counter()
+        try:
+            result["neural_summary"] = summarizer.summarize_documents([document])[0]
+            result["times"]["neural_time"] = time.perf_counter() - start_time
+        except Exception as e:
+            result["error"] = f"neural: {e}"
+    return results
+
+
+def _iter_chunks(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(items: Iterable[Dict], output_path: str, method: RecognitionMethod, parser: HtmlParser = HtmlParser.HTML_PARSER,
+              processes: Optional[int] = None, chunk_size: int = 16, corpus_path: str = PATH,
+              backends: Optional[Mapping[str, InferenceBackend]] = None, skip_neural: bool = False,
+              retry_failed: bool = False, keyword_backend: KeywordBackend = KeywordBackend.YAKE,
+              splitters: Optional[Mapping[str, PartSplitter]] = None) -> Dict[str, int]:
+    """
+    Processes documents with a pool of worker processes and appends every result to a JSONL file as soon as its chunk is done.
+    The neural models are loaded once, in the main process, which summarizes the parsed documents of each chunk while
+    the workers go on with the next chunks; loading them in every worker would hold one copy per process.
+    Documents already present in the output file are skipped, so an interrupted run continues where it stopped.
+    At most two chunks per process are in flight, so the input is read lazily.
+
+    Args:
+        items (Iterable[Dict]): Items produced by iter_directory or iter_jsonl.
+        output_path (str): JSONL output file.
+        method (RecognitionMethod): The method for recognizing the language of the texts.
+        parser (HtmlParser): HTML parser backend.
+        processes (Optional[int]): Number of worker processes (default is the number of CPUs).
+        chunk_size (int): Number of documents sent to a worker at a time.
+        corpus_path (str): Path to the corpus manifest.
+        backends (Optional[Mapping[str, InferenceBackend]]): Inference backend of the neural summarization model of each language.
+        skip_neural (bool): If True, neural summaries are not produced.
+        retry_failed (bool): If True, documents that ended with an error in a previous run are processed again.
+        keyword_backend (KeywordBackend): Keyword extraction backend.
+        splitters (Optional[Mapping[str, PartSplitter]]): Part splitter of the neural summarization of each language.
+
+    Returns:
+        Dict[str, int]: Numbers of skipped, processed and failed documents.
+    """
+    completed = load_completed(output_path, retry_failed)
+    counts = {"skipped": 0, "processed": 0, "failed": 0}
+
+    def pending_items() -> Iterator[Dict]:
+        for item in items:
+            if item["id"] in completed:
+                counts["skipped"] += 1
+            else:
+                yield item
+
+    processes = processes or os.cpu_count()
+    context = multiprocessing.get_context("spawn")
+    initargs = (corpus_path, method, parser, skip_neural, keyword_backend)
+    summarizer = None if skip_neural else BilingualSummarizer(lazy=True, backends=backends, splitters=splitters)
+
+    with context.Pool(processes, initializer=init_batch_worker, initargs=initargs) as pool, \
+            open(output_path, 'a', encoding='utf-8') as output:
+        in_flight = deque()
+
+        def write_oldest() -> None:
+            results, documents = in_flight.popleft().get()
+            if documents:
+                results = summarize_chunk(summarizer, results, documents)
+            for result in results:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                counts["failed" if "error" in result else "processed"] += 1
+            output.flush()
+
+        for chunk in _iter_chunks(pending_items(), chunk_size):
+            in_flight.append(pool.apply_async(process_chunk, (chunk,)))
+            if len(in_flight) >= 2 * processes:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+
+    return counts
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Processes a directory of HTML files or a JSONL file without the HTTP service.")
+    arg_parser.add_argument("input", help="Directory with HTML files or a JSONL file.")
+    arg_parser.add_argument("output", help="JSONL file the results are appended to. Existing results are skipped.")
+    arg_parser.add_argument("--method", type=RecognitionMethod, default=RecognitionMethod.NGRAM, choices=list(RecognitionMethod))
+    arg_parser.add_argument("--parser", type=HtmlParser, default=HtmlParser.HTML_PARSER, choices=list(HtmlParser))
+    arg_parser.add_argument("--keyword-backend", type=KeywordBackend, default=KeywordBackend.YAKE, choices=list(KeywordBackend))
+    arg_parser.add_argument("--processes", type=int, help="Number of worker processes (default is the number of CPUs).")
+    arg_parser.add_argument("--chunk-size", type=int, default=16, help="Number of documents sent to a worker at a time.")
+    arg_parser.add_argument("--corpus", default=PATH, help="Path to the corpus manifest (texts_info.json).")
+    arg_parser.add_argument("--id-field", default="id", help="Identifier field of JSONL records.")
+    arg_parser.add_argument("--text-field", default="text", help="Plain text field of JSONL records without an html or path field.")
+    arg_parser.add_argument("--backend", type=language_option(InferenceBackend), action="append", default=[], metavar="LANGUAGE=BACKEND",
+                            help=f"Inference backend of the neural summarization of a language, one of: {', '.join(b.value for b in InferenceBackend)}. "
+                                 "Can be repeated.")
+    arg_parser.add_argument("--splitter", type=language_option(PartSplitter), action="append", default=[], metavar="LANGUAGE=SPLITTER",
+                            help=f"Part splitter of the neural summarization of a language, one of: {', '.join(s.value for s in PartSplitter)}. "
+                                 "Can be repeated.")
+    arg_parser.add_argument("--skip-neural", action="store_true", help="Do not produce neural summaries.")
+    arg_parser.add_argument("--retry-failed", action="store_true", help="Process documents that failed in a previous run again.")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if os.path.isdir(args.input):
+        input_items = iter_directory(args.input)
+    else:
+        input_items = iter_jsonl(args.input, args.id_field, args.text_field)
+
+    start = time.perf_counter()
+    summary = run_batch(input_items, args.output, args.method, args.parser, args.processes, args.chunk_size,
+                        args.corpus, backends=dict(args.backend), skip_neural=args.skip_neural, retry_failed=args.retry_failed,
+                        keyword_backend=args.keyword_backend, splitters=dict(args.splitter))
+    logger.info("Done in %.1f s: %s", time.perf_counter() - start, summary)
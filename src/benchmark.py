@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .recognition.controller import recognize_batch
+from .recognition.extraction import extract_html_text
+from .recognition.neural import LanguageClassifier
+from .models.models import RecognitionMethod, KeywordBackend
+from .utils import load_documents_and_languages, PATH
+
+logger = logging.getLogger(__name__)
+
+TEST_DOCUMENTS = ('tests/doc_1.html', 'tests/doc_2.html')
+BASELINE_PATH = 'src/benchmark_baseline.json'
+SCALES = (1_000, 10_000, 100_000)
+STAGES = ('extraction', 'alphabet', 'ngram', 'neural_recognition', 'keywords_yake', 'keywords_tfidf', 'classic', 'neural_summary')
+
+# (documents, languages, HTML sources or None)
+InputSet = Tuple[List[str], List[str], Optional[List[str]]]
+
+
+def synthesize(texts: Sequence[str], languages: Sequence[str], size: int, seed: int = 0) -> Tuple[List[str], List[str]]:
+    """
+    Builds one synthetic document of about size characters per language by sampling sentences of the given texts.
+
+    Args:
+        texts (Sequence[str]): Source texts.
+        languages (Sequence[str]): Language of each source text.
+        size (int): Target length of each document in characters.
+        seed (int): Seed of the sentence sampling.
+
+    Returns:
+        Tuple[List[str], List[str]]: Synthetic documents and their languages.
+    """
+    rng = random.Random(seed)
+    documents, document_languages = [], []
+    for language in sorted(set(languages)):
+        sentences = [sentence.strip() + "." for text, text_language in zip(texts, languages) if text_language == language
+                     for sentence in text.split(".") if sentence.strip()]
+        if not sentences:
+            continue
+        parts, length = [], 0
+        while length < size:
+            sentence = rng.choice(sentences)
+            parts.append(sentence)
+            length += len(sentence) + 1
+        documents.append(" ".join(parts))
+        document_languages.append(language)
+    return documents, document_languages
+
+
+def load_inputs(corpus_path: str = PATH, corpus_documents: int = 20, scales: Sequence[int] = SCALES) -> Dict[str, InputSet]:
+    """
+    Loads the benchmark inputs: the test HTML documents, the first documents of the corpus and synthetic documents of every scale.
+    The languages of the test documents are detected with the n-gram method. The corpus is skipped if it cannot be read.
+
+    Args:
+        corpus_path (str): Path to the corpus manifest.
+        corpus_documents (int): Maximum number of corpus documents.
+        scales (Sequence[int]): Lengths of the synthetic documents in characters.
+
+    Returns:
+        Dict[str, InputSet]: Documents, languages and HTML sources (None if there are none) of every input set.
+    """
+    html = []
+    for path in TEST_DOCUMENTS:
+        with open(path, 'r', encoding='utf-8') as file:
+            html.append(file.read())
+    texts = [extract_html_text(source) for source in html]
+    inputs = {"tests": (texts, list(recognize_batch(texts, RecognitionMethod.NGRAM).labels), html)}
+
+    try:
+        documents, languages = load_documents_and_languages(corpus_path)
+        inputs["corpus"] = (documents[:corpus_documents], languages[:corpus_documents], None)
+    except OSError as e:
+        logger.warning("Corpus is not available, skipping it: %s", e)
+
+    source_texts, source_languages = [], []
+    for documents, languages, _ in inputs.values():
+        source_texts.extend(documents)
+        source_languages.extend(languages)
+    for size in scales:
+        documents, languages = synthesize(source_texts, source_languages, size)
+        inputs[f"synthetic_{size}"] = (documents, languages, None)
+    return inputs
+
+
+def build_stages(names: Sequence[str], corpus_path: str = PATH) -> Dict[str, Callable[[str, str, Optional[str]], object]]:
+    """
+    Creates the benchmarked stages. Every stage is called with the text, its language and its HTML source (or None).
+    Stages whose models cannot be loaded are skipped with a warning.
+
+    Args:
+        names (Sequence[str]): Names of the stages to create, from STAGES.
+        corpus_path (str): Path to the corpus manifest the classic summarizer and the TF-IDF keywords are built from.
+
+    Returns:
+        Dict[str, Callable[[str, str, Optional[str]], object]]: Stage functions by name.
+    """
+    stages = {}
+    names = list(names)
+    summarizer = None
+    if {'classic', 'keywords_tfidf'} & set(names):
+        from .abstracting.classic_abstract import TextSummarizer
+        try:
+            summarizer = TextSummarizer.from_corpus(corpus_path)
+        except (OSError, LookupError) as e:
+            logger.warning("Corpus is not available, skipping the classic and TF-IDF keyword stages: %s", e)
+            names = [name for name in names if name not in ('classic', 'keywords_tfidf')]
+
+    for name in names:
+        if name == 'extraction':
+            stages[name] = lambda text, language, html: extract_html_text(html) if html is not None else None
+        elif name == 'alphabet':
+            stages[name] = lambda text, language, html: recognize_batch([text], RecognitionMethod.ALPHABET)
+        elif name == 'ngram':
+            stages[name] = lambda text, language, html: recognize_batch([text], RecognitionMethod.NGRAM)
+        elif name == 'neural_recognition':
+            try:
+                classifier = LanguageClassifier.load()
+            except FileNotFoundError:
+                logger.warning("Language classifier artifact not found, skipping neural recognition.")
+                continue
+            stages[name] = lambda text, language, html, classifier=classifier: recognize_batch([text], RecognitionMethod.NEURAL, classifier)
+        elif name in ('keywords_yake', 'keywords_tfidf'):
+            from .abstracting.keywords_abstracting import extract_keywords
+            backend = KeywordBackend.YAKE if name == 'keywords_yake' else KeywordBackend.TFIDF
+            stages[name] = lambda text, language, html, backend=backend: extract_keywords(text, language, backend, summarizer)
+        elif name == 'classic':
+            stages[name] = lambda text, language, html: summarizer.summarize(text, language)
+        elif name == 'neural_summary':
+            try:
+                from .abstracting.neural_abstract import BilingualSummarizer, MODEL_CLASSES
+                bilingual_summarizer = BilingualSummarizer(lazy=True)
+                for language in MODEL_CLASSES:
+                    bilingual_summarizer.load_language(language)
+            except (ImportError, OSError) as e:
+                logger.warning("Neural summarization models are not available, skipping neural summaries: %s", e)
+                continue
+            stages[name] = lambda text, language, html: bilingual_summarizer.summarize_text(text, language)
+    return stages
+
+
+def measure(stage: Callable[[str, str, Optional[str]], object], input_set: InputSet, repeats: int = 3) -> Optional[Dict]:
+    """
+    Measures one stage on one input set. Latencies are taken over repeats passes over the documents after a warm-up pass,
+    and the peak memory is taken from a separate pass under tracemalloc, so that tracing does not affect the latencies.
+
+    Args:
+        stage (Callable[[str, str, Optional[str]], object]): Stage function.
+        input_set (InputSet): Documents, languages and HTML sources.
+        repeats (int): Number of timed passes.
+
+    Returns:
+        Optional[Dict]: Throughput in documents and characters per second, p50 and p99 latency in milliseconds
+                        and peak traced memory in megabytes, or None if the stage does not apply to the input set.
+    """
+    documents, languages, html = input_set
+    html = html or [None] * len(documents)
+    if stage(documents[0], languages[0], html[0]) is None:
+        return None
+
+    latencies = []
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for arguments in zip(documents, languages, html):
+            document_start = time.perf_counter()
+            stage(*arguments)
+            latencies.append(time.perf_counter() - document_start)
+    total_time = time.perf_counter() - start_time
+
+    tracemalloc.start()
+    for arguments in zip(documents, languages, html):
+        stage(*arguments)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "documents": len(documents),
+        "chars": sum(len(document) for document in documents),
+        "throughput_docs_per_s": repeats * len(documents) / total_time,
+        "throughput_chars_per_s": repeats * sum(len(document) for document in documents) / total_time,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "peak_memory_mb": peak_memory / 2 ** 20,
+    }
+
+
+def run_benchmark(stage_names: Sequence[str] = STAGES, corpus_path: str = PATH, corpus_documents: int = 20,
+                  scales: Sequence[int] = SCALES, repeats: int = 3) -> Dict:
+    """
+    Runs every stage over every input set.
+
+    Args:
+        stage_names (Sequence[str]): Names of the stages to run, from STAGES.
+        corpus_path (str): Path to the corpus manifest.
+        corpus_documents (int): Maximum number of corpus documents.
+        scales (Sequence[int]): Lengths of the synthetic documents in characters.
+        repeats (int): Number of timed passes.
+
+    Returns:
+        Dict: Environment description and the measurements keyed by stage and input set.
+    """
+    inputs = load_inputs(corpus_path, corpus_documents, scales)
+    stages = build_stages(stage_names, corpus_path)
+
+    results = {}
+    for name, stage in stages.items():
+        results[name] = {}
+        for input_name, input_set in inputs.items():
+            logger.info("Measuring %s on %s", name, input_name)
+            measurement = measure(stage, input_set, repeats)
+            if measurement is not None:
+                results[name][input_name] = measurement
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = 0.25) -> List[str]:
+    """
+    Compares measurements with a baseline. A measurement regresses if its p50 latency or peak memory grows,
+    or its throughput drops, by more than the tolerance.
+
+    Args:
+        results (Dict): Output of run_benchmark.
+        baseline (Dict): Earlier output of run_benchmark.
+        tolerance (float): Allowed relative change.
+
+    Returns:
+        List[str]: Description of every regression.
+    """
+    regressions = []
+    for stage, inputs in results["results"].items():
+        for input_name, current in inputs.items():
+            previous = baseline.get("results", {}).get(stage, {}).get(input_name)
+            if previous is None:
+                continue
+            for metric in ("p50_ms", "peak_memory_mb"):
+                if current[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(f"{stage}/{input_name}: {metric} {previous[metric]:.3f} -> {current[metric]:.3f}")
+            metric = "throughput_docs_per_s"
+            if current[metric] < previous[metric] / (1 + tolerance):
+                regressions.append(f"{stage}/{input_name}: {metric} {previous[metric]:.3f} -> {current[metric]:.3f}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures throughput, latency and memory of every pipeline stage.")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES, help="Stages to measure.")
+    parser.add_argument("--corpus", default=PATH, help="Path to the corpus manifest (texts_info.json).")
+    parser.add_argument("--corpus-documents", type=int, default=20, help="Maximum number of corpus documents.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES), help="Lengths of the synthetic documents in characters.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of timed passes over every input set.")
+    parser.add_argument("--output", help="File to save the results to as JSON.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results to compare with.")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change before a regression is reported.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = run_benchmark(args.stages, args.corpus, args.corpus_documents, args.scales, args.repeats)
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            logger.warning("Regression: %s", regression)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,146 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+def make_key(text: str, stage: str, *versions: Any) -> str:
+    """
+    Builds a content-addressed cache key from the text, the pipeline stage and the versions of everything the stage output depends on.
+
+    Args:
+        text (str): Extracted text of the document.
+        stage (str): Name of the pipeline stage (e.g. "language", "keywords").
+        *versions (Any): Recognition method, model names, configuration values and other inputs of the stage.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest identifying the stage output.
+    """
+    digest = hashlib.sha256()
+    digest.update(stage.encode("utf-8"))
+    for version in versions:
+        digest.update(b"\0" + str(version).encode("utf-8"))
+    digest.update(b"\0" + text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache of pipeline stage outputs with a bounded in-memory LRU tier and an optional SQLite tier on disk.
+    Values must be JSON-serializable. Entries found only on disk are promoted to memory.
+    The disk tier uses write-ahead logging, and inserts are committed in batches rather than one by one,
+    so entries written since the last commit are lost if the process crashes.
+
+    Attributes:
+        max_entries (int): Maximum number of entries kept in memory.
+        db_path (Optional[str]): Path to the SQLite database of the disk tier, or None to keep the cache in memory only.
+        commit_every (int): Number of inserts after which they are committed.
+        commit_interval (float): Seconds after which pending inserts are committed by the next put.
+
+    Methods:
+        get(key: str) -> Tuple[bool, Any]: Looks a key up in memory, then on disk.
+        put(key: str, value: Any) -> None: Stores a value in memory and on disk.
+        flush() -> None: Commits the pending inserts.
+        close() -> None: Commits the pending inserts and closes the database.
+        clear() -> None: Removes all entries from both tiers.
+    """
+    def __init__(self, max_entries: int = 1024, db_path: Optional[str] = None, commit_every: int = 64, commit_interval: float = 1.0):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+        if db_path:
+            self._connection = sqlite3.connect(db_path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._connection.commit()
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Looks a key up in memory, then on disk.
+
+        Args:
+            key (str): Cache key built by make_key.
+
+        Returns:
+            Tuple[bool, Any]: Whether the key was found, and the cached value (None if it was not found).
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True, self._entries[key]
+
+            if self._connection is not None:
+                row = self._connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    return True, value
+
+        return False, None
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Stores a value in memory and, if the disk tier is enabled, on disk.
+
+        Args:
+            key (str): Cache key built by make_key.
+            value (Any): JSON-serializable stage output.
+        """
+        with self._lock:
+            self._remember(key, value)
+            if self._connection is not None:
+                self._connection.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                                         (key, json.dumps(value, ensure_ascii=False)))
+                self._pending += 1
+                if self._pending >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval:
+                    self._commit()
+
+    def _commit(self) -> None:
+        self._connection.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def flush(self) -> None:
+        """
+        Commits the inserts that are still pending to disk.
+        """
+        with self._lock:
+            if self._connection is not None and self._pending:
+                self._commit()
+
+    def close(self) -> None:
+        """
+        Commits the pending inserts and closes the database. The in-memory tier stays usable.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._commit()
+                self._connection.close()
+                self._connection = None
+
+    def clear(self) -> None:
+        """
+        Removes all entries from both tiers.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM results")
+                self._commit()
@@ -0,0 +1,494 @@
+import io
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import tarfile
+import zipfile
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from .recognition.extraction import extract_html_text
+from .metrics import observe_times, INPUT_BYTES, TEXT_CHARS
+from .models.models import RecognitionMethod, HtmlParser, JobStatus, KeywordBackend
+
+if TYPE_CHECKING:
+    from .pipeline import Pipeline
+
+JOBS_DB_PATH = "jobs.sqlite3"
+HTML_EXTENSIONS = ('.html', '.htm')
+MAX_JOB_BYTES = 100 * 2 ** 20
+
+# Document statuses written by earlier versions of the store.
+_LEGACY_STATUSES = {'pending': JobStatus.QUEUED, 'done': JobStatus.COMPLETED}
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when a job would exceed the maximum number of documents waiting to be processed.
+    """
+
+
+def _check_size(total: int, max_bytes: int) -> None:
+    if total > max_bytes:
+        raise ValueError(f"The documents exceed the limit of {max_bytes} bytes.")
+
+
+def read_archive(data: bytes, max_bytes: int = MAX_JOB_BYTES) -> List[Tuple[str, str]]:
+    """
+    Reads the HTML documents of a zip or tar archive (compressed tar archives are supported).
+
+    Args:
+        data (bytes): Contents of the archive.
+        max_bytes (int): Maximum total size of the extracted documents.
+
+    Returns:
+        List[Tuple[str, str]]: Name and HTML of every .html or .htm member, in archive order.
+
+    Raises:
+        ValueError: If the data is neither a zip nor a tar archive, or the documents exceed max_bytes.
+    """
+    documents, total = [], 0
+    if zipfile.is_zipfile(io.BytesIO(data)):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(HTML_EXTENSIONS):
+                    _check_size(total + info.file_size, max_bytes)
+                    with archive.open(info) as member:
+                        content = member.read(max_bytes - total + 1)
+                    total += len(content)
+                    _check_size(total, max_bytes)
+                    documents.append((info.filename, content.decode("utf-8", errors="replace")))
+        return documents
+
+    try:
+        with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(HTML_EXTENSIONS):
+                    total += member.size
+                    _check_size(total, max_bytes)
+                    documents.append((member.name, archive.extractfile(member).read().decode("utf-8", errors="replace")))
+    except tarfile.TarError:
+        raise ValueError("Archive must be a zip or tar file.")
+    return documents
+
+
+def read_directory(path: str, root: Optional[str], max_bytes: int = MAX_JOB_BYTES) -> List[Tuple[str, str]]:
+    """
+    Reads the HTML documents of a directory tree on the server. Only directories inside the allowed root can be read:
+    paths are resolved with symbolic links, and files that resolve outside the root are rejected.
+
+    Args:
+        path (str): Directory on the server, absolute or relative to the root.
+        root (Optional[str]): Directory that submitted directories must be inside. If None, directories cannot be read.
+        max_bytes (int): Maximum total size of the documents.
+
+    Returns:
+        List[Tuple[str, str]]: Path relative to the directory and HTML of every .html or .htm file, sorted by path.
+
+    Raises:
+        ValueError: If reading directories is disabled, the path is not a directory inside the root,
+                    or the documents exceed max_bytes.
+    """
+    if root is None:
+        raise ValueError("Reading directories on the server is disabled.")
+
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root or not os.path.isdir(resolved):
+        raise ValueError(f"Directory not found: {path}")
+    path = resolved
+
+    documents, total = [], 0
+    for directory, directories, filenames in os.walk(path):
+        directories.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(HTML_EXTENSIONS):
+                file_path = os.path.join(directory, filename)
+                if os.path.commonpath([root, os.path.realpath(file_path)]) != root:
+                    raise ValueError(f"File is outside the allowed directory: {os.path.relpath(file_path, path)}")
+                total += os.path.getsize(file_path)
+                _check_size(total, max_bytes)
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+                    documents.append((os.path.relpath(file_path, path), file.read()))
+    return documents
+
+
+class JobStore:
+    """
+    SQLite store of jobs and their documents. The HTML of a document is kept until it is processed,
+    so that queued and interrupted documents can be picked up again after a restart.
+    Jobs and documents share the JobStatus values: a document is queued, running, completed or failed.
+    The methods block on the database, so async code calls them in a thread.
+
+    Attributes:
+        db_path (str): Path to the SQLite database.
+
+    Methods:
+        create_job(params: Dict, documents: List[Tuple[str, str]]) -> str: Stores a new job with its documents.
+        pending_count() -> int: Returns the number of documents waiting to be processed.
+        claim_next() -> Optional[Dict]: Marks the oldest pending document as running and returns it.
+        complete_document(job_id: str, index: int, result: Dict) -> None: Stores the result of a document.
+        fail_document(job_id: str, index: int, error: str) -> None: Marks a document as failed.
+        requeue_running(pid: Optional[int] = None) -> int: Returns interrupted documents to the queue.
+        get_job(job_id: str) -> Optional[Dict]: Returns the status, progress and stage times of a job.
+        get_results(job_id: str, offset: int, limit: Optional[int]) -> Optional[List[Dict]]: Returns the results of a job.
+    """
+    def __init__(self, db_path: str = JOBS_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                times TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                html TEXT,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS documents_status ON documents (status);
+        """)
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(documents)")]
+        if "claimed_by" not in columns:
+            self._connection.execute("ALTER TABLE documents ADD COLUMN claimed_by INTEGER")
+        for legacy, status in _LEGACY_STATUSES.items():
+            self._connection.execute("UPDATE documents SET status = ? WHERE status = ?", (status.value, legacy))
+        self._connection.commit()
+
+    def create_job(self, params: Dict, documents: List[Tuple[str, str]], max_pending: Optional[int] = None) -> str:
+        """
+        Stores a new job with its documents.
+
+        Args:
+            params (Dict): Processing parameters of the job.
+            documents (List[Tuple[str, str]]): Name and HTML of every document.
+            max_pending (Optional[int]): If set, the job is rejected when it would make more documents than this wait in the queue.
+
+        Returns:
+            str: Identifier of the job.
+
+        Raises:
+            JobQueueFull: If the queue has no room for the documents.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if max_pending is not None:
+                pending = self._connection.execute("SELECT COUNT(*) FROM documents WHERE status = ?", (JobStatus.QUEUED.value,)).fetchone()[0]
+                if pending + len(documents) > max_pending:
+                    raise JobQueueFull(f"{pending} documents are already queued, the limit is {max_pending}.")
+
+            self._connection.execute("INSERT INTO jobs (id, params, times, created_at) VALUES (?, ?, ?, ?)",
+                                     (job_id, json.dumps(params), "{}", time.time()))
+            self._connection.executemany(
+                "INSERT INTO documents (job_id, idx, name, html, status) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, index, name, html, JobStatus.QUEUED.value) for index, (name, html) in enumerate(documents)])
+            self._connection.commit()
+        return job_id
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM documents WHERE status = ?", (JobStatus.QUEUED.value,)).fetchone()[0]
+
+    def claim_next(self) -> Optional[Dict]:
+        """
+        Marks the oldest pending document as running by the current process and returns it.
+        The document is read and marked in one write transaction, so processes sharing the database never claim the same document.
+
+        Returns:
+            Optional[Dict]: Job identifier, document index, name, HTML and job parameters, or None if nothing is pending.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            row = self._connection.execute(
+                "SELECT d.job_id, d.idx, d.name, d.html, j.params FROM documents d JOIN jobs j ON j.id = d.job_id "
+                "WHERE d.status = ? ORDER BY j.created_at, d.idx LIMIT 1", (JobStatus.QUEUED.value,)).fetchone()
+            if row is None:
+                self._connection.rollback()
+                return None
+
+            job_id, index, name, html, params = row
+            self._connection.execute("UPDATE documents SET status = ?, claimed_by = ? WHERE job_id = ? AND idx = ?",
+                                     (JobStatus.RUNNING.value, os.getpid(), job_id, index))
+            self._connection.execute("UPDATE jobs SET started_at = COALESCE(started_at, ?) WHERE id = ?", (time.time(), job_id))
+            self._connection.commit()
+        return {"job_id": job_id, "index": index, "name": name, "html": html, "params": json.loads(params)}
+
+    def _finish_document(self, job_id: str, index: int, status: JobStatus, result: Optional[Dict], error: Optional[str]) -> None:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE documents SET status = ?, result = ?, error = ?, html = NULL WHERE job_id = ? AND idx = ?",
+                (status.value, None if result is None else json.dumps(result, ensure_ascii=False), error, job_id, index))
+
+            if result is not None:
+                times = json.loads(self._connection.execute("SELECT times FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+                for name, value in result["times"].items():
+                    if isinstance(value, (int, float)):
+                        times[name] = times.get(name, 0.0) + value
+                self._connection.execute("UPDATE jobs SET times = ? WHERE id = ?", (json.dumps(times), job_id))
+
+            unfinished = self._connection.execute(
+                "SELECT COUNT(*) FROM documents WHERE job_id = ? AND status IN (?, ?)",
+                (job_id, JobStatus.QUEUED.value, JobStatus.RUNNING.value)).fetchone()[0]
+            if not unfinished:
+                self._connection.execute("UPDATE jobs SET finished_at = ? WHERE id = ?", (time.time(), job_id))
+            self._connection.commit()
+
+    def complete_document(self, job_id: str, index: int, result: Dict) -> None:
+        """
+        Stores the result of a document, adds its stage times to the job and drops its HTML.
+
+        Args:
+            job_id (str): Identifier of the job.
+            index (int): Index of the document in the job.
+            result (Dict): JSON-serializable result with a "times" dictionary.
+        """
+        self._finish_document(job_id, index, JobStatus.COMPLETED, result, None)
+
+    def fail_document(self, job_id: str, index: int, error: str) -> None:
+        """
+        Marks a document as failed and drops its HTML.
+
+        Args:
+            job_id (str): Identifier of the job.
+            index (int): Index of the document in the job.
+            error (str): Description of the error.
+        """
+        self._finish_document(job_id, index, JobStatus.FAILED, None, error)
+
+    def requeue_running(self, pid: Optional[int] = None) -> int:
+        """
+        Returns the documents that were running when the service stopped to the queue.
+
+        Args:
+            pid (Optional[int]): If set, only the documents claimed by this process are requeued, e.g. after it has exited.
+
+        Returns:
+            int: Number of requeued documents.
+        """
+        query = "UPDATE documents SET status = ?, claimed_by = NULL WHERE status = ?"
+        params = [JobStatus.QUEUED.value, JobStatus.RUNNING.value]
+        if pid is not None:
+            query += " AND claimed_by = ?"
+            params.append(pid)
+        with self._lock:
+            cursor = self._connection.execute(query, params)
+            self._connection.commit()
+            return cursor.rowcount
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """
+        Returns the status, progress and stage times of a job.
+        A finished job is failed if all of its documents failed, and completed otherwise.
+        The stage times are the sums of the per-document times over the processed documents;
+        queue_time and total_time are measured from the submission of the job.
+
+        Args:
+            job_id (str): Identifier of the job.
+
+        Returns:
+            Optional[Dict]: Job description, or None if there is no such job.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT params, times, created_at, started_at, finished_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._connection.execute(
+                "SELECT status, COUNT(*) FROM documents WHERE job_id = ? GROUP BY status", (job_id,)).fetchall())
+
+        params, times, created_at, started_at, finished_at = row
+        if counts and counts.get(JobStatus.FAILED.value, 0) == sum(counts.values()):
+            status = JobStatus.FAILED
+        elif finished_at is not None or not counts:
+            status = JobStatus.COMPLETED
+        elif started_at is not None:
+            status = JobStatus.RUNNING
+        else:
+            status = JobStatus.QUEUED
+
+        times = json.loads(times)
+        if started_at is not None:
+            times["queue_time"] = started_at - created_at
+        if finished_at is not None:
+            times["total_time"] = finished_at - created_at
+
+        return {
+            "job_id": job_id,
+            "status": status.value,
+            "params": json.loads(params),
+            "documents": {
+                "total": sum(counts.values()),
+                **{document_status.value: counts.get(document_status.value, 0) for document_status in JobStatus},
+            },
+            "created_at": created_at,
+            "times": times,
+        }
+
+    def get_results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[List[Dict]]:
+        """
+        Returns the results of the documents of a job, in submission order.
+
+        Args:
+            job_id (str): Identifier of the job.
+            offset (int): Number of documents to skip.
+            limit (Optional[int]): Maximum number of documents to return (all by default).
+
+        Returns:
+            Optional[List[Dict]]: Name and status of every document with its result or error, or None if there is no such job.
+        """
+        with self._lock:
+            if self._connection.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+                return None
+            rows = self._connection.execute(
+                "SELECT name, status, result, error FROM documents WHERE job_id = ? ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, -1 if limit is None else limit, offset)).fetchall()
+
+        results = []
+        for name, status, result, error in rows:
+            entry = {"filename": name, "status": status}
+            if result is not None:
+                entry.update(json.loads(result))
+            if error is not None:
+                entry["detail"] = error
+            results.append(entry)
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class JobManager:
+    """
+    Processes submitted jobs in the background with a pool of asyncio workers that share the Pipeline.
+    Each worker takes the oldest pending document from the JobStore, so documents are processed in submission order
+    and interrupted documents are resumed after a restart.
+
+    Attributes:
+        pipeline (Pipeline): Pipeline that runs the stages of the documents.
+        store (JobStore): Persistent store of jobs and documents.
+        workers (int): Number of documents processed at the same time.
+        max_pending (int): Maximum number of documents waiting in the queue. Larger submissions are rejected with JobQueueFull.
+        recover (bool): If True, documents left running by a previous run are requeued on start. Processes that share
+                        the database with other running processes must not do this, since the documents may still be in progress.
+        directory_root (Optional[str]): Directory on the server that jobs may read documents from. None disables reading directories.
+        max_bytes (int): Maximum total size of the documents read from an archive or a directory for one job.
+
+    Methods:
+        start() -> None: Requeues interrupted documents and starts the workers.
+        close() -> None: Stops the workers.
+        submit(documents: List[Tuple[str, str]], method: RecognitionMethod, ...) -> str: Queues a job.
+    """
+    def __init__(self, pipeline: "Pipeline", db_path: str = JOBS_DB_PATH, workers: int = 2, max_pending: int = 1000, recover: bool = True,
+                 directory_root: Optional[str] = None, max_bytes: int = MAX_JOB_BYTES):
+        self.pipeline = pipeline
+        self.store = JobStore(db_path)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.recover = recover
+        self.directory_root = directory_root
+        self.max_bytes = max_bytes
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self.recover:
+            self.store.requeue_running()
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.store.close()
+
+    async def submit(self, documents: List[Tuple[str, str]], method: RecognitionMethod, parser: HtmlParser = HtmlParser.HTML_PARSER,
+               detection_chars: Optional[int] = None, confidence_threshold: Optional[float] = None,
+               keyword_backend: KeywordBackend = KeywordBackend.YAKE) -> str:
+        """
+        Queues a job and wakes the workers. The documents are stored in a thread, so the event loop is not blocked.
+
+        Args:
+            documents (List[Tuple[str, str]]): Name and HTML of every document.
+            method (RecognitionMethod): The method for recognizing the language of the texts.
+            parser (HtmlParser): HTML parser backend.
+            detection_chars (Optional[int]): If set, only this many first characters of each text are analyzed.
+            confidence_threshold (Optional[float]): If set, progressive detection with this threshold is used.
+            keyword_backend (KeywordBackend): Keyword extraction backend.
+
+        Returns:
+            str: Identifier of the job.
+
+        Raises:
+            JobQueueFull: If the queue has no room for the documents.
+        """
+        params = {
+            "method": method.value,
+            "parser": parser.value,
+            "detection_chars": detection_chars,
+            "confidence_threshold": confidence_threshold,
+            "keyword_backend": keyword_backend.value,
+        }
+        loop = asyncio.get_running_loop()
+        job_id = await loop.run_in_executor(None, self.store.create_job, params, documents, self.max_pending)
+        self._wakeup.set()
+        return job_id
+
+    async def _process(self, html: str, params: Dict[str, Any]) -> Dict:
+        loop = asyncio.get_running_loop()
+        start_time = time.perf_counter()
+        text = await loop.run_in_executor(None, extract_html_text, html, HtmlParser(params["parser"]))
+        extraction_time = time.perf_counter() - start_time
+
+        detections, statuses, recognition_time = await self.pipeline.detect_languages(
+            [text], RecognitionMethod(params["method"]), params["detection_chars"], params["confidence_threshold"])
+        keyword_backend = KeywordBackend(params.get("keyword_backend", KeywordBackend.YAKE.value))
+        stages = await self.pipeline.process_text(text, detections[0]["language"], keyword_backend=keyword_backend)
+        result = {
+            **detections[0],
+            "classic_summary": stages["classic_summary"],
+            "keywords_summary": stages["keywords_summary"],
+            "neural_summary": stages["neural_summary"],
+            "times": {
+                "extraction_time": extraction_time,
+                "recognition_time": recognition_time,
+                **stages["times"],
+                "cache": {"language": statuses[0], **stages["cache"]},
+            },
+        }
+        INPUT_BYTES.inc(len(html), source="job")
+        TEXT_CHARS.inc(len(text), language=detections[0]["language"])
+        observe_times(result["times"], detections[0]["language"], params["method"])
+        return result
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            document = await loop.run_in_executor(None, self.store.claim_next)
+            if document is None:
+                await self._wakeup.wait()
+                continue
+
+            try:
+                result = await self._process(document["html"], document["params"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await loop.run_in_executor(None, self.store.fail_document, document["job_id"], document["index"], str(e))
+            else:
+                await loop.run_in_executor(None, self.store.complete_document, document["job_id"], document["index"], result)
@@ -0,0 +1,257 @@
+import os
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGES = ('extraction', 'recognition', 'keywords', 'classic', 'neural')
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """
+    Base class of the metrics: a family of time series with the same name, one per combination of label values.
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value, e.g. the number of processed bytes.
+    """
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down. The values can also be collected on every scrape from a function set with set_function.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], Mapping[Tuple[str, ...], float]]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Optional[Callable[[], Mapping[Tuple[str, ...], float]]]) -> None:
+        """
+        Sets a function that returns the current values keyed by tuples of label values. It is called on every scrape.
+        """
+        self._function = function
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._function is not None:
+            try:
+                values.update(self._function())
+            except Exception:
+                logger.exception("Collecting %s failed", self.name)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over cumulative buckets, e.g. the latency of a pipeline stage.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text exposition format.
+
+    Methods:
+        register(metric: _Metric) -> _Metric: Adds a metric to the registry.
+        render() -> str: Renders all metrics.
+    """
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "pipeline_stage_seconds", "Latency of a pipeline stage for one document.", ("stage", "language", "method")))
+RECOGNITION_BATCH_SECONDS = REGISTRY.register(Histogram(
+    "pipeline_recognition_batch_seconds", "Latency of recognizing the languages of all files of one upload at once.", ("method",)))
+INPUT_BYTES = REGISTRY.register(Counter(
+    "pipeline_input_bytes_total", "Bytes of HTML received for processing.", ("source",)))
+TEXT_CHARS = REGISTRY.register(Counter(
+    "pipeline_text_chars_total", "Characters of text extracted from HTML.", ("language",)))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "pipeline_cache_lookups_total", "Cache lookups of stage outputs by result.", ("stage", "result")))
+MODEL_MEMORY = REGISTRY.register(Gauge(
+    "model_memory_bytes", "Memory held by the parameters of a loaded model.", ("model",)))
+PROCESS_MEMORY = REGISTRY.register(Gauge(
+    "process_resident_memory_bytes", "Resident memory of the service process."))
+SPAN_SECONDS = REGISTRY.register(Histogram(
+    "span_seconds", "Duration of a traced span.", ("span",)))
+
+
+def process_memory(pid: str = "self") -> Dict[str, int]:
+    """
+    Reads the memory summary of a process from /proc/<pid>/smaps_rollup.
+    Pss is the resident memory with every shared page divided among the processes that map it,
+    so the Pss of processes that share their models adds up to much less than their Rss.
+
+    Args:
+        pid (str): Process identifier (default is the current process).
+
+    Returns:
+        Dict[str, int]: Rss, Pss, Shared_Clean, Shared_Dirty, Private_Clean and Private_Dirty in bytes. Empty if the file cannot be read.
+    """
+    fields = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as file:
+            for line in file:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    memory[name] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        return {}
+    return memory
+
+
+def _resident_memory() -> Dict[Tuple[str, ...], float]:
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return {(): int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")}
+    except (OSError, ValueError):
+        return {}
+
+
+PROCESS_MEMORY.set_function(_resident_memory)
+PROCESS_PROPORTIONAL_MEMORY = REGISTRY.register(Gauge(
+    "process_proportional_memory_bytes", "Proportional set size of the service process: shared pages are divided among their processes."))
+PROCESS_PROPORTIONAL_MEMORY.set_function(lambda: {(): value} if (value := process_memory().get("Pss")) is not None else {})
+
+
+def observe_times(times: Mapping, language: str, method: str) -> None:
+    """
+    Records the stage times and cache statuses of one document, as found in the "times" dictionary of a pipeline result.
+    Missing stages are skipped, so partial dictionaries (e.g. of stream events) can be recorded as they arrive.
+
+    Args:
+        times (Mapping): Times in seconds under "<stage>_time" keys and cache statuses under "cache".
+        language (str): Language of the document.
+        method (str): Recognition method.
+    """
+    for stage in STAGES:
+        value = times.get(f"{stage}_time")
+        if value is not None:
+            STAGE_SECONDS.observe(value, stage=stage, language=language, method=method)
+    for stage, status in times.get("cache", {}).items():
+        CACHE_LOOKUPS.inc(stage=stage, result=status)
+
+
+_tracing = os.environ.get("TRACING", "").lower() in ("1", "true", "yes")
+_current_span: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("current_span", default=())
+
+
+def set_tracing(enabled: bool) -> None:
+    """
+    Enables or disables logging of every finished span with its parent spans. Tracing is enabled by the TRACING environment variable.
+    """
+    global _tracing
+    _tracing = enabled
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """
+    Measures the wrapped block. The duration is always recorded in the span_seconds histogram;
+    with tracing enabled, the span is also logged with the path of its parent spans and the given attributes.
+
+    Args:
+        name (str): Name of the span.
+        **attributes: Values logged with the span.
+    """
+    path = _current_span.get() + (name,)
+    token = _current_span.set(path)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start_time
+        _current_span.reset(token)
+        SPAN_SECONDS.observe(duration, span=name)
+        if _tracing:
+            logger.info("span %s %.6fs %s", "/".join(path), duration, attributes)
@@ -1,8 +1,63 @@
+import numpy as np
 from enum import Enum
+from typing import List, NamedTuple
 
 class RecognitionMethod(Enum):
     NGRAM = 'ngram'
     ALPHABET = 'alphabet'
     NEURAL = 'neural'
 
-    
\ No newline at end of file
+class HtmlParser(Enum):
+    HTML_PARSER = 'html.parser'
+    LXML = 'lxml'
+
+class InferenceBackend(Enum):
+    TORCH = 'torch'
+    TORCH_INT8 = 'torch-int8'
+    TORCH_MMAP = 'torch-mmap'
+    ONNX_INT8 = 'onnx-int8'
+
+class PartSplitter(Enum):
+    TOKEN_BUDGET = 'token-budget'
+    LONG_SENTENCES = 'long-sentences'
+
+class KeywordBackend(Enum):
+    YAKE = 'yake'
+    TFIDF = 'tfidf'
+
+class StreamFormat(Enum):
+    NDJSON = 'ndjson'
+    SSE = 'sse'
+
+class JobStatus(Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+class BatchRecognition(NamedTuple):
+    """
+    Result of recognizing the languages of many texts at once.
+
+    Attributes:
+        labels (List[str]): The predicted language of each text.
+        languages (List[str]): Language names, in the order of the score columns.
+        scores (np.ndarray): Matrix of shape (texts, languages). For the ALPHABET and NGRAM methods these are distances
+                             (lower is better), for the NEURAL method these are probabilities (higher is better).
+    """
+    labels: List[str]
+    languages: List[str]
+    scores: np.ndarray
+
+class DetectionResult(NamedTuple):
+    """
+    Result of progressive language detection.
+
+    Attributes:
+        language (str): The predicted language.
+        confidence (float): Relative margin between the best and the second-best language score, from 0 to 1.
+        consumed_chars (int): Number of characters of the text that were analyzed.
+    """
+    language: str
+    confidence: float
+    consumed_chars: int
@@ -0,0 +1,468 @@
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import UploadFile
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from .cache import ResultCache, make_key
+from .registry import ModelRegistry
+from .recognition.controller import extract_text, recognize_batch, detect_language, language_scores
+from .models.models import RecognitionMethod, HtmlParser, KeywordBackend
+from .workers import init_worker, parse_task, keywords_task, classic_task
+from .abstracting.document import ParsedDocument
+from .abstracting.neural_abstract import BilingualSummarizer, MODEL_CLASSES
+from .abstracting.resources import supports_language
+from .metrics import span, observe_times, INPUT_BYTES, TEXT_CHARS, RECOGNITION_BATCH_SECONDS
+
+
+class InferenceWorker:
+    """
+    Runs neural summarization on a dedicated thread, fed by a bounded queue.
+    Requests that are waiting in the queue when the worker becomes free are merged into one summarize_documents call,
+    so parts from concurrently processed files share generation batches. If a merged call fails, its documents are summarized
+    one by one, so that only the requests whose documents fail get the error.
+
+    Attributes:
+        registry (ModelRegistry): Registry the current neural summarizer is taken from.
+        queue_size (int): Maximum number of waiting requests. Submitting to a full queue waits for free space.
+        max_batch_items (int): Maximum number of documents merged into one summarize_documents call.
+
+    Methods:
+        start() -> None: Starts the worker task.
+        close() -> None: Stops the worker task and its thread. Requests that are still waiting fail with RuntimeError.
+        summarize(document: ParsedDocument) -> str: Queues a parsed document and waits for its summary.
+    """
+    def __init__(self, registry: ModelRegistry, queue_size: int = 64, max_batch_items: int = 16):
+        self.registry = registry
+        self.queue_size = queue_size
+        self.max_batch_items = max_batch_items
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._closed = False
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._fail_waiting()
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _fail(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_exception(RuntimeError("The inference worker is closed."))
+
+    @staticmethod
+    def _settle(future: asyncio.Future, summary: Optional[str] = None, exception: Optional[Exception] = None) -> None:
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(summary)
+
+    def _fail_waiting(self) -> None:
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            self._fail(future)
+
+    async def summarize(self, document: ParsedDocument) -> str:
+        """
+        Queues a parsed document for neural summarization and waits for its summary.
+
+        Args:
+            document (ParsedDocument): Document to be summarized.
+
+        Returns:
+            str: Final summary of the document.
+        """
+        if self._closed:
+            raise RuntimeError("The inference worker is closed.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((document, future))
+        if self._closed:
+            self._fail_waiting()
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = [await self._queue.get()]
+            while len(requests) < self.max_batch_items and not self._queue.empty():
+                requests.append(self._queue.get_nowait())
+
+            bilingual_summarizer = self.registry.bilingual_summarizer
+            documents = [document for document, _ in requests]
+            try:
+                try:
+                    with span("neural_batch", texts=len(requests)):
+                        summaries = await loop.run_in_executor(self._executor, bilingual_summarizer.summarize_documents, documents)
+                    errors = [None] * len(requests)
+                except Exception as e:
+                    if len(requests) == 1:
+                        summaries, errors = [None], [e]
+                    else:
+                        summaries, errors = await self._summarize_one_by_one(bilingual_summarizer, documents)
+            except asyncio.CancelledError:
+                for _, future in requests:
+                    self._fail(future)
+                raise
+
+            for (_, future), summary, error in zip(requests, summaries, errors):
+                self._settle(future, summary, error)
+
+    async def _summarize_one_by_one(self, bilingual_summarizer: BilingualSummarizer, documents: List[ParsedDocument]) -> Tuple[List[Optional[str]], List[Optional[Exception]]]:
+        loop = asyncio.get_running_loop()
+        summaries, errors = [], []
+        for document in documents:
+            try:
+                summary = (await loop.run_in_executor(self._executor, bilingual_summarizer.summarize_documents, [document]))[0]
+            except Exception as e:
+                summaries.append(None)
+                errors.append(e)
+            else:
+                summaries.append(summary)
+                errors.append(None)
+        return summaries, errors
+
+
+class Pipeline:
+    """
+    Processes uploaded documents: extraction, language detection, keywords, classic and neural summaries.
+    Files are processed concurrently up to a limit. For every file the keyword, classic and neural stages run at the same time:
+    the CPU-bound stages in a process pool, neural summarization in the InferenceWorker.
+    Stage outputs are cached by content hash.
+
+    Attributes:
+        registry (ModelRegistry): Registry with the application-lifetime models.
+        cache (ResultCache): Cache of stage outputs.
+        max_concurrent_files (int): Maximum number of files processed at the same time.
+        process_workers (Optional[int]): Number of worker processes for the CPU-bound stages (default is the number of CPUs).
+
+    Methods:
+        start() -> None: Starts the process pool and the inference worker.
+        close() -> None: Stops them.
+        extract_texts(files: List[UploadFile], parser: HtmlParser) -> Tuple[List[str], List[float]]: Extracts the text of every file concurrently.
+        detect_languages(texts: List[str], method: RecognitionMethod, ...) -> Tuple[List[dict], List[str], float]: Detects the languages of all texts in one batch.
+        process_text(text: str, language: str, on_stage: Optional[Callable] = None, ...) -> Dict: Runs the keyword, classic and neural stages of one text concurrently.
+        process(files: List[UploadFile], method: RecognitionMethod, ...) -> List[Dict]: Processes uploaded files into results.
+        iter_events(files: List[UploadFile], method: RecognitionMethod, ...) -> AsyncIterator[Dict]: Yields the result of every stage of every file as soon as it is ready.
+    """
+    def __init__(self, registry: ModelRegistry, cache: ResultCache, max_concurrent_files: int = 4,
+                 process_workers: Optional[int] = None, inference_queue_size: int = 64, max_inference_batch: int = 16):
+        self.registry = registry
+        self.cache = cache
+        self.max_concurrent_files = max_concurrent_files
+        self.process_workers = process_workers
+        self.inference = InferenceWorker(registry, inference_queue_size, max_inference_batch)
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def start(self) -> None:
+        self._processes = ProcessPoolExecutor(
+            max_workers=self.process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.registry.corpus_path,),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_files)
+        self.inference.start()
+
+    async def close(self) -> None:
+        await self.inference.close()
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    async def _cached(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, bool, float]:
+        start_time = time.perf_counter()
+        hit, value = self.cache.get(key)
+        if not hit:
+            value = await compute()
+            self.cache.put(key, value)
+        return value, hit, time.perf_counter() - start_time
+
+    async def extract_texts(self, files: List[UploadFile], parser: HtmlParser = HtmlParser.HTML_PARSER) -> Tuple[List[str], List[float]]:
+        """
+        Extracts the text of every file concurrently.
+
+        Args:
+            files (List[UploadFile]): Uploaded HTML files.
+            parser (HtmlParser): HTML parser backend.
+
+        Returns:
+            Tuple[List[str], List[float]]: Extracted texts and extraction times.
+        """
+        async def extract(file: UploadFile) -> Tuple[str, float]:
+            start_time = time.perf_counter()
+            with span("extract", filename=file.filename):
+                text = await extract_text(file, parser)
+            if file.size is not None:
+                INPUT_BYTES.inc(file.size, source="upload")
+            return text, time.perf_counter() - start_time
+
+        extracted = await asyncio.gather(*(extract(file) for file in files))
+        return [text for text, _ in extracted], [extraction_time for _, extraction_time in extracted]
+
+    async def detect_languages(self, texts: List[str], method: RecognitionMethod, detection_chars: Optional[int] = None,
+                               confidence_threshold: Optional[float] = None) -> Tuple[List[dict], List[str], float]:
+        """
+        Detects the languages of all texts. Cached results are reused, the rest are recognized in one batch on a thread.
+
+        Args:
+            texts (List[str]): Extracted texts.
+            method (RecognitionMethod): The method for recognizing the language of the texts.
+            detection_chars (Optional[int]): If set, only this many first characters of each text are analyzed.
+                                             With progressive detection, the prefix does not grow beyond it.
+            confidence_threshold (Optional[float]): If set, progressive detection with this threshold is used.
+
+        Returns:
+            Tuple[List[dict], List[str], float]: Detection result of each text, cache status of each text and the recognition time.
+        """
+        start_time = time.perf_counter()
+        version = self.registry.stage_versions()["language"]
+        keys = [make_key(text, "language", method.value, detection_chars, confidence_threshold, version) for text in texts]
+
+        detections = []
+        missing = []
+        for index, key in enumerate(keys):
+            hit, value = self.cache.get(key)
+            detections.append(value)
+            if not hit:
+                missing.append(index)
+
+        def recognize() -> List[dict]:
+            classifier = self.registry.classifier
+            if confidence_threshold is None:
+                recognition = recognize_batch([texts[i] for i in missing], method, classifier, detection_chars)
+                return [{"language": language, "language_scores": language_scores(recognition.languages, scores)}
+                        for language, scores in zip(recognition.labels, recognition.scores)]
+            results = [detect_language(texts[i], method, classifier, confidence_threshold, max_chars=detection_chars) for i in missing]
+            return [{"language": result.language, "language_confidence": result.confidence, "consumed_chars": result.consumed_chars}
+                    for result in results]
+
+        if missing:
+            with span("recognize", method=method.value, texts=len(missing)):
+                recognized = await asyncio.get_running_loop().run_in_executor(None, recognize)
+            for index, detection in zip(missing, recognized):
+                detections[index] = detection
+                self.cache.put(keys[index], detection)
+
+        missing = set(missing)
+        statuses = ["miss" if index in missing else "hit" for index in range(len(texts))]
+        return detections, statuses, time.perf_counter() - start_time
+
+    async def process_text(self, text: str, language: str,
+                           on_stage: Optional[Callable[[str, Any, str, float], None]] = None,
+                           keyword_backend: KeywordBackend = KeywordBackend.YAKE) -> Dict:
+        """
+        Runs the keyword, classic and neural stages of one text at the same time.
+        The text is parsed once in the process pool when the first stage misses the cache, and the stages share the parsed document.
+        Stages that do not support the language (no NLTK resources, or no neural model) are skipped:
+        their output and time are None and their cache status is "skipped".
+
+        Args:
+            text (str): Extracted text.
+            language (str): Detected language of the text.
+            on_stage (Optional[Callable[[str, Any, str, float], None]]): Called with the stage name, its output,
+                                                                         its cache status and its time as soon as each stage finishes.
+            keyword_backend (KeywordBackend): Keyword extraction backend.
+
+        Returns:
+            Dict: Outputs, times and cache statuses of the three stages.
+        """
+        loop = asyncio.get_running_loop()
+        versions = self.registry.stage_versions()
+        keywords_version = versions["keywords_tfidf" if keyword_backend == KeywordBackend.TFIDF else "keywords"]
+        parsing: Optional[asyncio.Future] = None
+
+        async def parsed() -> ParsedDocument:
+            nonlocal parsing
+            if parsing is None:
+                parsing = loop.run_in_executor(self._processes, parse_task, text, language)
+            return await parsing
+
+        async def keywords() -> str:
+            return await loop.run_in_executor(self._processes, keywords_task, await parsed(), keyword_backend, versions["classic"])
+
+        async def classic() -> str:
+            return await loop.run_in_executor(self._processes, classic_task, await parsed(), versions["classic"])
+
+        async def neural() -> str:
+            return await self.inference.summarize(await parsed())
+
+        parsable = supports_language(language)
+        supported = {"keywords": parsable, "classic": parsable, "neural": parsable and language in MODEL_CLASSES}
+
+        async def run_stage(stage: str, key: str, compute: Callable[[], Any]) -> Tuple[Any, str, Optional[float]]:
+            if supported[stage]:
+                value, hit, stage_time = await self._cached(key, compute)
+                status = "hit" if hit else "miss"
+            else:
+                value, status, stage_time = None, "skipped", None
+            if on_stage is not None:
+                on_stage(stage, value, status, stage_time)
+            return value, status, stage_time
+
+        (keywords_summary, keywords_status, keywords_time), \
+        (classic_summary, classic_status, classic_time), \
+        (neural_summary, neural_status, neural_time) = await asyncio.gather(
+            run_stage("keywords", make_key(text, "keywords", language, keywords_version, versions["document"]), keywords),
+            run_stage("classic", make_key(text, "classic", language, versions["classic"], versions["document"]), classic),
+            run_stage("neural", make_key(text, "neural", language, versions["neural"], versions["document"]), neural),
+        )
+
+        return {
+            "classic_summary": classic_summary,
+            "keywords_summary": keywords_summary,
+            "neural_summary": neural_summary,
+            "times": {
+                "keywords_time": keywords_time,
+                "classic_time": classic_time,
+                "neural_time": neural_time,
+            },
+            "cache": {
+                "keywords": keywords_status,
+                "classic": classic_status,
+                "neural": neural_status,
+            },
+        }
+
+    async def process(self, files: List[UploadFile], method: RecognitionMethod, parser: HtmlParser = HtmlParser.HTML_PARSER,
+                      detection_chars: Optional[int] = None, confidence_threshold: Optional[float] = None,
+                      keyword_backend: KeywordBackend = KeywordBackend.YAKE) -> List[Dict]:
+        """
+        Processes uploaded files: extracts their texts, detects the languages in one batch
+        and runs the remaining stages of up to max_concurrent_files files at the same time.
+        The recognition_time of every file is its share of the batch: the batch time divided by the number of files.
+
+        Args:
+            files (List[UploadFile]): Uploaded HTML files.
+            method (RecognitionMethod): The method for recognizing the language of the texts.
+            parser (HtmlParser): HTML parser backend.
+            detection_chars (Optional[int]): If set, only this many first characters of each text are analyzed.
+            confidence_threshold (Optional[float]): If set, progressive detection with this threshold is used.
+            keyword_backend (KeywordBackend): Keyword extraction backend.
+
+        Returns:
+            List[Dict]: Result of each file, in the order of files. If the stages of a file fail, its result has
+                        only the file name, the detected language and a "detail" with the error, and the other files are not affected.
+        """
+        texts, extraction_times = await self.extract_texts(files, parser)
+        detections, language_statuses, batch_recognition_time = await self.detect_languages(texts, method, detection_chars, confidence_threshold)
+        recognition_time = batch_recognition_time / max(len(texts), 1)
+        RECOGNITION_BATCH_SECONDS.observe(batch_recognition_time, method=method.value)
+
+        async def process_file(file: UploadFile, text: str, extraction_time: float, detection: dict, language_status: str) -> Dict:
+            try:
+                async with self._semaphore:
+                    stages = await self.process_text(text, detection["language"], keyword_backend=keyword_backend)
+            except Exception as e:
+                return {"filename": file.filename, **detection, "detail": str(e)}
+            result = {
+                "filename": file.filename,
+                **detection,
+                "classic_summary": stages["classic_summary"],
+                "keywords_summary": stages["keywords_summary"],
+                "neural_summary": stages["neural_summary"],
+                "times": {
+                    "extraction_time": extraction_time,
+                    "recognition_time": recognition_time,
+                    **stages["times"],
+                    "cache": {"language": language_status, **stages["cache"]},
+                },
+            }
+            TEXT_CHARS.inc(len(text), language=detection["language"])
+            observe_times(result["times"], detection["language"], method.value)
+            return result
+
+        return await asyncio.gather(*(
+            process_file(*arguments) for arguments in zip(files, texts, extraction_times, detections, language_statuses)
+        ))
+
+    async def iter_events(self, files: List[UploadFile], method: RecognitionMethod, parser: HtmlParser = HtmlParser.HTML_PARSER,
+                          detection_chars: Optional[int] = None, confidence_threshold: Optional[float] = None,
+                          keyword_backend: KeywordBackend = KeywordBackend.YAKE) -> AsyncIterator[Dict]:
+        """
+        Processes uploaded files and yields an event for every stage of every file as soon as it is ready:
+        first the language, then the keywords, classic and neural summaries in the order they finish, and finally "done".
+        Each file is detected on its own, so its language does not wait for the other files.
+        Events are handed over as they are produced and are not accumulated.
+
+        Args:
+            files (List[UploadFile]): Uploaded HTML files.
+            method (RecognitionMethod): The method for recognizing the language of the texts.
+            parser (HtmlParser): HTML parser backend.
+            detection_chars (Optional[int]): If set, only this many first characters of each text are analyzed.
+            confidence_threshold (Optional[float]): If set, progressive detection with this threshold is used.
+            keyword_backend (KeywordBackend): Keyword extraction backend.
+
+        Yields:
+            Dict: Event with the file name, the stage name and the stage output, time and cache status.
+                  If a file fails, an "error" event with the detail is yielded instead of its remaining stages.
+        """
+        events = asyncio.Queue()
+        finished = object()
+
+        async def process_file(file: UploadFile) -> None:
+            try:
+                start_time = time.perf_counter()
+                with span("extract", filename=file.filename):
+                    text = await extract_text(file, parser)
+                extraction_time = time.perf_counter() - start_time
+                if file.size is not None:
+                    INPUT_BYTES.inc(file.size, source="upload")
+
+                detections, statuses, recognition_time = await self.detect_languages([text], method, detection_chars, confidence_threshold)
+                language = detections[0]["language"]
+                TEXT_CHARS.inc(len(text), language=language)
+                observe_times({"extraction_time": extraction_time, "recognition_time": recognition_time,
+                               "cache": {"language": statuses[0]}}, language, method.value)
+                events.put_nowait({
+                    "filename": file.filename,
+                    "stage": "language",
+                    **detections[0],
+                    "times": {"extraction_time": extraction_time, "recognition_time": recognition_time},
+                    "cache": {"language": statuses[0]},
+                })
+
+                def on_stage(stage: str, value: Any, status: str, stage_time: Optional[float]) -> None:
+                    observe_times({f"{stage}_time": stage_time, "cache": {stage: status}}, language, method.value)
+                    events.put_nowait({
+                        "filename": file.filename,
+                        "stage": stage,
+                        f"{stage}_summary": value,
+                        "times": {f"{stage}_time": stage_time},
+                        "cache": {stage: status},
+                    })
+
+                async with self._semaphore:
+                    await self.process_text(text, language, on_stage, keyword_backend)
+                events.put_nowait({"filename": file.filename, "stage": "done"})
+            except Exception as e:
+                events.put_nowait({"filename": file.filename, "stage": "error", "detail": str(e)})
+            finally:
+                events.put_nowait(finished)
+
+        tasks = [asyncio.create_task(process_file(file)) for file in files]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await events.get()
+                if event is finished:
+                    remaining -= 1
+                else:
+                    yield event
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,233 @@
+import gc
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import uvicorn
+from fastapi import FastAPI
+from typing import Callable, Dict, List, Mapping, Set
+from .registry import ModelRegistry
+from .jobs import JobStore, JOBS_DB_PATH
+from .metrics import process_memory
+
+logger = logging.getLogger(__name__)
+
+MB = 2 ** 20
+
+
+def worker_cpus(workers: int) -> int:
+    """
+    Divides the CPUs among the pre-forked workers. Every worker gets this many torch threads and process pool workers,
+    so the number of processes does not grow with workers × CPUs.
+
+    Args:
+        workers (int): Number of worker processes.
+
+    Returns:
+        int: CPUs of one worker, at least one.
+    """
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def child_pids(pid: int) -> List[int]:
+    """
+    Finds the children of a process in /proc, e.g. the process pool of a worker.
+
+    Args:
+        pid (int): Process identifier of the parent.
+
+    Returns:
+        List[int]: Process identifiers of its children in ascending order. Empty if /proc cannot be read.
+    """
+    children = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as file:
+                fields = file.read().rpartition(")")[2].split()
+        except OSError:
+            continue
+        if len(fields) > 1 and fields[1] == str(pid):
+            children.append(int(entry))
+    return sorted(children)
+
+
+def memory_report(pids: Mapping[str, int]) -> Dict:
+    """
+    Collects the memory of the parent, the workers and their pool processes. Rss counts every page a process maps, Pss divides shared pages
+    among the processes that map them. If the models are shared, the total Pss stays close to one copy of the models
+    while the total Rss grows with every worker.
+
+    Args:
+        pids (Mapping[str, int]): Process identifiers keyed by process name.
+
+    Returns:
+        Dict: Memory of every process in bytes and the totals over all processes.
+    """
+    processes = {name: process_memory(str(pid)) for name, pid in pids.items()}
+    processes = {name: memory for name, memory in processes.items() if memory}
+    totals = {field: sum(memory.get(field, 0) for memory in processes.values())
+              for field in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")}
+    return {"processes": processes, "totals": totals}
+
+
+def format_memory_report(report: Dict) -> str:
+    """
+    Formats a memory report as a table in megabytes.
+
+    Args:
+        report (Dict): Output of memory_report.
+
+    Returns:
+        str: Table with one row per process and a row with the totals.
+    """
+    columns = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+    lines = [f"{'process':<20}" + "".join(f"{column:>15}" for column in columns)]
+    for name, memory in [*report["processes"].items(), ("total", report["totals"])]:
+        lines.append(f"{name:<20}" + "".join(f"{memory.get(column, 0) / MB:>15.1f}" for column in columns))
+    totals = report["totals"]
+    if totals["Rss"]:
+        lines.append(f"Shared: {(totals['Rss'] - totals['Pss']) / MB:.1f} MB of {totals['Rss'] / MB:.1f} MB resident "
+                     f"({1 - totals['Pss'] / totals['Rss']:.0%}).")
+    return "\n".join(lines)
+
+
+def _run_worker(app_factory: Callable[[ModelRegistry], FastAPI], registry: ModelRegistry, sock: socket.socket, workers: int) -> None:
+    for signal_number in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGUSR1, signal.SIGALRM):
+        signal.signal(signal_number, signal.SIG_DFL)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(worker_cpus(workers))
+
+    server = uvicorn.Server(uvicorn.Config(app_factory(registry), log_level="info"))
+    server.run(sockets=[sock])
+
+
+def serve(app_factory: Callable[[ModelRegistry], FastAPI], host: str = "127.0.0.1", port: int = 8000, workers: int = 2,
+          registry: ModelRegistry = None, jobs_path: str = JOBS_DB_PATH, report_delay: float = 30.0) -> None:
+    """
+    Serves the application from pre-forked worker processes that share the models.
+    The parent loads every model once with memory-mapped weights, opens the listening socket and forks the workers,
+    which serve the shared socket with uvicorn. The mapped weight pages stay shared, and since the models are only read,
+    no worker gets a private copy. Garbage collection is frozen before forking, so that the collector does not touch
+    the objects inherited from the parent and copy their pages. Workers that exit are forked again,
+    and the job documents they had claimed are returned to the queue.
+
+    Every worker holds its own copy of the state that /admin/reload and /corpus/documents would change, so both endpoints
+    are disabled in the workers. To reload the corpus and the models, send SIGHUP to the parent: it rebuilds the registry
+    and restarts the workers, which finish their running requests first.
+
+    The metrics are kept by each worker, so /metrics reports only the worker that served the scrape.
+    Every worker runs its own process pool for the CPU-bound stages, so app_factory should size it with worker_cpus.
+    A memory report of the parent, the workers and their pool processes is logged report_delay seconds after start and on SIGUSR1.
+
+    Args:
+        app_factory (Callable[[ModelRegistry], FastAPI]): Creates the application of a worker around the shared registry.
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        workers (int): Number of worker processes.
+        registry (ModelRegistry): Registry to share. By default one with memory-mapped weights is built and warmed up.
+        jobs_path (str): SQLite database of the background jobs. Interrupted documents are requeued before forking
+                         and whenever a worker exits.
+        report_delay (float): Seconds after start at which the memory report is logged. 0 disables it.
+    """
+    if registry is None:
+        registry = ModelRegistry(mmap_weights=True)
+        registry.warm_up()
+    store = JobStore(jobs_path)
+    store.requeue_running()
+    store.close()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, int] = {}
+    restarting: Set[int] = set()
+    stopping = False
+
+    def fork_worker(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                _run_worker(app_factory, registry, sock, workers)
+                exit_code = 0
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                logger.exception("Worker %d failed", index)
+            finally:
+                os._exit(exit_code)
+        children[pid] = index
+
+    def stop(signal_number, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    def reload(signal_number, frame) -> None:
+        logger.info("Reloading the models and the corpus")
+        registry.reload()
+        gc.collect()
+        gc.freeze()
+        restarting.update(children)
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    def report(signal_number, frame) -> None:
+        pids = {"parent": os.getpid()}
+        for pid, index in sorted(children.items(), key=lambda item: item[1]):
+            pids[f"worker-{index}"] = pid
+            for number, child in enumerate(child_pids(pid)):
+                pids[f"worker-{index}/pool-{number}"] = child
+        logger.info("Memory of %d workers:\n%s", len(children), format_memory_report(memory_report(pids)))
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, reload)
+    signal.signal(signal.SIGUSR1, report)
+    signal.signal(signal.SIGALRM, report)
+
+    for index in range(workers):
+        fork_worker(index)
+    logger.info("Serving on http://%s:%d with %d pre-forked workers", host, port, workers)
+    if report_delay > 0:
+        signal.setitimer(signal.ITIMER_REAL, report_delay)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        store = JobStore(jobs_path)
+        requeued = store.requeue_running(pid)
+        store.close()
+        if requeued:
+            logger.info("Requeued %d job documents of worker %d (pid %d)", requeued, index, pid)
+        if stopping:
+            continue
+        if pid in restarting:
+            restarting.discard(pid)
+        else:
+            logger.warning("Worker %d (pid %d) exited with code %d, starting it again", index, pid, os.waitstatus_to_exitcode(status))
+            time.sleep(1)
+        fork_worker(index)
+    sock.close()
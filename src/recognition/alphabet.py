@@ -1,6 +1,9 @@
 from collections import Counter
-from typing import Mapping
-import re
+from functools import lru_cache
+from typing import Mapping, List, NamedTuple, Tuple
+import numpy as np
+from .profiles import (PROFILES_DIR, EncodedTexts, encode_texts, text_scripts, language_scripts, candidate_languages,
+                       discover_languages, read_profile)
 
 alphabet_frequencies = {
     'russian': {
@@ -74,6 +77,64 @@ alphabet_frequencies = {
   }
 }
 
+
+
+class AlphabetProfiles(NamedTuple):
+    """
+    Letter frequencies of all languages in an indexed array form.
+
+    Attributes:
+        languages (List[str]): Language names, in the order of the matrix rows.
+        alphabet (List[str]): Letters of all languages, in the order of the matrix columns.
+        code_points (np.ndarray): Code points of the letters of the alphabet, which is sorted by them.
+        frequencies (np.ndarray): Matrix of shape (languages, alphabet) with the frequency of each letter.
+        scripts (np.ndarray): Boolean matrix of shape (languages, scripts) with the scripts each language is written in.
+    """
+    languages: List[str]
+    alphabet: List[str]
+    code_points: np.ndarray
+    frequencies: np.ndarray
+    scripts: np.ndarray
+
+
+@lru_cache(maxsize=None)
+def load_alphabet_profiles(profiles_dir: str = PROFILES_DIR) -> AlphabetProfiles:
+    """
+    Collects the letter frequencies of every language: the built-in tables, complemented by the unigram profiles
+    found in the profiles directory for the other languages. The result is cached.
+
+    Args:
+        profiles_dir (str): Directory of the profiles.
+
+    Returns:
+        AlphabetProfiles: Letter frequencies of all languages.
+    """
+    language_frequencies = dict(alphabet_frequencies)
+    for language in discover_languages(1, profiles_dir):
+        language_frequencies.setdefault(language, read_profile(language, 1, profiles_dir))
+
+    languages = list(language_frequencies)
+    alphabet = sorted(set().union(*language_frequencies.values()))
+    frequencies = np.array([[language_frequencies[language].get(char, 0) for char in alphabet] for language in languages])
+    code_points = np.array([ord(char) for char in alphabet], dtype=np.uint32)
+    scripts = np.array([language_scripts(language_frequencies[language]) for language in languages])
+    return AlphabetProfiles(languages, alphabet, code_points, frequencies, scripts)
+
+
+def letter_counts(encoded: EncodedTexts) -> np.ndarray:
+    """
+    Counts the letters of every encoded text with one bincount over the text indices and letter codes.
+
+    Args:
+        encoded (EncodedTexts): Encoded texts.
+
+    Returns:
+        np.ndarray: Matrix of shape (texts, alphabet) with the number of each letter in each text.
+    """
+    texts, letters = len(encoded.offsets) - 1, len(encoded.alphabet)
+    return np.bincount(encoded.rows() * letters + encoded.codes, minlength=texts * letters).reshape(texts, letters)
+
+
 def preprocess_text(text: str) -> Counter:
     """
     Prepares text by removing all characters except letters and counts the frequency of each character.
@@ -84,9 +145,10 @@ def preprocess_text(text: str) -> Counter:
     Returns:
         Counter: A counter with the number of each character in the text.
     """
-    
-    text = re.sub(r'[^a-zа-яёàèìòù]', '', text.lower())
-    return Counter(text)
+    encoded = encode_texts([text])
+    counts = letter_counts(encoded)[0]
+    letters = np.flatnonzero(counts)
+    return Counter(dict(zip(encoded.alphabet[letters].astype('<u4').tobytes().decode('utf-32-le'), counts[letters].tolist())))
 
 
 def build_profile(text: str) -> Mapping[str, int]:
@@ -126,6 +188,7 @@ def calculate_manhattan_distance(user_profile: Mapping[str, int], language_profi
 def recognize_language(text: str) -> str:
     """
     Determines the likely language of the text based on the character frequency profile and Manhattan distance.
+    The text is scored as a batch of one, so it gets the same language as in recognize_languages.
     
     Args:
         text (str): Input text for analysis.
@@ -133,12 +196,33 @@ def recognize_language(text: str) -> str:
     Returns:
         str: Intended language of the text.
     """
-    user_profile = build_profile(text)
-    
-    distances = {}
-    for language, language_profile in alphabet_frequencies.items():
-        distance = calculate_manhattan_distance(user_profile, language_profile)
-        distances[language] = distance
-    
-    predicted_language = min(distances, key=distances.get)
-    return predicted_language
+    return recognize_languages([text])[0][0]
+
+
+def recognize_languages(texts: List[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Determines the likely languages of many texts at once.
+    The letters of all texts are encoded once over the alphabet of all languages and counted with one bincount,
+    and the Manhattan distances to the languages written in the scripts of each text are computed with array operations;
+    the distances to the other languages are infinite.
+
+    Args:
+        texts (List[str]): Input texts for analysis.
+
+    Returns:
+        Tuple[List[str], np.ndarray]: Intended language of each text and a matrix of shape (texts, languages)
+                                      with the Manhattan distances, in the order of the alphabet profiles.
+    """
+    profiles = load_alphabet_profiles()
+    encoded = encode_texts(texts, profiles.code_points)
+    counts = letter_counts(encoded)[:, :encoded.supported]
+
+    total_letters = counts.sum(axis=1, keepdims=True).astype(float)
+    user_profiles = counts / np.maximum(total_letters, 1)
+
+    distances = np.full((len(texts), len(profiles.languages)), np.inf)
+    for rows, languages in candidate_languages(profiles.scripts, text_scripts(encoded)):
+        frequencies = profiles.frequencies[languages]
+        distances[np.ix_(rows, languages)] = np.abs(user_profiles[rows, np.newaxis, :] - frequencies[np.newaxis, :, :]).sum(axis=2)
+    predicted_languages = [profiles.languages[index] for index in distances.argmin(axis=1)]
+    return predicted_languages, distances
@@ -1,41 +1,146 @@
-from bs4 import BeautifulSoup
 from .neural import LanguageClassifier
-from .alphabet import recognize_language as alphabet_recognize_language
-from .n_gram import recognize_language as n_gram_recognize_language
-from fastapi import UploadFile
-from typing import Tuple
-from src.models.models import RecognitionMethod
+from .alphabet import recognize_languages as alphabet_recognize_languages, load_alphabet_profiles
+from .n_gram import recognize_languages as n_gram_recognize_languages, load_profiles
+from .extraction import extract_text
+from functools import lru_cache
+from typing import Dict, List, Optional
+import math
+import hashlib
+import numpy as np
+from src.models.models import RecognitionMethod, BatchRecognition, DetectionResult
 
-#classifier = LanguageClassifier()
 
-async def resolve(file: UploadFile, method: RecognitionMethod) -> Tuple[str, str]:
+def recognize_batch(texts: List[str], method: RecognitionMethod, classifier: Optional[LanguageClassifier] = None,
+                    max_chars: Optional[int] = None) -> BatchRecognition:
     """
-    Specifies the language of the text extracted from the HTML file using the specified recognition method.
+    Specifies the languages of many texts at once using the specified recognition method.
+    The profiles or feature vectors of all texts are built as one sparse matrix and scored against every language together.
 
     Args:
-        file (UploadFile): Uploaded HTML file containing the text to be analyzed.
-        method (RecognitionMethod): The method for recognizing the language of the text.
-                                    Possible values:
-                                    - RecognitionMethod.NGRAM
-                                    - RecognitionMethod.ALPHABET
-                                    - RecognitionMethod.NEURAL
+        texts (List[str]): Texts to be analyzed.
+        method (RecognitionMethod): The method for recognizing the language of the texts.
+        classifier (LanguageClassifier): Trained classifier, required for RecognitionMethod.NEURAL.
+        max_chars (Optional[int]): If set, only the first max_chars characters of each text are analyzed.
 
     Returns:
-        Tuple[str, str]: Tuple containing:
-                         - The language of the text (e.g., 'russian' or 'italian').
-                         - Extracted text from the HTML file.
+        BatchRecognition: The predicted languages together with the per-language scores of every text.
     """
-    content = await file.read()
-    content_str = content.decode("utf-8")
-
-    soup = BeautifulSoup(content_str, "html.parser")
-    extracted_text = soup.get_text(separator=" ", strip=True)
+    if max_chars is not None:
+        texts = [text[:max_chars] for text in texts]
 
     if method == RecognitionMethod.NGRAM:
-        language = n_gram_recognize_language(extracted_text)
+        labels, scores = n_gram_recognize_languages(texts)
+        languages = load_profiles().languages
     elif method == RecognitionMethod.ALPHABET:
-        language = alphabet_recognize_language(extracted_text)
-    #elif method == RecognitionMethod.NEURAL:
-        #language = classifier.predict_language(extracted_text)
+        labels, scores = alphabet_recognize_languages(texts)
+        languages = load_alphabet_profiles().languages
+    elif method == RecognitionMethod.NEURAL:
+        if classifier is None:
+            raise ValueError("The neural recognition method is not available: the language classifier is not loaded.")
+        labels, scores = classifier.predict_languages(texts)
+        languages = classifier.languages
+
+    return BatchRecognition(labels, list(languages), scores)
+
+
+@lru_cache(maxsize=None)
+def profiles_version() -> str:
+    """
+    Hashes the n-gram and alphabet profiles used by the NGRAM and ALPHABET methods.
+    The profiles are loaded once per process, so the hash is computed once as well.
+
+    Returns:
+        str: Hexadecimal digest of the languages, n-grams, letters and frequencies of the loaded profiles.
+    """
+    digest = hashlib.sha256()
+    try:
+        profiles = load_profiles()
+        digest.update("\0".join(profiles.languages).encode("utf-8"))
+        digest.update("\0".join(profiles.vocabulary).encode("utf-8"))
+        digest.update(profiles.log_probabilities.tobytes())
+    except FileNotFoundError:
+        digest.update(b"no-ngram-profiles")
+    alphabet_profiles = load_alphabet_profiles()
+    digest.update("\0".join(alphabet_profiles.languages).encode("utf-8"))
+    digest.update("\0".join(alphabet_profiles.alphabet).encode("utf-8"))
+    digest.update(alphabet_profiles.frequencies.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def language_scores(languages: List[str], scores: np.ndarray) -> Dict[str, float]:
+    """
+    Maps the languages to the scores of one text. Languages ruled out by script have infinite distances and are left out.
+
+    Args:
+        languages (List[str]): Language names, in the order of the scores.
+        scores (np.ndarray): Scores of one text for every language.
+
+    Returns:
+        Dict[str, float]: Score of each remaining language.
+    """
+    return {language: score for language, score in zip(languages, scores.tolist()) if math.isfinite(score)}
+
+
+def calculate_confidence(scores: np.ndarray, method: RecognitionMethod) -> float:
+    """
+    Calculates how confidently the best language is separated from the second-best one.
+    For distances it is the relative gap (second - best) / second, for probabilities it is best - second.
+    Languages ruled out by script have infinite distances and are not counted.
+
+    Args:
+        scores (np.ndarray): Scores of one text for every language.
+        method (RecognitionMethod): The method the scores were produced by.
+
+    Returns:
+        float: Confidence from 0 to 1.
+    """
+    scores = scores[np.isfinite(scores)]
+    if len(scores) < 2:
+        return 1.0
+
+    if method == RecognitionMethod.NEURAL:
+        second, best = np.sort(scores)[-2:]
+        return float(best - second)
+
+    best, second = np.sort(scores)[:2]
+    return float((second - best) / second) if second > 0 else 0.0
+
+
+def detect_language(text: str, method: RecognitionMethod, classifier: Optional[LanguageClassifier] = None,
+                    threshold: float = 0.5, initial_chars: int = 256, growth: int = 2,
+                    max_chars: Optional[int] = None) -> DetectionResult:
+    """
+    Determines the language of a text progressively: growing prefixes of the text are scored until the margin
+    between the best and the second-best language reaches the threshold or the whole text has been analyzed.
+    The prefix grows geometrically, so in total at most about twice the consumed prefix is profiled.
+
+    Args:
+        text (str): Text to be analyzed.
+        method (RecognitionMethod): The method for recognizing the language of the text.
+        classifier (LanguageClassifier): Trained classifier, required for RecognitionMethod.NEURAL.
+        threshold (float): Confidence at which detection stops (default is 0.5).
+        initial_chars (int): Length of the first prefix, at least 1 (default is 256).
+        growth (int): Factor by which the prefix grows at each step, at least 2 (default is 2).
+        max_chars (Optional[int]): If set, the prefix never grows beyond this many characters.
+
+    Returns:
+        DetectionResult: The predicted language, the confidence and the number of consumed characters.
+
+    Raises:
+        ValueError: If initial_chars, growth or max_chars is out of range.
+    """
+    if initial_chars < 1 or growth < 2:
+        raise ValueError(f"initial_chars must be at least 1 and growth at least 2, got {initial_chars} and {growth}.")
+    if max_chars is not None:
+        if max_chars < 1:
+            raise ValueError(f"max_chars must be at least 1, got {max_chars}.")
+        text = text[:max_chars]
+
+    consumed_chars = min(initial_chars, len(text))
+    while True:
+        recognition = recognize_batch([text[:consumed_chars]], method, classifier)
+        confidence = calculate_confidence(recognition.scores[0], method)
+        if confidence >= threshold or consumed_chars >= len(text):
+            return DetectionResult(recognition.labels[0], confidence, consumed_chars)
+        consumed_chars = min(consumed_chars * growth, len(text))
 
-    return language, extracted_text
\ No newline at end of file
@@ -0,0 +1,185 @@
+import codecs
+from html.parser import HTMLParser
+from fastapi import UploadFile
+from typing import AsyncIterator, List
+from src.models.models import HtmlParser
+
+CHUNK_SIZE = 64 * 1024
+SKIPPED_TAGS = {'script', 'style', 'template'}
+
+
+class TextCollector:
+    """
+    Parser target that collects the visible text of an HTML document while it is being parsed.
+    Text between two tags is buffered, stripped and emitted as one piece, the same way BeautifulSoup.get_text(strip=True) treats strings.
+    Comments, processing instructions and declarations are dropped but end the current piece, as they end a string in BeautifulSoup;
+    CDATA sections are kept as pieces of their own. The contents of script, style and template tags are skipped.
+
+    Attributes:
+        pieces (List[str]): Text pieces collected since the last call to pop_pieces.
+    """
+    def __init__(self):
+        self.pieces = []
+        self._buffer = []
+        self._skip_depth = 0
+
+    def _flush(self) -> None:
+        text = ''.join(self._buffer).strip()
+        self._buffer.clear()
+        if text:
+            self.pieces.append(text)
+
+    def start(self, tag: str, attrib=None) -> None:
+        self._flush()
+        if tag.lower() in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def end(self, tag: str) -> None:
+        self._flush()
+        if tag.lower() in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def data(self, data: str) -> None:
+        if not self._skip_depth:
+            self._buffer.append(data)
+
+    def cdata(self, data: str) -> None:
+        self._flush()
+        self.data(data)
+        self._flush()
+
+    def comment(self, text: str = None) -> None:
+        self._flush()
+
+    def pi(self, target: str = None, data: str = None) -> None:
+        self._flush()
+
+    def doctype(self, *args) -> None:
+        self._flush()
+
+    def close(self) -> None:
+        self._flush()
+
+    def pop_pieces(self) -> List[str]:
+        """
+        Returns the text pieces collected so far and forgets them.
+
+        Returns:
+            List[str]: Collected text pieces.
+        """
+        pieces, self.pieces = self.pieces, []
+        return pieces
+
+
+class _StandardParser(HTMLParser):
+    """
+    Incremental parser from the standard library that forwards its events to a TextCollector.
+    """
+    def __init__(self, collector: TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def handle_comment(self, data):
+        self.collector.comment(data)
+
+    def handle_pi(self, data):
+        self.collector.pi(data)
+
+    def handle_decl(self, decl):
+        self.collector.doctype(decl)
+
+    def unknown_decl(self, data):
+        if data.startswith('CDATA['):
+            self.collector.cdata(data[len('CDATA['):])
+        else:
+            self.collector.comment(data)
+
+    def close(self):
+        super().close()
+        self.collector.close()
+
+
+def create_parser(parser: HtmlParser, collector: TextCollector):
+    """
+    Creates an incremental HTML parser of the selected backend that feeds the given collector.
+
+    Args:
+        parser (HtmlParser): Parser backend. HtmlParser.LXML is faster, but requires the lxml package.
+        collector (TextCollector): Collector that receives the parser events.
+
+    Returns:
+        An object with feed(data: str) and close() methods.
+    """
+    if parser == HtmlParser.LXML:
+        from lxml import etree
+        return etree.HTMLParser(target=collector)
+    return _StandardParser(collector)
+
+
+async def iter_text(file: UploadFile, parser: HtmlParser = HtmlParser.HTML_PARSER, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[str]:
+    """
+    Reads an uploaded HTML file in chunks and yields its visible text piece by piece, as soon as each piece is parsed.
+    Neither the whole payload nor a document tree is kept in memory.
+
+    Args:
+        file (UploadFile): Uploaded HTML file.
+        parser (HtmlParser): Parser backend (default is the standard library parser).
+        chunk_size (int): Number of bytes read from the file at a time.
+
+    Yields:
+        str: Pieces of the visible text, in document order.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    collector = TextCollector()
+    html_parser = create_parser(parser, collector)
+
+    while chunk := await file.read(chunk_size):
+        html_parser.feed(decoder.decode(chunk))
+        for piece in collector.pop_pieces():
+            yield piece
+
+    html_parser.feed(decoder.decode(b"", final=True))
+    html_parser.close()
+    for piece in collector.pop_pieces():
+        yield piece
+
+
+async def extract_text(file: UploadFile, parser: HtmlParser = HtmlParser.HTML_PARSER) -> str:
+    """
+    Extracts the visible text from an uploaded HTML file.
+
+    Args:
+        file (UploadFile): Uploaded HTML file.
+        parser (HtmlParser): Parser backend (default is the standard library parser).
+
+    Returns:
+        str: Extracted text from the HTML file.
+    """
+    return " ".join([piece async for piece in iter_text(file, parser)])
+
+
+def extract_html_text(html: str, parser: HtmlParser = HtmlParser.HTML_PARSER) -> str:
+    """
+    Extracts the visible text from an HTML string that is already in memory.
+
+    Args:
+        html (str): HTML document.
+        parser (HtmlParser): Parser backend (default is the standard library parser).
+
+    Returns:
+        str: Extracted text of the document.
+    """
+    collector = TextCollector()
+    html_parser = create_parser(parser, collector)
+    html_parser.feed(html)
+    html_parser.close()
+    return " ".join(collector.pop_pieces())
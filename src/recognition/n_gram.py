@@ -1,8 +1,36 @@
-import re
+import csv
 import json
 import math
+import argparse
+import numpy as np
 from collections import Counter
-from typing import Mapping , List
+from functools import lru_cache
+from typing import Mapping , List, Dict, NamedTuple, Optional, Sequence, Tuple
+from .profiles import (PROFILES_DIR, DATASET_PATH, SUPPORTED_N, normalize_text, encode_texts, ngram_keys, decode_ngrams,
+                       text_scripts, language_scripts, candidate_languages, profile_path, discover_languages, read_profile)
+
+UNSEEN_PROBABILITY = 1e-10
+
+
+class CompiledProfiles(NamedTuple):
+    """
+    Language profiles compiled into an indexed array form.
+
+    Attributes:
+        languages (List[str]): Language names, in the order of the matrix rows.
+        vocabulary (Dict[str, int]): Maps every n-gram known to any profile to its column in the matrix.
+        log_probabilities (np.ndarray): Matrix of shape (languages, vocabulary + 1) with the log-probability of each n-gram.
+                                        The last column holds the log-probability of n-grams unseen by all profiles.
+        scripts (np.ndarray): Boolean matrix of shape (languages, scripts) with the scripts each language is written in.
+        alphabet (np.ndarray): Sorted code points of the letters of all n-grams in the vocabulary.
+        ngram_codes (np.ndarray): Matrix of shape (vocabulary, n) with the index in the alphabet of every letter of every n-gram.
+    """
+    languages: List[str]
+    vocabulary: Dict[str, int]
+    log_probabilities: np.ndarray
+    scripts: np.ndarray
+    alphabet: np.ndarray
+    ngram_codes: np.ndarray
 
 
 def preprocess_text(text: str) -> str:
@@ -13,10 +41,9 @@ def preprocess_text(text: str) -> str:
         text (str): Input text for analysis.
     
     Returns:
-        str: The processed text consists only of letters in the saved registry.
+        str: The processed text consists only of lowercase letters of any script.
     """
-    text = re.sub(r'[^a-zа-яёàèìòù]', '', text.lower())
-    return text
+    return normalize_text(text)
 
 def create_ngrams(text: str, n: int) -> List[str]:
     """
@@ -32,6 +59,20 @@ def create_ngrams(text: str, n: int) -> List[str]:
     ngrams = [text[i:i+n] for i in range(len(text) - n + 1)]
     return ngrams
 
+def count_ngrams(keys: np.ndarray) -> Dict[int, int]:
+    """
+    Counts n-gram keys in the order of their first occurrence, like a Counter of the n-grams would.
+
+    Args:
+        keys (np.ndarray): N-gram keys, as computed by ngram_keys.
+
+    Returns:
+        Dict[int, int]: Number of occurrences of each key.
+    """
+    distinct, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    order = np.argsort(first)
+    return dict(zip(distinct[order].tolist(), counts[order].tolist()))
+
 def build_profile(text: str, n: int = 2) -> Mapping[str, int]:
     """
     Creates a text profile as an n-gram frequency distribution.
@@ -43,11 +84,12 @@ def build_profile(text: str, n: int = 2) -> Mapping[str, int]:
     Returns:
         Mapping[str, int]: Text profile, which is a dictionary of n-grams and their frequencies.
     """
-    processed_text = preprocess_text(text)
-    ngrams_generated = create_ngrams(processed_text, n)
-    ngram_freq = Counter(ngrams_generated)
-    total_ngrams = sum(ngram_freq.values())
-    profile = {''.join(ngram): freq / total_ngrams for ngram, freq in ngram_freq.items()}
+    encoded = encode_texts([text])
+    _, keys = ngram_keys(encoded, n)
+    ngram_freq = count_ngrams(keys)
+    total_ngrams = len(keys)
+    ngrams = decode_ngrams(encoded.alphabet, np.fromiter(ngram_freq, dtype=np.int64, count=len(ngram_freq)), n)
+    profile = {ngram: freq / total_ngrams for ngram, freq in zip(ngrams, ngram_freq.values())}
     return profile
 
 def calculate_kullback_leibler_distance(user_profile: Mapping[str, int], language_profile: Mapping[str, int]) -> float:
@@ -68,9 +110,63 @@ def calculate_kullback_leibler_distance(user_profile: Mapping[str, int], languag
         distance += p_input * math.log(p_input / p_lang)
     return distance
 
+@lru_cache(maxsize=None)
+def load_profiles(n: int = 2, profiles_dir: str = PROFILES_DIR) -> CompiledProfiles:
+    """
+    Loads the profiles of every language found in the profiles directory for n-grams of the given dimension
+    and compiles them into a log-probability matrix.
+    The result is cached, so the files are read only on the first call for each n.
+
+    Args:
+        n (int): Dimension n-grams (default - 2).
+        profiles_dir (str): Directory of the profiles.
+
+    Returns:
+        CompiledProfiles: Compiled profiles of all languages.
+    """
+    if n not in SUPPORTED_N:
+        raise ValueError(f"Unsupported n-gram dimension: {n}. Supported dimensions are: {', '.join(map(str, SUPPORTED_N))}")
+
+    languages = discover_languages(n, profiles_dir)
+    if not languages:
+        raise FileNotFoundError(f"No {n}-gram language profiles found in {profiles_dir}")
+    language_profiles = {language: read_profile(language, n, profiles_dir) for language in languages}
+
+    vocabulary = {}
+    for language_profile in language_profiles.values():
+        for ngram in language_profile:
+            vocabulary.setdefault(ngram, len(vocabulary))
+
+    log_probabilities = np.full((len(languages), len(vocabulary) + 1), math.log(UNSEEN_PROBABILITY))
+    for row, language_profile in enumerate(language_profiles.values()):
+        columns = np.fromiter((vocabulary[ngram] for ngram in language_profile), dtype=np.intp, count=len(language_profile))
+        log_probabilities[row, columns] = np.log(np.fromiter(language_profile.values(), dtype=float, count=len(language_profile)))
+
+    scripts = np.array([language_scripts(language_profile) for language_profile in language_profiles.values()])
+    ngram_code_points = np.frombuffer(''.join(vocabulary).encode('utf-32-le'), dtype=np.uint32).reshape(len(vocabulary), n)
+    alphabet, ngram_codes = np.unique(ngram_code_points, return_inverse=True)
+    return CompiledProfiles(languages, vocabulary, log_probabilities, scripts, alphabet, ngram_codes.reshape(len(vocabulary), n))
+
+def calculate_kullback_leibler_distances(user_profile: Mapping[str, float], profiles: CompiledProfiles) -> np.ndarray:
+    """
+    Calculates the Kullback-Leibler distance between the user's text profile and every compiled language profile in one pass.
+
+    Args:
+        user_profile (Mapping[str, float]): User profile with n-gram frequencies.
+        profiles (CompiledProfiles): Compiled language profiles.
+
+    Returns:
+        np.ndarray: Distances to each language, in the order of profiles.languages.
+    """
+    unseen_column = len(profiles.vocabulary)
+    p_input = np.fromiter(user_profile.values(), dtype=float, count=len(user_profile))
+    columns = np.fromiter((profiles.vocabulary.get(ngram, unseen_column) for ngram in user_profile), dtype=np.intp, count=len(user_profile))
+    return p_input @ np.log(p_input) - profiles.log_probabilities[:, columns] @ p_input
+
 def recognize_language(text: str, n: int = 2) -> str:
     """
     Determines the language of the text by comparing the text profile with language profiles based on n-grams and Kullback-Leibler distance.
+    The text is scored as a batch of one, so it gets the same language as in recognize_languages.
 
     Args:
         text (str): Text for language recognition.
@@ -79,19 +175,112 @@ def recognize_language(text: str, n: int = 2) -> str:
     Returns:
         str: The name of the language that most likely matches the text.
     """
-    with open('src/recognition/datasets_profile/italian_language_profile.json') as file:
-        it_dataset_profile = json.load(file)
-            
-    with open('src/recognition/datasets_profile/russian_language_profile.json') as file:
-        ru_dataset_profile = json.load(file)
-
-    language_profiles = {
-        'italian': it_dataset_profile,
-        'russian': ru_dataset_profile,
-    }
-
-    user_profile = build_profile(text, n)
-    distances = {}
-    for language, language_profile in language_profiles.items():
-        distances[language] = calculate_kullback_leibler_distance(user_profile, language_profile)
-    return min(distances, key=distances.get)
\ No newline at end of file
+    return recognize_languages([text], n)[0][0]
+
+def recognize_languages(texts: List[str], n: int = 2) -> Tuple[List[str], np.ndarray]:
+    """
+    Determines the languages of many texts at once.
+    The letters of all texts are encoded once, and the n-grams are counted over rolling integer keys of the codes.
+    Texts are then grouped by the scripts they are written in, and the Kullback-Leibler distances of each group are summed
+    with one bincount per language written in that script; the distances to the other languages are infinite.
+    Every text is scored on its own n-grams and scripts only, so its language does not depend on the other texts of the batch.
+    A text without n-grams has zero distance to each of its candidate languages, and the first of them is chosen.
+
+    Args:
+        texts (List[str]): Texts for language recognition.
+        n (int): Dimension n-grams (default - 2).
+
+    Returns:
+        Tuple[List[str], np.ndarray]: The most likely language of each text and a matrix of shape (texts, languages)
+                                      with the Kullback-Leibler distances, in the order of the compiled profiles.
+    """
+    profiles = load_profiles(n)
+    encoded = encode_texts(texts, profiles.alphabet)
+    rows, keys = ngram_keys(encoded, n)
+    distances = np.full((len(texts), len(profiles.languages)), np.inf)
+    entropy = np.zeros(len(texts))
+    entry_rows, p_input, columns = np.empty(0, dtype=np.intp), np.empty(0), np.empty(0, dtype=np.intp)
+
+    if len(keys):
+        distinct_keys, key_index = np.unique(keys, return_inverse=True)
+        entries, entry_index = np.unique(rows * len(distinct_keys) + key_index.ravel(), return_inverse=True)
+        counts = np.bincount(entry_index.ravel())
+        entry_rows, entry_key_index = np.divmod(entries, len(distinct_keys))
+
+        total_ngrams = np.bincount(rows, minlength=len(texts)).astype(float)
+        p_input = counts / total_ngrams[entry_rows]
+        entropy = np.bincount(entry_rows, weights=p_input * np.log(p_input), minlength=len(texts))
+
+        base = np.int64(len(encoded.alphabet))
+        vocabulary_keys = profiles.ngram_codes @ base ** np.arange(n - 1, -1, -1, dtype=np.int64)
+        order = np.argsort(vocabulary_keys)
+        positions = np.minimum(np.searchsorted(vocabulary_keys[order], distinct_keys), len(order) - 1)
+        key_columns = np.where(vocabulary_keys[order][positions] == distinct_keys, order[positions], len(profiles.vocabulary))
+        columns = key_columns[entry_key_index]
+
+    for group_rows, languages in candidate_languages(profiles.scripts, text_scripts(encoded)):
+        in_group = np.isin(entry_rows, group_rows)
+        for language in languages:
+            cross_entropy = np.bincount(entry_rows[in_group], minlength=len(texts),
+                                        weights=p_input[in_group] * profiles.log_probabilities[language, columns[in_group]])
+            distances[group_rows, language] = entropy[group_rows] - cross_entropy[group_rows]
+
+    predicted_languages = [profiles.languages[index] for index in distances.argmin(axis=1)]
+    return predicted_languages, distances
+
+def build_language_profiles(n: int, dataset_path: str = DATASET_PATH, max_ngrams: int = 5000,
+                            languages: Optional[Sequence[str]] = None, profiles_dir: str = PROFILES_DIR) -> List[str]:
+    """
+    Builds n-gram profiles for every language of a labeled dataset and saves them to the profiles directory,
+    where load_profiles discovers them. Unigram profiles also serve as letter frequencies for the alphabet method.
+    N-grams are counted within each text separately, so that no n-gram spans two texts.
+
+    Args:
+        n (int): Dimension n-grams.
+        dataset_path (str): Path to a CSV file with the “Text” and “Language” columns.
+        max_ngrams (int): Maximum number of the most frequent n-grams kept in each profile.
+        languages (Optional[Sequence[str]]): If set, only profiles of these languages are built.
+        profiles_dir (str): Directory the profiles are saved to.
+
+    Returns:
+        List[str]: Languages the profiles were built for.
+    """
+    selected = {language.lower() for language in languages} if languages else None
+    texts, text_languages = [], []
+    with open(dataset_path, encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            language = row['Language'].strip().lower()
+            if selected is None or language in selected:
+                texts.append(row['Text'])
+                text_languages.append(language)
+
+    encoded = encode_texts(texts)
+    rows, keys = ngram_keys(encoded, n)
+    built_languages = list(dict.fromkeys(text_languages))
+    ngram_languages = np.array([built_languages.index(language) for language in text_languages], dtype=np.intp)[rows]
+    for index, language in enumerate(built_languages):
+        language_keys = keys[ngram_languages == index]
+        total_ngrams = len(language_keys)
+        if not total_ngrams:
+            continue
+        most_common = Counter(count_ngrams(language_keys)).most_common(max_ngrams)
+        ngrams = decode_ngrams(encoded.alphabet, np.array([key for key, _ in most_common], dtype=np.int64), n)
+        profile = {ngram: freq / total_ngrams for ngram, (_, freq) in zip(ngrams, most_common)}
+        with open(profile_path(language, n, profiles_dir), 'w', encoding='utf-8') as file:
+            json.dump(profile, file, ensure_ascii=False, indent=4)
+    load_profiles.cache_clear()
+    return sorted(built_languages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds n-gram language profiles from a labeled dataset.")
+    parser.add_argument("n", type=int, nargs="+", choices=SUPPORTED_N, help="Dimensions of n-grams to build profiles for.")
+    parser.add_argument("--dataset", default=DATASET_PATH, help="Path to the labeled CSV dataset.")
+    parser.add_argument("--max-ngrams", type=int, default=5000, help="Maximum number of n-grams kept in each profile.")
+    parser.add_argument("--languages", nargs="+", help="Languages to build profiles for (default: every language of the dataset).")
+    parser.add_argument("--profiles-dir", default=PROFILES_DIR, help="Directory the profiles are saved to.")
+    args = parser.parse_args()
+
+    for n in args.n:
+        built_languages = build_language_profiles(n, args.dataset, args.max_ngrams, args.languages, args.profiles_dir)
+        print(f"{n}-gram profiles: {', '.join(built_languages)}")
\ No newline at end of file
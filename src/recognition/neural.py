@@ -1,65 +1,193 @@
-import pandas as pd
+import os
+import json
+import argparse
 import numpy as np
-from sklearn.model_selection import train_test_split
+from typing import List, Mapping, Tuple
 from sklearn.feature_extraction.text import CountVectorizer
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense
-from tensorflow.keras.utils import to_categorical
 
 PATH = '/home/user/lang-text-recognition/src/recognition/datasets_profile/Filtered_Language_Detection.csv'
+ARTIFACT_DIR = 'src/recognition/artifacts/language_classifier'
+ARTIFACT_VERSION = 1
+LANGUAGES = ['russian', 'italian']
+
+
+def artifact_path(artifact_dir: str = ARTIFACT_DIR, version: int = ARTIFACT_VERSION) -> str:
+    """
+    Returns the directory of a versioned classifier artifact.
+
+    Args:
+        artifact_dir (str): Base directory of the classifier artifacts.
+        version (int): Artifact version.
+
+    Returns:
+        str: Path to the artifact directory.
+    """
+    return os.path.join(artifact_dir, f"v{version}")
+
+
+def train_classifier(dataset_path: str = PATH, artifact_dir: str = ARTIFACT_DIR, epochs: int = 10) -> str:
+    """
+    Trains the language classifier and saves the vectorizer vocabulary and the model weights as a versioned artifact.
+
+    The CSV file must contain two columns:
+    - “Text”: Text data.
+    - “Language”: Language labels ('Russian' or 'Italian').
+
+    Args:
+        dataset_path (str): Path to the labeled CSV dataset.
+        artifact_dir (str): Base directory of the classifier artifacts.
+        epochs (int): Number of training epochs (default is 10).
+
+    Returns:
+        str: Path to the saved artifact directory.
+    """
+    # Training dependencies are imported here so that loading a trained classifier does not require them.
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense
+    from tensorflow.keras.utils import to_categorical
+
+    data = pd.read_csv(dataset_path)
+    data = data[['Text', 'Language']]
+    data['Language'] = data['Language'].map({'Russian': 0, 'Italian': 1})
+    data = data.dropna(subset=['Language'])
+
+    texts = data['Text'].values
+    labels = data['Language'].values
+
+    vectorizer = CountVectorizer()
+    X = vectorizer.fit_transform(texts).toarray()
+
+    X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
+
+    y_train = to_categorical(y_train)
+    y_test = to_categorical(y_test)
+
+    model = Sequential([
+        Dense(64, input_shape=(X_train.shape[1],), activation='relu'),
+        Dense(32, activation='relu'),
+        Dense(2, activation='softmax')
+    ])
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    history = model.fit(X_train, y_train, epochs=epochs, batch_size=4, validation_data=(X_test, y_test))
+
+    path = artifact_path(artifact_dir)
+    os.makedirs(path, exist_ok=True)
+
+    with open(os.path.join(path, 'vocabulary.json'), 'w', encoding='utf-8') as file:
+        json.dump({term: int(index) for term, index in vectorizer.vocabulary_.items()}, file, ensure_ascii=False)
+
+    weights = {}
+    for i, layer in enumerate(model.layers):
+        kernel, bias = layer.get_weights()
+        weights[f'kernel_{i}'] = kernel
+        weights[f'bias_{i}'] = bias
+    np.savez(os.path.join(path, 'weights.npz'), **weights)
+
+    with open(os.path.join(path, 'metadata.json'), 'w', encoding='utf-8') as file:
+        json.dump({
+            'version': ARTIFACT_VERSION,
+            'languages': LANGUAGES,
+            'layers': len(model.layers),
+            'epochs': epochs,
+            'val_accuracy': float(history.history['val_accuracy'][-1]),
+        }, file, indent=4)
+
+    return path
+
 
 class LanguageClassifier:
     """
     The LanguageClassifier class is designed to classify the language of a text based on a trained neural network model.
     This class accepts text data and determines in which language the text is written (Russian or Italian).
+    The model is trained separately by train_classifier, the classifier only restores the saved artifact and runs inference.
 
     Attributes:
-        data (pd.DataFrame): Data with texts and language labels.
         vectorizer (CountVectorizer): Text vectorizer for converting text data into numeric form.
-        model (Sequential): A neural network for text language classification.
+        layers (List[Tuple[np.ndarray, np.ndarray]]): Kernels and biases of the dense layers of the network.
+        languages (List[str]): Language names, in the order of the network outputs.
 
     Methods:
-        __init__(): Loads and prepares data and trains a model on textual data.
+        __init__(vocabulary: Mapping[str, int], layers: List[Tuple[np.ndarray, np.ndarray]], languages: List[str] = LANGUAGES): Creates a classifier from a vocabulary and layer weights.
+        load(artifact_dir: str = ARTIFACT_DIR, version: int = ARTIFACT_VERSION) -> LanguageClassifier: Restores a classifier from a saved artifact.
         predict_language(text: str) -> str: Accepts a string of text and returns the predicted language ('russian' or 'italian').
+        predict_languages(texts: List[str]) -> Tuple[List[str], np.ndarray]: Predicts the languages of many texts in one pass.
     """
-    def __init__(self):
+    def __init__(self, vocabulary: Mapping[str, int], layers: List[Tuple[np.ndarray, np.ndarray]], languages: List[str] = LANGUAGES):
         """
         Initialization of LanguageClassifier class.
 
-        Loads and processes text data from a CSV file. The data is vectorized and
-        split into training and test samples. A neural network is then trained
-        to categorize the text into languages.
-
-        The CSV file must contain two columns:
-        - “Text”: Text data.
-        - “Language”: Language labels ('Russian' or 'Italian').
+        Args:
+            vocabulary (Mapping[str, int]): Vocabulary of the vectorizer the model was trained with.
+            layers (List[Tuple[np.ndarray, np.ndarray]]): Kernel and bias of every dense layer.
+            languages (List[str]): Language names, in the order of the network outputs.
         """
-        self.data = pd.read_csv(PATH)
-
-        self.data = self.data[['Text', 'Language']]
-
-        self.data['Language'] = self.data['Language'].map({'Russian': 0, 'Italian': 1})
+        self.vectorizer = CountVectorizer(vocabulary=vocabulary)
+        self.layers = layers
+        self.languages = languages
 
-        self.data = self.data.dropna(subset=['Language'])
+    @classmethod
+    def load(cls, artifact_dir: str = ARTIFACT_DIR, version: int = ARTIFACT_VERSION, mmap: bool = False) -> "LanguageClassifier":
+        """
+        Restores a trained classifier from a versioned artifact saved by train_classifier.
+        With mmap=True the layer weights are memory-mapped from .npy files in the artifact instead of read into memory,
+        so that processes share them. The files are extracted from weights.npz on the first such load.
 
-        texts = self.data['Text'].values
-        labels = self.data['Language'].values
+        Args:
+            artifact_dir (str): Base directory of the classifier artifacts.
+            version (int): Artifact version.
+            mmap (bool): Memory-map the layer weights (default is False).
 
-        self.vectorizer = CountVectorizer()
-        X = self.vectorizer.fit_transform(texts).toarray()
+        Returns:
+            LanguageClassifier: Classifier ready for inference.
+        """
+        path = artifact_path(artifact_dir, version)
+
+        with open(os.path.join(path, 'metadata.json'), encoding='utf-8') as file:
+            metadata = json.load(file)
+        if metadata['version'] != version:
+            raise ValueError(f"Artifact in '{path}' has version {metadata['version']}, expected {version}.")
+
+        with open(os.path.join(path, 'vocabulary.json'), encoding='utf-8') as file:
+            vocabulary = json.load(file)
+
+        names = [name for i in range(metadata['layers']) for name in (f'kernel_{i}', f'bias_{i}')]
+        if mmap:
+            weights_dir = os.path.join(path, 'weights')
+            if not os.path.isdir(weights_dir):
+                with np.load(os.path.join(path, 'weights.npz')) as weights:
+                    os.makedirs(weights_dir + '.tmp', exist_ok=True)
+                    for name in names:
+                        np.save(os.path.join(weights_dir + '.tmp', f'{name}.npy'), weights[name])
+                os.replace(weights_dir + '.tmp', weights_dir)
+            arrays = {name: np.load(os.path.join(weights_dir, f'{name}.npy'), mmap_mode='r') for name in names}
+        else:
+            with np.load(os.path.join(path, 'weights.npz')) as weights:
+                arrays = {name: weights[name] for name in names}
+        layers = [(arrays[f'kernel_{i}'], arrays[f'bias_{i}']) for i in range(metadata['layers'])]
+
+        return cls(vocabulary, layers, metadata['languages'])
+
+    def predict_probabilities(self, texts: List[str]) -> np.ndarray:
+        """
+        Runs the network on the sparse bag-of-words vectors of the texts.
+        The first layer multiplies the sparse matrix directly, so the input is never densified.
 
-        X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42)
+        Args:
+            texts (List[str]): Texts to be classified.
 
-        y_train = to_categorical(y_train)
-        y_test = to_categorical(y_test)
+        Returns:
+            np.ndarray: Matrix of shape (texts, languages) with the predicted probabilities.
+        """
+        activations = self.vectorizer.transform(texts)
+        for i, (kernel, bias) in enumerate(self.layers):
+            activations = activations @ kernel + bias
+            if i < len(self.layers) - 1:
+                activations = np.maximum(activations, 0)
 
-        self.model = Sequential([
-            Dense(64, input_shape=(X_train.shape[1],), activation='relu'),
-            Dense(32, activation='relu'),
-            Dense(2, activation='softmax')
-        ])
-        self.model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
-        self.model.fit(X_train, y_train, epochs=10, batch_size=4, validation_data=(X_test, y_test))
+        activations = np.exp(activations - activations.max(axis=1, keepdims=True))
+        return activations / activations.sum(axis=1, keepdims=True)
 
     def predict_language(self, text: str) -> str:
         """
@@ -71,9 +199,31 @@ class LanguageClassifier:
         Returns:
             str: The name of the predicted language ('russian' or 'italian').
         """
-        text_vectorized = self.vectorizer.transform([text]).toarray()
-        prediction = self.model.predict(text_vectorized)
+        prediction = self.predict_probabilities([text])
         predicted_label = np.argmax(prediction)
+        return self.languages[predicted_label]
+
+    def predict_languages(self, texts: List[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        Determining the languages of many texts with a single vectorizer and model pass.
+
+        Args:
+            texts (List[str]): The texts whose languages are to be determined.
+
+        Returns:
+            Tuple[List[str], np.ndarray]: The predicted language of each text and a matrix of shape (texts, languages)
+                                          with the predicted probabilities, in the order of self.languages.
+        """
+        probabilities = self.predict_probabilities(texts)
+        predicted_languages = [self.languages[index] for index in np.argmax(probabilities, axis=1)]
+        return predicted_languages, probabilities
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trains the neural language classifier and saves it as a versioned artifact.")
+    parser.add_argument("--dataset", default=PATH, help="Path to the labeled CSV dataset.")
+    parser.add_argument("--artifact-dir", default=ARTIFACT_DIR, help="Base directory of the classifier artifacts.")
+    parser.add_argument("--epochs", type=int, default=10, help="Number of training epochs.")
+    args = parser.parse_args()
 
-        languages = {0: 'russian', 1: 'italian'}
-        return languages.get(predicted_label, "Unknown")
+    print(train_classifier(args.dataset, args.artifact_dir, args.epochs))
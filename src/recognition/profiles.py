@@ -0,0 +1,268 @@
+import os
+import re
+import json
+import unicodedata
+import numpy as np
+from typing import Dict, List, Mapping, NamedTuple, Sequence, Tuple
+
+PROFILES_DIR = 'src/recognition/datasets_profile'
+DATASET_PATH = f'{PROFILES_DIR}/Filtered_Language_Detection.csv'
+SUPPORTED_N = (1, 2, 3, 4)
+SCRIPT_SHARE = 0.05
+TEXT_SCRIPT_SHARE = 0.2
+
+# First code point of every range and the script of the range; ranges without a script are None.
+SCRIPT_RANGES = (
+    (0x0000, None), (0x0041, 'latin'), (0x0250, None), (0x0370, 'greek'), (0x0400, 'cyrillic'), (0x0530, 'armenian'),
+    (0x0590, 'hebrew'), (0x0600, 'arabic'), (0x0700, None), (0x0900, 'devanagari'), (0x0980, 'bengali'), (0x0A00, None),
+    (0x0E00, 'thai'), (0x0E80, None), (0x10A0, 'georgian'), (0x1100, 'hangul'), (0x1200, None), (0x1E00, 'latin'),
+    (0x1F00, 'greek'), (0x2000, None), (0x3040, 'kana'), (0x3100, None), (0x3400, 'han'), (0x4DC0, None), (0x4E00, 'han'),
+    (0xA000, None), (0xAC00, 'hangul'), (0xD7B0, None), (0xF900, 'han'), (0xFB00, None),
+)
+SCRIPTS = sorted({script for _, script in SCRIPT_RANGES if script is not None})
+_RANGE_STARTS = np.array([start for start, _ in SCRIPT_RANGES], dtype=np.uint32)
+_RANGE_SCRIPTS = np.array([SCRIPTS.index(script) if script is not None else len(SCRIPTS) for _, script in SCRIPT_RANGES])
+_PROFILE_FILE = re.compile(r'^(?P<language>.+?)_language_profile(?:_(?P<n>\d+))?\.json$')
+_NON_LETTERS = re.compile(r'[\W\d_]+')
+_NO_CODE_POINTS = np.empty(0, dtype=np.uint32)
+
+
+class EncodedTexts(NamedTuple):
+    """
+    Letters of many texts encoded as one integer array, from which letter and n-gram counts are derived with array operations.
+
+    Attributes:
+        alphabet (np.ndarray): Code points of the letters; every letter is encoded as its index here.
+                               The supported alphabet comes first, followed by the other letters of the texts in code point order.
+        supported (int): Size of the supported alphabet: codes below it are letters known to the profiles.
+        codes (np.ndarray): Codes of the letters of all texts, one text after another.
+        offsets (np.ndarray): Start of every text in codes, followed by the end of the last text.
+
+    Methods:
+        rows() -> np.ndarray: Returns the index of the text of every code.
+    """
+    alphabet: np.ndarray
+    supported: int
+    codes: np.ndarray
+    offsets: np.ndarray
+
+    def rows(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+
+
+def normalize_text(text: str) -> str:
+    """
+    Prepares text for profiling: composes characters to the NFC form, lowercases them and removes everything except letters.
+    Letters of every script are kept.
+
+    Args:
+        text (str): Input text.
+
+    Returns:
+        str: Lowercase letters of the text.
+    """
+    return _NON_LETTERS.sub('', unicodedata.normalize('NFC', text).lower())
+
+
+def encode_texts(texts: Sequence[str], supported: np.ndarray = _NO_CODE_POINTS) -> EncodedTexts:
+    """
+    Encodes the letters of texts over an alphabet in one pass. The texts are composed to the NFC form, lowercased and
+    converted to code points as a whole; the letters are then selected and encoded with lookups over the distinct code points,
+    so no Python object is created per character. The same letters are kept as by normalize_text.
+
+    Args:
+        texts (Sequence[str]): Input texts.
+        supported (np.ndarray): Sorted code points of the supported alphabet, e.g. the letters of the profiles.
+
+    Returns:
+        EncodedTexts: Encoded letters of the texts.
+    """
+    lowered = [unicodedata.normalize('NFC', text).lower() for text in texts]
+    code_points = np.frombuffer(''.join(lowered).encode('utf-32-le'), dtype=np.uint32)
+    rows = np.repeat(np.arange(len(lowered)), [len(text) for text in lowered])
+
+    distinct, inverse = np.unique(code_points, return_inverse=True)
+    is_letter = np.fromiter((char.isalnum() and not char.isdecimal() for char in map(chr, distinct.tolist())),
+                            dtype=bool, count=len(distinct))
+    letters = distinct[is_letter]
+
+    positions = np.minimum(np.searchsorted(supported, letters), max(len(supported) - 1, 0))
+    known = supported[positions] == letters if len(supported) else np.zeros(len(letters), dtype=bool)
+    unknown = letters[~known]
+    letter_codes = np.where(known, positions, len(supported) + np.searchsorted(unknown, letters))
+
+    distinct_codes = np.full(len(distinct), -1, dtype=np.int64)
+    distinct_codes[is_letter] = letter_codes
+    codes = distinct_codes[inverse.ravel()]
+    keep = codes >= 0
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(rows[keep], minlength=len(lowered)))))
+    return EncodedTexts(np.concatenate((supported, unknown)).astype(np.uint32), len(supported), codes[keep], offsets)
+
+
+def ngram_keys(encoded: EncodedTexts, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes a rolling integer key of every n-gram of the encoded texts: the codes of its letters as digits
+    in base len(alphabet). N-grams never span two texts.
+
+    Args:
+        encoded (EncodedTexts): Encoded texts.
+        n (int): Dimension n-grams.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Index of the text of every n-gram and the keys of the n-grams, in text order.
+    """
+    base = max(len(encoded.alphabet), 1)
+    if base ** n > np.iinfo(np.int64).max:
+        raise ValueError(f"Too many distinct letters ({base}) to key {n}-grams with 64-bit integers.")
+    rows = encoded.rows()
+    count = max(len(encoded.codes) - n + 1, 0)
+    keys = np.zeros(count, dtype=np.int64)
+    for offset in range(n):
+        keys = keys * base + encoded.codes[offset:offset + count]
+    within_text = rows[:count] == rows[n - 1:n - 1 + count]
+    return rows[:count][within_text], keys[within_text]
+
+
+def decode_ngrams(alphabet: np.ndarray, keys: np.ndarray, n: int) -> List[str]:
+    """
+    Converts n-gram keys computed by ngram_keys back to strings.
+
+    Args:
+        alphabet (np.ndarray): Alphabet the keys were computed over.
+        keys (np.ndarray): N-gram keys.
+        n (int): Dimension n-grams.
+
+    Returns:
+        List[str]: The n-grams.
+    """
+    base = max(len(alphabet), 1)
+    codes = (keys[:, np.newaxis] // base ** np.arange(n - 1, -1, -1, dtype=np.int64)) % base
+    chars = alphabet[codes].astype('<u4').tobytes().decode('utf-32-le')
+    return [chars[i:i + n] for i in range(0, len(chars), n)]
+
+
+def script_counts(text: str) -> np.ndarray:
+    """
+    Counts the characters of a text by script.
+
+    Args:
+        text (str): Normalized text.
+
+    Returns:
+        np.ndarray: Number of characters of each script, in the order of SCRIPTS, followed by the number of characters of no known script.
+    """
+    code_points = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    scripts = _RANGE_SCRIPTS[np.searchsorted(_RANGE_STARTS, code_points, side='right') - 1]
+    return np.bincount(scripts, minlength=len(SCRIPTS) + 1)
+
+
+def text_scripts(encoded: EncodedTexts) -> np.ndarray:
+    """
+    Determines the scripts each text is written in: a script counts if it holds at least TEXT_SCRIPT_SHARE of the letters,
+    so that a few foreign names do not add a script, while texts that mix scripts keep all of them.
+
+    Args:
+        encoded (EncodedTexts): Encoded texts.
+
+    Returns:
+        np.ndarray: Boolean matrix of shape (texts, SCRIPTS).
+    """
+    texts = len(encoded.offsets) - 1
+    alphabet_scripts = _RANGE_SCRIPTS[np.searchsorted(_RANGE_STARTS, encoded.alphabet, side='right') - 1]
+    keys = encoded.rows() * (len(SCRIPTS) + 1) + alphabet_scripts[encoded.codes]
+    counts = np.bincount(keys, minlength=texts * (len(SCRIPTS) + 1)).reshape(texts, len(SCRIPTS) + 1)
+    return counts[:, :len(SCRIPTS)] >= TEXT_SCRIPT_SHARE * np.maximum(counts.sum(axis=1, keepdims=True), 1)
+
+
+def language_scripts(profile: Mapping[str, float]) -> np.ndarray:
+    """
+    Determines the scripts a language is written in from its profile: a script is used by the language
+    if the n-grams starting with a character of the script hold at least SCRIPT_SHARE of the profile.
+
+    Args:
+        profile (Mapping[str, float]): Frequencies of the n-grams or letters of the language.
+
+    Returns:
+        np.ndarray: Boolean mask over SCRIPTS.
+    """
+    shares = np.zeros(len(SCRIPTS) + 1)
+    for ngram, frequency in profile.items():
+        shares += script_counts(ngram[:1]) * frequency
+    total = shares.sum()
+    return shares[:len(SCRIPTS)] >= SCRIPT_SHARE * total if total > 0 else np.zeros(len(SCRIPTS), dtype=bool)
+
+
+def candidate_languages(scripts: np.ndarray, texts_scripts: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Groups texts by the languages they can be written in, so that each group is scored only against its candidate languages:
+    the languages that use at least one script of the texts. Texts without letters of a known script,
+    or with scripts that no language uses, are scored against all languages.
+
+    Args:
+        scripts (np.ndarray): Boolean matrix of shape (languages, SCRIPTS) with the scripts of every language.
+        texts_scripts (np.ndarray): Boolean matrix of shape (texts, SCRIPTS), as returned by text_scripts.
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray]]: Indices of the texts of each group and of their candidate languages.
+    """
+    all_languages = np.arange(len(scripts))
+    keys = texts_scripts @ (1 << np.arange(len(SCRIPTS)))
+    groups = []
+    for key in np.unique(keys):
+        script_set = texts_scripts[np.argmax(keys == key)]
+        languages = np.flatnonzero(scripts[:, script_set].any(axis=1))
+        groups.append((np.flatnonzero(keys == key), languages if len(languages) else all_languages))
+    return groups
+
+
+def profile_path(language: str, n: int, profiles_dir: str = PROFILES_DIR) -> str:
+    """
+    Returns the path to the profile file of a language for n-grams of the given dimension.
+    Bigram profiles keep their original file names.
+
+    Args:
+        language (str): Language name.
+        n (int): Dimension n-grams.
+        profiles_dir (str): Directory of the profiles.
+
+    Returns:
+        str: Path to the JSON profile file.
+    """
+    if n == 2:
+        return f'{profiles_dir}/{language}_language_profile.json'
+    return f'{profiles_dir}/{language}_language_profile_{n}.json'
+
+
+def discover_languages(n: int, profiles_dir: str = PROFILES_DIR) -> List[str]:
+    """
+    Lists the languages that have a profile for n-grams of the given dimension in the profiles directory.
+
+    Args:
+        n (int): Dimension n-grams.
+        profiles_dir (str): Directory of the profiles.
+
+    Returns:
+        List[str]: Sorted language names.
+    """
+    languages = []
+    for file_name in os.listdir(profiles_dir):
+        match = _PROFILE_FILE.match(file_name)
+        if match and int(match.group('n') or 2) == n:
+            languages.append(match.group('language'))
+    return sorted(languages)
+
+
+def read_profile(language: str, n: int, profiles_dir: str = PROFILES_DIR) -> Dict[str, float]:
+    """
+    Reads the profile of a language for n-grams of the given dimension.
+
+    Args:
+        language (str): Language name.
+        n (int): Dimension n-grams.
+        profiles_dir (str): Directory of the profiles.
+
+    Returns:
+        Dict[str, float]: Frequencies of the n-grams of the language.
+    """
+    with open(profile_path(language, n, profiles_dir), encoding='utf-8') as file:
+        return json.load(file)
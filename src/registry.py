@@ -0,0 +1,135 @@
+import logging
+import threading
+from typing import Dict, Iterable, Mapping, Optional
+from .abstracting.classic_abstract import TextSummarizer
+from .abstracting.document import DOCUMENT_VERSION
+from .abstracting.neural_abstract import BilingualSummarizer, MODEL_CLASSES
+from .recognition.neural import LanguageClassifier, ARTIFACT_VERSION
+from .recognition.controller import profiles_version
+from .utils import PATH
+from .workers import corpus_version
+from .models.models import InferenceBackend, PartSplitter
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    The ModelRegistry class holds the corpus statistics and summarization models that live for the whole lifetime of the application.
+    It is built once when the application starts and shared by all requests, instead of reloading the corpus and models on every call.
+
+    Attributes:
+        corpus_path (str): Path to the JSON file with information about the corpus documents.
+        lazy (bool): If True, the neural models are loaded on the first request for their language instead of at startup.
+        backends (Mapping[str, InferenceBackend]): Inference backend of the neural summarization model of each language.
+        splitters (Mapping[str, PartSplitter]): Part splitter of the neural summarization of each language.
+        mmap_weights (bool): If True, the weights of the neural models and the classifier are memory-mapped from files,
+                             so that processes share them. Languages without an explicit backend use InferenceBackend.TORCH_MMAP.
+        summarizer (TextSummarizer): Classic summarizer built over the corpus.
+        bilingual_summarizer (BilingualSummarizer): Neural summarizer with the T5 and Pegasus models.
+        classifier (Optional[LanguageClassifier]): Pre-trained neural language classifier, or None if no artifact was found.
+
+    Methods:
+        __init__(corpus_path: str = PATH, lazy: bool = False, backends: Optional[Mapping[str, InferenceBackend]] = None,
+                 splitters: Optional[Mapping[str, PartSplitter]] = None, mmap_weights: bool = False) -> None: Builds the corpus statistics and the models.
+        warm_up(languages: Iterable[str] = None) -> None: Loads the models for the given languages in advance.
+        reload() -> None: Rebuilds the corpus statistics and models and replaces the current ones in place.
+        stage_versions() -> Dict[str, str]: Describes the models and configuration every pipeline stage depends on.
+        model_memory() -> Dict[str, int]: Measures the memory held by the parameters of the loaded models.
+    """
+    def __init__(self, corpus_path: str = PATH, lazy: bool = False, backends: Optional[Mapping[str, InferenceBackend]] = None,
+                 splitters: Optional[Mapping[str, PartSplitter]] = None, mmap_weights: bool = False):
+        self.corpus_path = corpus_path
+        self.lazy = lazy
+        self.mmap_weights = mmap_weights
+        self.backends = dict(backends or {})
+        if mmap_weights:
+            self.backends = {**{language: InferenceBackend.TORCH_MMAP for language in MODEL_CLASSES}, **self.backends}
+        self.splitters = dict(splitters or {})
+        self._lock = threading.Lock()
+        self.summarizer, self.bilingual_summarizer, self.classifier = self._build()
+
+    def _build(self):
+        """
+        Loads the corpus and creates new summarizer and classifier instances.
+
+        Returns:
+            Tuple[TextSummarizer, BilingualSummarizer, Optional[LanguageClassifier]]: The classic and the neural summarizers and the language classifier.
+        """
+        summarizer = TextSummarizer.from_corpus(self.corpus_path)
+        bilingual_summarizer = BilingualSummarizer(lazy=self.lazy, backends=self.backends, splitters=self.splitters)
+
+        try:
+            classifier = LanguageClassifier.load(mmap=self.mmap_weights)
+        except FileNotFoundError:
+            logger.warning("Language classifier artifact not found, the neural recognition method is disabled. "
+                           "Train it with `python -m src.recognition.neural`.")
+            classifier = None
+
+        return summarizer, bilingual_summarizer, classifier
+
+    def warm_up(self, languages: Optional[Iterable[str]] = None) -> None:
+        """
+        Loads the neural models in advance so that the first request does not pay for it.
+
+        Args:
+            languages (Iterable[str]): Languages to load. All supported languages are loaded by default.
+        """
+        for language in languages or MODEL_CLASSES:
+            self.bilingual_summarizer.load_language(language)
+
+    def reload(self) -> None:
+        """
+        Rebuilds the corpus statistics and the models, then swaps them in.
+        Languages that were already loaded in lazy mode are loaded again before the swap.
+        Requests that are already running keep using the previous instances until they finish.
+        """
+        with self._lock:
+            summarizer, bilingual_summarizer, classifier = self._build()
+            if self.lazy:
+                for language in self.bilingual_summarizer.models:
+                    bilingual_summarizer.load_language(language)
+            self.summarizer, self.bilingual_summarizer, self.classifier = summarizer, bilingual_summarizer, classifier
+
+    def stage_versions(self) -> Dict[str, str]:
+        """
+        Describes the models, corpus state and configuration that the output of every pipeline stage depends on.
+        Used in cache keys, so that cached results are not reused after a model, corpus or configuration change.
+
+        Returns:
+            Dict[str, str]: Version string of each stage ("language", "keywords", "keywords_tfidf", "classic", "neural")
+                            and of the document parsing the last three share ("document").
+        """
+        summarizer = self.summarizer
+        bilingual_summarizer = self.bilingual_summarizer
+        classifier_version = f"classifier-v{ARTIFACT_VERSION}" if self.classifier is not None else "no-classifier"
+        neural_models = ",".join(
+            f"{language}={model_name}@{bilingual_summarizer.backends.get(language, InferenceBackend.TORCH).value}"
+            f"/{bilingual_summarizer.splitters.get(language, PartSplitter.TOKEN_BUDGET).value}"
+            for language, (_, _, model_name) in sorted(MODEL_CLASSES.items())
+        )
+        return {
+            "language": f"profiles-{profiles_version()}:{classifier_version}",
+            "keywords": "yake-n2-top10",
+            "keywords_tfidf": f"tfidf-n2-top10:{corpus_version(summarizer)}",
+            "classic": corpus_version(summarizer),
+            "neural": f"{neural_models}:{bilingual_summarizer.max_length}:{bilingual_summarizer.min_length}",
+            "document": DOCUMENT_VERSION,
+        }
+
+    def model_memory(self) -> Dict[str, int]:
+        """
+        Measures the memory held by the parameters of the loaded models.
+        Models without accessible parameters (e.g. ONNX Runtime sessions) are not reported.
+
+        Returns:
+            Dict[str, int]: Size in bytes of every loaded model, keyed by model name.
+        """
+        memory = {}
+        for language, resources in list(self.bilingual_summarizer.models.items()):
+            parameters = getattr(resources["model"], "parameters", None)
+            if parameters is not None:
+                memory[MODEL_CLASSES[language][2]] = sum(p.numel() * p.element_size() for p in parameters())
+        if self.classifier is not None:
+            memory["language-classifier"] = sum(kernel.nbytes + bias.nbytes for kernel, bias in self.classifier.layers)
+        return memory
@@ -1,5 +1,6 @@
 import json
-from typing import List, Tuple
+from enum import Enum
+from typing import Callable, List, Tuple, Type
 
 PATH = "/home/user/lang-text-recognition/src/abstracting/corpus/texts_info.json"
 
@@ -27,4 +28,24 @@ def load_documents_and_languages(path: str = PATH) -> Tuple[List[str], List[str]
             documents.append(file.read())
             languages.append(entry['language'])
     
-    return documents, languages
\ No newline at end of file
+    return documents, languages
+
+
+def language_option(enum_type: Type[Enum]) -> Callable[[str], Tuple[str, Enum]]:
+    """
+    Creates an argparse type for per-language options written as language=value, e.g. russian=onnx-int8.
+
+    Args:
+        enum_type (Type[Enum]): Enumeration the value must belong to.
+
+    Returns:
+        Callable[[str], Tuple[str, Enum]]: Parser of one option into the language and the enumeration member.
+    """
+    def parse(option: str) -> Tuple[str, Enum]:
+        language, separator, value = option.partition('=')
+        if not separator or not language:
+            raise ValueError(f"Expected language=value, got '{option}'")
+        return language.strip(), enum_type(value.strip())
+
+    parse.__name__ = enum_type.__name__
+    return parse
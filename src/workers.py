@@ -0,0 +1,115 @@
+import os
+from typing import Optional, Tuple
+from .abstracting.keywords_abstracting import extract_document_keywords
+from .abstracting.classic_abstract import TextSummarizer
+from .abstracting.document import ParsedDocument, parse_document
+from .abstracting.document_frequency import STORE_FILENAME, JOURNAL_SUFFIX
+from .models.models import KeywordBackend
+from .utils import PATH
+
+_summarizer: Optional[TextSummarizer] = None
+_corpus_path: str = PATH
+_corpus_state: Optional[Tuple] = None
+
+
+def corpus_version(summarizer: TextSummarizer) -> str:
+    """
+    Describes the corpus state the classic summarizer was built from.
+
+    Args:
+        summarizer (TextSummarizer): Classic summarizer.
+
+    Returns:
+        str: Version string made of the manifest hash and the number of documents.
+    """
+    return f"{summarizer.store.manifest_hash}:{summarizer.doc_count}"
+
+
+def _disk_state() -> Tuple:
+    """
+    Describes the files the classic summarizer is loaded from: the manifest, the document frequency store and its journal.
+    """
+    store_path = os.path.join(os.path.dirname(_corpus_path), STORE_FILENAME)
+    state = []
+    for path in (_corpus_path, store_path, store_path + JOURNAL_SUFFIX):
+        try:
+            stat = os.stat(path)
+            state.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            state.append(None)
+    return tuple(state)
+
+
+def _load_summarizer() -> None:
+    global _summarizer, _corpus_state
+    _corpus_state = _disk_state()
+    _summarizer = TextSummarizer.from_corpus(_corpus_path)
+
+
+def init_worker(corpus_path: str = PATH) -> None:
+    """
+    Initializes a worker process: loads the classic summarizer from the persisted corpus store once per process.
+
+    Args:
+        corpus_path (str): Path to the corpus manifest.
+    """
+    global _corpus_path
+    _corpus_path = corpus_path
+    _load_summarizer()
+
+
+def _current_summarizer(version: str) -> TextSummarizer:
+    """
+    Returns the classic summarizer of the worker. If its corpus version differs from the one of the main process,
+    the store is reloaded, but only if its files have changed since the worker loaded them,
+    so a version that is never written to disk does not make every task reload the store.
+    """
+    if _summarizer is None or (corpus_version(_summarizer) != version and _disk_state() != _corpus_state):
+        _load_summarizer()
+    return _summarizer
+
+
+def parse_task(text: str, language: str) -> ParsedDocument:
+    """
+    Parses a document in a worker process, once for all summarization stages.
+
+    Args:
+        text (str): Document text.
+        language (str): Document language.
+
+    Returns:
+        ParsedDocument: Parsed document.
+    """
+    return parse_document(text, language)
+
+
+def keywords_task(document: ParsedDocument, backend: KeywordBackend = KeywordBackend.YAKE, version: Optional[str] = None) -> str:
+    """
+    Extracts keywords in a worker process.
+
+    Args:
+        document (ParsedDocument): Parsed document.
+        backend (KeywordBackend): Keyword extraction backend.
+        version (Optional[str]): Corpus version of the summarizer in the main process, required for KeywordBackend.TFIDF.
+
+    Returns:
+        str: Keywords separated by commas.
+    """
+    if backend == KeywordBackend.TFIDF:
+        return extract_document_keywords(document, backend, _current_summarizer(version))
+    return extract_document_keywords(document)
+
+
+def classic_task(document: ParsedDocument, version: str) -> str:
+    """
+    Builds the classic summary in a worker process.
+    If the corpus has changed since the worker loaded it, the store is reloaded from disk first.
+
+    Args:
+        document (ParsedDocument): Parsed document.
+        version (str): Corpus version of the summarizer in the main process.
+
+    Returns:
+        str: Key sentences.
+    """
+    return _current_summarizer(version).summarize_document(document)
@@ -0,0 +1,63 @@
+import sqlite3
+from src.cache import ResultCache, make_key
+from src.recognition.controller import profiles_version
+
+
+def test_key_depends_on_text_stage_and_versions():
+    key = make_key("текст", "classic", "russian", "v1")
+    assert key == make_key("текст", "classic", "russian", "v1")
+    assert key != make_key("текст ", "classic", "russian", "v1")
+    assert key != make_key("текст", "keywords", "russian", "v1")
+    assert key != make_key("текст", "classic", "russian", "v2")
+    assert key != make_key("текст", "classic", "italian", "v1")
+
+
+def test_key_separates_versions():
+    assert make_key("text", "language", "ab", "c") != make_key("text", "language", "a", "bc")
+    assert make_key("text", "language", None) != make_key("text", "language", "")
+
+
+def test_profiles_version_is_stable():
+    assert profiles_version() == profiles_version()
+    assert len(profiles_version()) == 16
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+
+
+def test_disk_tier_commits_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(max_entries=1, db_path=path, commit_every=3, commit_interval=3600)
+
+    def stored() -> int:
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    cache.put("a", {"summary": "a"})
+    cache.put("b", {"summary": "b"})
+    assert stored() == 0
+    assert cache.get("a") == (True, {"summary": "a"})
+    cache.put("c", {"summary": "c"})
+    assert stored() == 3
+
+    cache.put("d", {"summary": "d"})
+    cache.flush()
+    assert stored() == 4
+    cache.put("e", {"summary": "e"})
+    cache.close()
+    assert stored() == 5
+
+    reopened = ResultCache(max_entries=1, db_path=path)
+    assert reopened.get("a") == (True, {"summary": "a"})
+    assert reopened.get("e") == (True, {"summary": "e"})
+    reopened.clear()
+    assert reopened.get("a") == (False, None)
+    reopened.close()
@@ -0,0 +1,23 @@
+import pytest
+from src.recognition.controller import detect_language
+from src.models.models import RecognitionMethod
+
+RUSSIAN = "Москва является столицей России и крупнейшим городом страны. " * 20
+# Both scripts are used, so both languages stay candidates and the confidence stays below 1.
+MIXED = "Roma è la capitale d'Italia. Москва является столицей России. " * 20
+
+
+@pytest.mark.parametrize("initial_chars, growth", [(0, 2), (-5, 2), (16, 1), (16, 0)])
+def test_detect_language_rejects_parameters_that_never_grow(initial_chars, growth):
+    with pytest.raises(ValueError):
+        detect_language(RUSSIAN, RecognitionMethod.NGRAM, threshold=0.99, initial_chars=initial_chars, growth=growth)
+
+
+def test_detect_language_stops_at_max_chars():
+    result = detect_language(MIXED, RecognitionMethod.NGRAM, threshold=1.0, initial_chars=64, max_chars=300)
+    assert result.consumed_chars == 300
+
+
+def test_detect_language_consumes_whole_text_below_threshold():
+    result = detect_language(MIXED, RecognitionMethod.NGRAM, threshold=1.0, initial_chars=64)
+    assert result.consumed_chars == len(MIXED)
@@ -0,0 +1,96 @@
+import os
+import json
+from collections import Counter
+from src.abstracting.document_frequency import DocumentFrequencyStore, JOURNAL_SUFFIX
+
+
+def preprocess(text: str, language: str) -> list:
+    return text.lower().split()
+
+
+def write_corpus(directory, entries) -> str:
+    manifest = []
+    for name, text, language in entries:
+        path = directory / name
+        if text is not None:
+            path.write_text(text, encoding='utf-8')
+        manifest.append({'text_file': str(path), 'language': language})
+    manifest_path = directory / 'texts_info.json'
+    manifest_path.write_text(json.dumps(manifest), encoding='utf-8')
+    return str(manifest_path)
+
+
+def rebuild(manifest_path: str) -> Counter:
+    with open(manifest_path, encoding='utf-8') as file:
+        manifest = json.load(file)
+    df = Counter()
+    for entry in manifest:
+        with open(entry['text_file'], encoding='utf-8') as file:
+            df.update(set(preprocess(file.read(), entry['language'])))
+    return df
+
+
+def test_incremental_sync_matches_full_rebuild(tmp_path):
+    store_path = str(tmp_path / 'df.json')
+    manifest_path = write_corpus(tmp_path, [
+        ('a.txt', 'Кошка сидит на окне', 'russian'),
+        ('b.txt', 'Il gatto dorme sul divano', 'italian'),
+        ('a.txt', None, 'russian'),
+        ('c.txt', 'кошка и собака', 'russian'),
+    ])
+    store = DocumentFrequencyStore.load_or_build(preprocess, manifest_path, store_path)
+    assert store.doc_count == 4
+    assert store.df == rebuild(manifest_path)
+
+    manifest_path = write_corpus(tmp_path, [
+        ('a.txt', None, 'russian'),
+        ('b.txt', 'Il cane dorme sul divano', 'italian'),
+        ('d.txt', 'собака лает', 'russian'),
+        ('d.txt', None, 'russian'),
+        ('d.txt', None, 'russian'),
+    ])
+    store = DocumentFrequencyStore.load_or_build(preprocess, manifest_path, store_path)
+    assert store.doc_count == 5
+    assert store.df == rebuild(manifest_path)
+    assert store.df == DocumentFrequencyStore.load_or_build(preprocess, manifest_path, str(tmp_path / 'fresh.json')).df
+
+
+def test_unchanged_manifest_is_not_read_again(tmp_path):
+    store_path = str(tmp_path / 'df.json')
+    manifest_path = write_corpus(tmp_path, [('a.txt', 'one two', 'italian')])
+    DocumentFrequencyStore.load_or_build(preprocess, manifest_path, store_path)
+    os.remove(tmp_path / 'a.txt')
+    store = DocumentFrequencyStore.load_or_build(preprocess, manifest_path, store_path)
+    assert store.df == Counter({'one': 1, 'two': 1})
+
+
+def test_journal_is_replayed_and_compacted(tmp_path):
+    store_path = str(tmp_path / 'df.json')
+    manifest_path = write_corpus(tmp_path, [('a.txt', 'one two', 'italian')])
+    store = DocumentFrequencyStore.load_or_build(preprocess, manifest_path, store_path)
+    store.compact_after = 4
+
+    store.add_document('upload:1', 'two three', 'italian')
+    store.save_changes()
+    store.add_document('upload:2', 'three four', 'italian')
+    store.remove_document('upload:1')
+    store.save_changes()
+    assert os.path.exists(store_path + JOURNAL_SUFFIX)
+
+    loaded = DocumentFrequencyStore.load(preprocess, store_path)
+    assert loaded.documents == store.documents
+    assert loaded.df == store.df == Counter({'one': 1, 'two': 1, 'three': 1, 'four': 1})
+
+    store.add_document('upload:3', 'five', 'italian')
+    store.save_changes()
+    assert not os.path.exists(store_path + JOURNAL_SUFFIX)
+    assert DocumentFrequencyStore.load(preprocess, store_path).df == store.df
+    assert sorted(os.listdir(tmp_path)) == ['a.txt', 'df.json', 'texts_info.json']
+
+
+def test_store_without_file_keeps_no_changes():
+    store = DocumentFrequencyStore(preprocess)
+    store.add_document('document:0', 'one two', 'italian')
+    store.save_changes()
+    assert store.df == Counter({'one': 1, 'two': 1})
+    assert store._changes == []
@@ -0,0 +1,51 @@
+import io
+import os
+import asyncio
+import pytest
+from bs4 import BeautifulSoup
+from fastapi import UploadFile
+from src.recognition.extraction import extract_html_text, iter_text
+from src.models.models import HtmlParser
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CASES = [
+    "foo<!--c-->bar",
+    "x<?pi?>y",
+    "<![CDATA[z]]>q",
+    "a<!DOCTYPE html>b",
+    "a<![if x]>b<![endif]>c",
+    "<p>a<script>x</script>b</p>",
+    "<style>s</style>v",
+    "<template>t</template>u",
+    "<p>x <b>y</b>z</p>",
+    "<div>a&amp;b&nbsp;c</div>",
+    "",
+]
+DOCUMENTS = [os.path.join(TESTS_DIR, f"doc_{index}.html") for index in (1, 2)]
+
+
+def read(path: str) -> str:
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def reference(html: str, parser: HtmlParser) -> str:
+    return BeautifulSoup(html, parser.value).get_text(separator=" ", strip=True)
+
+
+@pytest.mark.parametrize("parser", list(HtmlParser))
+@pytest.mark.parametrize("html", CASES + [read(path) for path in DOCUMENTS])
+def test_extracted_text_matches_beautifulsoup(html, parser):
+    assert extract_html_text(html, parser) == reference(html, parser)
+
+
+@pytest.mark.parametrize("parser", list(HtmlParser))
+@pytest.mark.parametrize("path", DOCUMENTS)
+def test_streamed_text_matches_beautifulsoup(path, parser):
+    html = read(path)
+    upload = UploadFile(io.BytesIO(html.encode("utf-8")), filename=os.path.basename(path))
+
+    async def collect() -> str:
+        return " ".join([piece async for piece in iter_text(upload, parser, chunk_size=7)])
+
+    assert asyncio.run(collect()) == reference(html, parser)
@@ -0,0 +1,147 @@
+import io
+import os
+import sqlite3
+import zipfile
+import pytest
+from src.jobs import JobStore, JobQueueFull, read_archive, read_directory
+from src.models.models import JobStatus
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+def result(time: float = 1.0) -> dict:
+    return {"language": "russian", "times": {"recognition_time": time}}
+
+
+def test_job_moves_from_queued_to_completed(store):
+    job_id = store.create_job({"method": "ngram"}, [("a.html", "<p>a</p>"), ("b.html", "<p>b</p>")])
+    job = store.get_job(job_id)
+    assert job["status"] == JobStatus.QUEUED.value
+    assert job["documents"] == {"total": 2, "queued": 2, "running": 0, "completed": 0, "failed": 0}
+
+    first = store.claim_next()
+    assert (first["job_id"], first["index"], first["name"], first["html"]) == (job_id, 0, "a.html", "<p>a</p>")
+    assert first["params"] == {"method": "ngram"}
+    assert store.get_job(job_id)["status"] == JobStatus.RUNNING.value
+
+    store.complete_document(job_id, 0, result(1.5))
+    second = store.claim_next()
+    assert second["index"] == 1
+    assert store.claim_next() is None
+    store.fail_document(job_id, 1, "broken")
+
+    job = store.get_job(job_id)
+    assert job["status"] == JobStatus.COMPLETED.value
+    assert job["documents"] == {"total": 2, "queued": 0, "running": 0, "completed": 1, "failed": 1}
+    assert job["times"]["recognition_time"] == 1.5
+    assert "total_time" in job["times"]
+
+    results = store.get_results(job_id)
+    assert [entry["status"] for entry in results] == ["completed", "failed"]
+    assert results[0]["language"] == "russian"
+    assert results[1]["detail"] == "broken"
+    assert store.get_results(job_id, offset=1, limit=1) == results[1:]
+
+
+def test_job_with_only_failed_documents_is_failed(store):
+    job_id = store.create_job({}, [("a.html", "a"), ("b.html", "b")])
+    for _ in range(2):
+        document = store.claim_next()
+        store.fail_document(job_id, document["index"], "error")
+    assert store.get_job(job_id)["status"] == JobStatus.FAILED.value
+
+
+def test_jobs_are_claimed_in_submission_order(store):
+    first = store.create_job({}, [("a.html", "a")])
+    second = store.create_job({}, [("b.html", "b")])
+    assert [store.claim_next()["job_id"], store.claim_next()["job_id"]] == [first, second]
+
+
+def test_requeue_running_returns_claimed_documents(store):
+    job_id = store.create_job({}, [("a.html", "a")])
+    store.claim_next()
+    assert store.requeue_running() == 1
+    assert store.get_job(job_id)["documents"]["queued"] == 1
+    assert store.claim_next()["html"] == "a"
+
+
+def test_requeue_running_of_one_process(store):
+    job_id = store.create_job({}, [("a.html", "a"), ("b.html", "b")])
+    store.claim_next()
+    store.claim_next()
+    store._connection.execute("UPDATE documents SET claimed_by = ? WHERE idx = 1", (os.getpid() + 1,))
+    store._connection.commit()
+
+    assert store.requeue_running(os.getpid() + 1) == 1
+    assert store.get_job(job_id)["documents"]["queued"] == 1
+    assert store.get_job(job_id)["documents"]["running"] == 1
+    assert store.claim_next()["index"] == 1
+    assert store.requeue_running(os.getpid()) == 2
+
+
+def test_queue_limit(store):
+    store.create_job({}, [("a.html", "a")], max_pending=2)
+    with pytest.raises(JobQueueFull):
+        store.create_job({}, [("b.html", "b"), ("c.html", "c")], max_pending=2)
+    assert store.pending_count() == 1
+
+
+def test_unknown_job(store):
+    assert store.get_job("missing") is None
+    assert store.get_results("missing") is None
+
+
+def test_legacy_statuses_are_migrated(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    job_id = store.create_job({}, [("a.html", "a"), ("b.html", "b")])
+    store.close()
+    connection = sqlite3.connect(path)
+    connection.execute("UPDATE documents SET status = 'pending' WHERE idx = 0")
+    connection.execute("UPDATE documents SET status = 'done', result = '{}' WHERE idx = 1")
+    connection.commit()
+    connection.close()
+
+    store = JobStore(path)
+    assert store.get_job(job_id)["documents"]["queued"] == 1
+    assert store.get_job(job_id)["documents"]["completed"] == 1
+    store.close()
+
+
+def test_read_directory_is_confined_to_the_root(tmp_path):
+    root, outside = tmp_path / "root", tmp_path / "outside"
+    (root / "site").mkdir(parents=True)
+    outside.mkdir()
+    (root / "site" / "index.html").write_text("<p>ok</p>", encoding="utf-8")
+    (outside / "secret.html").write_text("<p>secret</p>", encoding="utf-8")
+
+    assert read_directory("site", str(root)) == [("index.html", "<p>ok</p>")]
+    with pytest.raises(ValueError):
+        read_directory("site", None)
+    with pytest.raises(ValueError):
+        read_directory("../outside", str(root))
+    with pytest.raises(ValueError):
+        read_directory(str(outside), str(root))
+    with pytest.raises(ValueError):
+        read_directory("site", str(root), max_bytes=3)
+
+    os.symlink(outside / "secret.html", root / "site" / "link.html")
+    with pytest.raises(ValueError):
+        read_directory("site", str(root))
+
+
+def test_read_archive_size_limit():
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("a.html", "a" * 1000)
+        archive.writestr("notes.txt", "skipped")
+    assert read_archive(data.getvalue()) == [("a.html", "a" * 1000)]
+    with pytest.raises(ValueError):
+        read_archive(data.getvalue(), max_bytes=100)
+    with pytest.raises(ValueError):
+        read_archive(b"not an archive")
@@ -0,0 +1,111 @@
+import math
+import numpy as np
+import pytest
+from collections import Counter
+from src.recognition import alphabet, n_gram
+from src.recognition.profiles import SUPPORTED_N, normalize_text, encode_texts, ngram_keys, decode_ngrams
+
+TEXTS = [
+    "Привет, мир! Это короткий текст о погоде.",
+    "Ciao, come stai? Questo è un testo più lungo sull'Italia.",
+    "Mixed: Москва и Roma — 2024 год, città!",
+    "",
+    "a",
+    "ab",
+    "Я",
+    "12345 !!! ... ---",
+    "Ёлка, ÉCOLE, straße, été, x² Ⅻ",
+    "日本語のテキスト and ελληνικά",
+]
+
+
+def reference_ngrams(text: str, n: int) -> list:
+    return n_gram.create_ngrams(normalize_text(text), n)
+
+
+@pytest.mark.parametrize("n", SUPPORTED_N)
+@pytest.mark.parametrize("supported", [False, True])
+def test_ngram_keys_match_create_ngrams(n, supported):
+    code_points = n_gram.load_profiles(n).alphabet if supported else np.empty(0, dtype=np.uint32)
+    encoded = encode_texts(TEXTS, code_points)
+    rows, keys = ngram_keys(encoded, n)
+    ngrams = decode_ngrams(encoded.alphabet, keys, n)
+    for index, text in enumerate(TEXTS):
+        assert [ngram for row, ngram in zip(rows.tolist(), ngrams) if row == index] == reference_ngrams(text, n)
+
+
+@pytest.mark.parametrize("n", SUPPORTED_N)
+def test_build_profile_matches_counter(n):
+    for text in TEXTS:
+        counts = Counter(reference_ngrams(text, n))
+        total = sum(counts.values())
+        expected = {ngram: count / total for ngram, count in counts.items()}
+        assert n_gram.build_profile(text, n) == pytest.approx(expected)
+        assert list(n_gram.build_profile(text, n)) == list(counts)
+
+
+@pytest.mark.parametrize("n", SUPPORTED_N)
+def test_ngram_recognizer_matches_reference(n):
+    profiles = n_gram.load_profiles(n)
+    labels, distances = n_gram.recognize_languages(TEXTS, n)
+    assert distances.shape == (len(TEXTS), len(profiles.languages))
+
+    for index, text in enumerate(TEXTS):
+        counts = Counter(reference_ngrams(text, n))
+        if not counts:
+            finite = np.isfinite(distances[index])
+            assert finite.any() and not distances[index, finite].any()
+            continue
+        total = sum(counts.values())
+        expected = n_gram.calculate_kullback_leibler_distances({ngram: count / total for ngram, count in counts.items()}, profiles)
+        finite = np.isfinite(distances[index])
+        assert finite.any()
+        np.testing.assert_allclose(distances[index, finite], expected[finite], rtol=1e-9, atol=1e-9)
+        assert labels[index] == profiles.languages[int(np.argmin(np.where(finite, expected, np.inf)))]
+
+
+def test_letter_counts_match_counter():
+    encoded = encode_texts(TEXTS)
+    counts = alphabet.letter_counts(encoded)
+    letters = encoded.alphabet.astype('<u4').tobytes().decode('utf-32-le')
+    for index, text in enumerate(TEXTS):
+        assert {letter: count for letter, count in zip(letters, counts[index].tolist()) if count} == Counter(normalize_text(text))
+        assert alphabet.preprocess_text(text) == Counter(normalize_text(text))
+
+
+def test_alphabet_recognizer_matches_reference():
+    profiles = alphabet.load_alphabet_profiles()
+    labels, distances = alphabet.recognize_languages(TEXTS)
+    known = set(profiles.alphabet)
+
+    for index, text in enumerate(TEXTS):
+        counts = Counter(letter for letter in normalize_text(text) if letter in known)
+        total = max(sum(counts.values()), 1)
+        user_profile = {letter: count / total for letter, count in counts.items()}
+        expected = np.array([
+            alphabet.calculate_manhattan_distance(user_profile, dict(zip(profiles.alphabet, profiles.frequencies[row].tolist())))
+            for row in range(len(profiles.languages))
+        ])
+        finite = np.isfinite(distances[index])
+        assert finite.any()
+        np.testing.assert_allclose(distances[index, finite], expected[finite], rtol=1e-9, atol=1e-12)
+        assert labels[index] == profiles.languages[int(np.argmin(np.where(finite, expected, math.inf)))]
+
+
+@pytest.mark.parametrize("n", SUPPORTED_N)
+def test_ngram_label_does_not_depend_on_the_batch(n):
+    texts = TEXTS + ["» - э", "- !"]
+    labels, distances = n_gram.recognize_languages(texts, n)
+    for index, text in enumerate(texts):
+        alone_labels, alone_distances = n_gram.recognize_languages([text], n)
+        assert alone_labels[0] == labels[index] == n_gram.recognize_language(text, n)
+        np.testing.assert_array_equal(alone_distances[0], distances[index])
+
+
+def test_alphabet_label_does_not_depend_on_the_batch():
+    texts = TEXTS + ["» - э", "- !"]
+    labels, distances = alphabet.recognize_languages(texts)
+    for index, text in enumerate(texts):
+        alone_labels, alone_distances = alphabet.recognize_languages([text])
+        assert alone_labels[0] == labels[index] == alphabet.recognize_language(text)
+        np.testing.assert_array_equal(alone_distances[0], distances[index])
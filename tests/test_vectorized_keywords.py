@@ -0,0 +1,55 @@
+import math
+from collections import Counter
+from src.abstracting.vectorized_keywords import score_keywords, POSITION_WEIGHT
+
+DF = {"кошка": 1, "собака": 7, "окно": 3, "дом": 9, "сад": 2, "gatto": 1, "cane": 5, "casa": 8, "mare": 4, "sole": 6}
+DOC_COUNT = 10
+
+
+def reference_keywords(tokens: list, top: int) -> list:
+    scores = {}
+    first_positions = {}
+    counts = Counter(tokens) + Counter(zip(tokens, tokens[1:]))
+    for position, token in enumerate(tokens):
+        first_positions.setdefault(token, position / len(tokens))
+    for position, pair in enumerate(zip(tokens, tokens[1:])):
+        first_positions.setdefault(pair, position / len(tokens))
+
+    for candidate, count in counts.items():
+        df = min(DF.get(word, 0) for word in candidate) if isinstance(candidate, tuple) else DF.get(candidate, 0)
+        idf = math.log((DOC_COUNT + 1) / (df + 1)) + 1
+        scores[candidate] = count / len(tokens) * idf * (1 - POSITION_WEIGHT * first_positions[candidate])
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:3 * top]
+    keywords, covered = [], set()
+    for candidate in ranked:
+        if len(keywords) == top:
+            break
+        if isinstance(candidate, tuple):
+            keywords.append(" ".join(candidate))
+            covered.update(candidate)
+        elif candidate not in covered:
+            keywords.append(candidate)
+    return keywords
+
+
+def test_matches_reference_scoring():
+    documents = [
+        ["кошка", "сидит", "окно", "кошка", "дом", "сад", "собака", "дом"],
+        ["gatto", "cane", "casa", "mare", "sole", "mare", "gatto", "sole", "casa"],
+        ["дом"],
+        [],
+    ]
+    for top in (1, 3, 10):
+        assert score_keywords(documents, DF, DOC_COUNT, top) == [reference_keywords(tokens, top) if tokens else [] for tokens in documents]
+
+
+def test_words_of_selected_pairs_are_skipped():
+    keywords = score_keywords([["кошка", "x", "дом"]], DF, DOC_COUNT, top=5)[0]
+    assert keywords[0] == "кошка x"
+    assert "кошка" not in keywords and "x" not in keywords
+
+
+def test_documents_without_tokens():
+    assert score_keywords([[], []], DF, DOC_COUNT) == [[], []]
+    assert score_keywords([], DF, DOC_COUNT) == []